@@ -11,14 +11,29 @@ from czsc import traders
 from czsc import sensors
 from czsc import aphorism
 from czsc.analyze import CZSC
-from czsc.objects import Freq, Operate, Direction, Signal, Factor, Event, RawBar, NewBar, Position, ZS
+from czsc.objects import (
+    Freq,
+    Operate,
+    Direction,
+    Signal,
+    Factor,
+    Event,
+    EventMatcher,
+    SignalsFrame,
+    RawBar,
+    NewBar,
+    Position,
+    ZS,
+)
 from czsc.strategies import CzscStrategyBase, CzscJsonStrategy
 from czsc.sensors import holds_concepts_effect, CTAResearch, EventMatchSensor
 from czsc.sensors.feature import FixedNumberSelector
 from czsc.traders import (
     CzscTrader,
     CzscSignals,
+    CzscUniverse,
     generate_czsc_signals,
+    iter_czsc_signals,
     check_signals_acc,
     get_unique_signals,
     PairsPerformance,
@@ -29,6 +44,10 @@ from czsc.traders import (
     SignalsParser,
     get_signals_config,
     get_signals_freqs,
+    compile_signals_config,
+    generate_signals_dataset,
+    read_signals_dataset,
+    SignalsStore,
 
     WeightBacktest,
     stoploss_by_direction,
@@ -52,6 +71,7 @@ from czsc.utils import (
     KlineChart,
     WordWriter,
     BarGenerator,
+    Profiler,
     freq_end_time,
     resample_bars,
     is_trading_time,
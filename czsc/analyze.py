@@ -7,12 +7,16 @@ describe: 缠论分型、笔的识别
 """
 import os
 import webbrowser
+import numpy as np
 from loguru import logger
 from typing import List
 from collections import OrderedDict
+from itertools import repeat
 
-from czsc.enum import Mark, Direction
-from czsc.objects import BI, FX, RawBar, NewBar
+from czsc.enum import Mark, Direction, Freq
+from czsc.objects import BI, FX, RawBar, NewBar, RawBarSeq, RawBarRange
+from czsc.utils.bar_store import BarStore
+from czsc.utils.ind_store import IndicatorStore, IndicatorCache
 from czsc.utils.echarts_plot import kline_pro
 from czsc import envs
 
@@ -34,7 +38,8 @@ def remove_include(k1: NewBar, k2: NewBar, k3: RawBar):
         - 如果direction的值不是Up也不是Down，则抛出ValueError异常。
 
     3. 根据上述处理得到的高点、低点、开盘价(open_)、收盘价(close)，计算新K线k4的成交量(vol)和成交金额(amount)，
-       并将k2中除了与k3时间戳相同的元素之外的其他元素与k3一起作为k4的元素列表(elements)。
+       并将k2中除了与k3时间戳相同的元素之外的其他元素与k3一起作为k4的元素列表(elements)；
+       如果k2.elements是RawBarRange并且k3紧跟在区间之后，直接把区间向后扩展一根K线。
 
     4. 返回一个布尔值和新的K线k4。如果k2和k3之间存在包含关系，则返回True和k4；否则返回False和k4，其中k4与k3具有相同的属性。
     """
@@ -63,9 +68,11 @@ def remove_include(k1: NewBar, k2: NewBar, k3: RawBar):
         open_, close = (high, low) if k3.open > k3.close else (low, high)
         vol = k2.vol + k3.vol
         amount = k2.amount + k3.amount
-        # 这里有一个隐藏Bug，len(k2.elements) 在一些及其特殊的场景下会有超大的数量，具体问题还没找到；
-        # 临时解决方案是直接限定len(k2.elements)<=100
-        elements = [x for x in k2.elements[:100] if x.dt != k3.dt] + [k3]
+        # CZSC 中 k2.elements 是 RawBarRange，k3 紧跟在区间之后，只需要扩展区间，不需要复制列表
+        if isinstance(k2.elements, RawBarRange) and k2.elements.followed_by(k3):
+            elements = k2.elements.extend()
+        else:
+            elements = [x for x in k2.elements if x.dt != k3.dt] + [k3]
         k4 = NewBar(symbol=k3.symbol, id=k2.id, freq=k2.freq, dt=dt, open=open_,
                     close=close, high=high, low=low, vol=vol, amount=amount, elements=elements)
         return True, k4
@@ -188,68 +195,272 @@ class CZSC:
                  bars: List[RawBar],
                  get_signals = None,
                  max_bi_num=envs.get_max_bi_num(),
+                 columnar: bool = False,
+                 warmup: bool = False,
+                 sdt=None,
                  ):
         """
 
         :param bars: K线数据
         :param max_bi_num: 最大允许保留的笔数量
         :param get_signals: 自定义的信号计算函数
+        :param columnar: 是否使用列式存储（BarStore）保存原始K线，默认 False
+
+            列式存储时，bars_raw 是 BarStore 对象，下标访问返回 RawBarView 视图，
+            也可以通过 c.bars_raw.close 等属性直接读取 NumPy 列，适合需要按列计算的信号函数；
+            列式存储只减少 bars_raw 自身的内存，CZSC 对象整体的内存占用不会降低
+        :param warmup: 是否跳过历史K线上的信号计算，默认 False，即每根K线 update 后都执行 get_signals
+
+            warmup=True 时，bars 中只有最后一根K线会执行 get_signals，适合只需要最新信号的选股场景；
+            注意：依赖逐K线状态（如 c.cache）的信号函数，其结果可能与逐K线计算不一致
+        :param sdt: 信号计算开始时间，默认 None；指定 sdt 时同样跳过历史K线的信号计算，
+            bars 中 dt >= sdt 的K线都会执行 get_signals，可以用来给有状态的信号函数预留预热区间
         """
         self.verbose = envs.get_verbose()
         self.max_bi_num = max_bi_num
-        self.bars_raw: List[RawBar] = []  # 原始K线序列
+        self.columnar = columnar
+        if columnar:
+            self.bars_raw: BarStore = BarStore(symbol=bars[0].symbol, freq=bars[0].freq)
+        else:
+            self.bars_raw: List[RawBar] = []  # 原始K线序列
         self.bars_ubi: List[NewBar] = []  # 未完成笔的无包含K线序列
         self.bi_list: List[BI] = []
+        self._raw_seq = RawBarSeq()         # bars_ubi 中 NewBar.elements 引用的原始K线
+
+        # bars_ubi 中分型的增量识别状态，_ubi_fxs 与 check_fxs(self.bars_ubi) 的结果始终保持一致
+        self._ubi_fxs: List[FX] = []        # bars_ubi 中的分型
+        self._ubi_fx_idx: List[int] = []    # 分型中间K线在 bars_ubi 中的位置
+        self._ubi_fx_best: List[int] = []   # 截止每个分型，笔结束分型 fx_b 的最优候选在 _ubi_fxs 中的位置，-1 表示没有
+        self._ubi_dirty = 0                 # bars_ubi 中自上次同步以来最早发生变化的位置
+        self._memo = {}                     # fx_list / ubi_fxs / ubi 等属性的缓存，每次 update 后失效
+
         self.symbol = bars[0].symbol
         self.freq = bars[0].freq
         self.get_signals = get_signals
         self.signals = None
         # cache 是信号计算过程的缓存容器，需要信号计算函数自行维护
         self.cache = OrderedDict()
+        # 与 bars_raw 按行对齐的技术指标列存储，通过 ind / set_ind 读写
+        self.indicators = IndicatorStore()
+
+        if warmup or sdt is not None:
+            n = self.__signals_start(bars, sdt)
+            self.get_signals = None
+            for bar in bars[:n]:
+                self.update(bar)
+            self.get_signals = get_signals
+            bars = bars[n:]
 
         for bar in bars:
             self.update(bar)
 
+    @staticmethod
+    def __signals_start(bars: List[RawBar], sdt=None) -> int:
+        """预热模式下，开始计算信号的K线位置；最后一根K线总是会计算信号
+
+        :param bars: K线数据
+        :param sdt: 信号计算开始时间，None 表示只在最后一根K线上计算信号
+        :return: 开始计算信号的K线位置
+        """
+        if not bars:
+            return 0
+        if sdt is None:
+            return len(bars) - 1
+
+        import pandas as pd
+        sdt = pd.to_datetime(sdt)
+        n = next((i for i, bar in enumerate(bars) if bar.dt >= sdt), len(bars))
+        return min(n, len(bars) - 1)
+
+    @classmethod
+    def from_arrays(cls, symbol: str, freq: Freq, dt, open, close, high, low, vol, amount=None, id=None,
+                    get_signals=None, max_bi_num=envs.get_max_bi_num(), columnar: bool = False, sdt=None):
+        """使用 NumPy 数组 / 列表创建 CZSC 对象，调用方不需要先逐行构造 RawBar 列表
+
+        构建 RawBar 列表后调用 CZSC(bars, ..., warmup=True, sdt=sdt)，分析结果与逐K线 update 完全一致，
+        返回的对象可以继续调用 update 增量更新；信号计算函数 get_signals 默认只在最后一根K线上执行一次，
+        这也是相对 CZSC(bars) 的主要耗时差异，参见 examples/develop/czsc_batch_benchmark.py
+
+        :param symbol: 标的代码
+        :param freq: K线周期
+        :param dt: K线时间序列，升序；带时区时保留时区
+        :param open: 开盘价序列
+        :param close: 收盘价序列
+        :param high: 最高价序列
+        :param low: 最低价序列
+        :param vol: 成交量序列
+        :param amount: 成交额序列，默认为 None，表示使用 close * vol
+        :param id: K线 id 序列，默认为 None，表示使用 0, 1, 2, ...
+        :param get_signals: 自定义的信号计算函数
+        :param max_bi_num: 最大允许保留的笔数量
+        :param columnar: 是否使用列式存储（BarStore）保存原始K线
+        :param sdt: 信号计算开始时间，默认 None；dt >= sdt 的K线逐根 update 并计算信号，参见 CZSC 的 sdt 参数
+        :return: CZSC 对象
+        """
+        import pandas as pd
+
+        close = np.asarray(close, dtype=np.float64)
+        vol = np.asarray(vol, dtype=np.float64)
+        amount = close * vol if amount is None else np.asarray(amount, dtype=np.float64)
+        id = range(len(close)) if id is None else np.asarray(id).tolist()
+        # 使用 DatetimeIndex 保留时区，np.asarray 会把带时区的时间转换为不带时区的 UTC 时间
+        dt = list(pd.DatetimeIndex(dt))
+        bars = list(map(RawBar, repeat(symbol), id, dt, repeat(freq),
+                        np.asarray(open, dtype=np.float64).tolist(), close.tolist(),
+                        np.asarray(high, dtype=np.float64).tolist(), np.asarray(low, dtype=np.float64).tolist(),
+                        vol.tolist(), amount.tolist()))
+        return cls(bars, get_signals=get_signals, max_bi_num=max_bi_num, columnar=columnar, warmup=True, sdt=sdt)
+
+    @classmethod
+    def from_dataframe(cls, df, symbol: str = None, freq: Freq = None, **kwargs):
+        """使用 K线 DataFrame 创建 CZSC 对象，参数说明参见 CZSC.from_arrays
+
+        :param df: K线数据，必须包含 dt, open, close, high, low, vol 列，可选 symbol, freq, id, amount 列
+        :param symbol: 标的代码，默认为 None，表示使用 df['symbol'] 的第一个值
+        :param freq: K线周期，默认为 None，表示使用 df['freq'] 的第一个值
+        :param kwargs: 传递给 CZSC.from_arrays 的其他参数
+        :return: CZSC 对象
+        """
+        symbol = symbol or df['symbol'].iloc[0]
+        freq = freq or df['freq'].iloc[0]
+        freq = freq if isinstance(freq, Freq) else Freq(freq)
+        return cls.from_arrays(symbol, freq, dt=df['dt'], open=df['open'].values, close=df['close'].values,
+                               high=df['high'].values, low=df['low'].values, vol=df['vol'].values,
+                               amount=df['amount'].values if 'amount' in df.columns else None,
+                               id=df['id'].values if 'id' in df.columns else None, **kwargs)
+
     def __repr__(self):
         return "<CZSC~{}~{}>".format(self.symbol, self.freq.value)
 
+    def __reset_ubi(self, bars_ubi: List[NewBar]):
+        """整体替换 bars_ubi，下次同步时重新识别全部分型"""
+        self.bars_ubi = bars_ubi
+        self._ubi_dirty = 0
+
+    def __sync_ubi_fxs(self):
+        """增量同步 bars_ubi 中的分型
+
+        分型识别是从左到右的顺序过程，位置 i 上的分型只依赖 bars_ubi[i-1: i+2]，
+        因此只需要丢弃受变化影响的尾部分型，再从变化位置开始重新识别，单根K线的均摊成本为 O(1)。
+        """
+        bars = self.bars_ubi
+        fxs, fx_idx, fx_best = self._ubi_fxs, self._ubi_fx_idx, self._ubi_fx_best
+        start = max(self._ubi_dirty - 1, 1)
+        while fx_idx and fx_idx[-1] >= start:
+            fxs.pop()
+            fx_idx.pop()
+            fx_best.pop()
+
+        for i in range(start, len(bars) - 1):
+            fx = check_fx(bars[i - 1], bars[i], bars[i + 1])
+            if not isinstance(fx, FX):
+                continue
+
+            # 与 check_fxs 保持一致：临时强制要求fxs序列顶底交替
+            if len(fxs) >= 2 and fx.mark == fxs[-1].mark:
+                logger.error(f"check_fxs错误: {bars[i].dt}，{fx.mark}，{fxs[-1].mark}")
+                continue
+
+            best = fx_best[-1] if fx_best else -1
+            if fxs:
+                fx_a = fxs[0]
+                if fx_a.mark == Mark.D and fx.mark == Mark.G and fx.dt > fx_a.dt and fx.fx > fx_a.fx:
+                    if best < 0 or fx.high > fxs[best].high:
+                        best = len(fxs)
+                elif fx_a.mark == Mark.G and fx.mark == Mark.D and fx.dt > fx_a.dt and fx.fx < fx_a.fx:
+                    if best < 0 or fx.low < fxs[best].low:
+                        best = len(fxs)
+            fxs.append(fx)
+            fx_idx.append(i)
+            fx_best.append(best)
+
+        self._ubi_dirty = len(bars)
+
+    def __check_bi(self, benchmark=None):
+        """基于增量分型状态查找 bars_ubi 中的一笔，结果与 check_bi(self.bars_ubi, benchmark) 一致
+
+        :param benchmark: 当下笔能量的比较基准
+        :return: 找到的笔，没有则返回 None；找到笔时 bars_ubi 同步更新为 fx_b 之后的部分
+        """
+        fxs, fx_idx = self._ubi_fxs, self._ubi_fx_idx
+        if len(fxs) < 2 or self._ubi_fx_best[-1] < 0:
+            return None
+
+        fx_a = fxs[0]
+        if fx_a.mark == Mark.D:
+            direction = Direction.Up
+        elif fx_a.mark == Mark.G:
+            direction = Direction.Down
+        else:
+            raise ValueError
+
+        ib = self._ubi_fx_best[-1]
+        fx_b = fxs[ib]
+        a_start, b_end = fx_idx[0] - 1, fx_idx[ib] + 1
+
+        # 判断fx_a和fx_b价格区间是否存在包含关系
+        ab_include = (fx_a.high > fx_b.high and fx_a.low < fx_b.low) or (fx_a.high < fx_b.high and fx_a.low > fx_b.low)
+
+        # 判断当前笔的涨跌幅是否超过benchmark的一定比例
+        power_enough = bool(benchmark and abs(fx_a.fx - fx_b.fx) > benchmark * envs.get_bi_change_th())
+
+        # 成笔的条件：1）顶底分型之间没有包含关系；2）笔长度大于等于min_bi_len 或 当前笔的涨跌幅已经够大
+        if ab_include or (b_end - a_start + 1 < envs.get_min_bi_len() and not power_enough):
+            return None
+
+        n_fxs = ib + 1
+        while n_fxs < len(fxs) and fx_idx[n_fxs] <= b_end:
+            n_fxs += 1
+        bars = self.bars_ubi
+        bi = BI(symbol=fx_a.symbol, fx_a=fx_a, fx_b=fx_b, fxs=fxs[:n_fxs],
+                direction=direction, bars=bars[a_start: b_end + 1])
+        self.__reset_ubi(bars[fx_idx[ib] - 1:])
+        return bi
+
     def __update_bi(self):
-        bars_ubi = self.bars_ubi
-        if len(bars_ubi) < 3:
+        if len(self.bars_ubi) < 3:
             return
 
+        self.__sync_ubi_fxs()
+
         # 查找笔
         if not self.bi_list:
             # 第一笔的查找
-            fxs = check_fxs(bars_ubi)
+            fxs = self._ubi_fxs
             if not fxs:
                 return
 
-            fx_a = fxs[0]
-            fxs_a = [x for x in fxs if x.mark == fx_a.mark]
-            for fx in fxs_a:
+            fx_a, ia = fxs[0], 0
+            for i, fx in enumerate(fxs):
+                if fx.mark != fx_a.mark:
+                    continue
                 if (fx_a.mark == Mark.D and fx.low <= fx_a.low) \
                         or (fx_a.mark == Mark.G and fx.high >= fx_a.high):
-                    fx_a = fx
-            bars_ubi = [x for x in bars_ubi if x.dt >= fx_a.elements[0].dt]
+                    fx_a, ia = fx, i
+
+            s_index = self._ubi_fx_idx[ia] - 1
+            if s_index > 0:
+                self.__reset_ubi(self.bars_ubi[s_index:])
+                self.__sync_ubi_fxs()
 
-            bi, bars_ubi_ = check_bi(bars_ubi)
+            bi = self.__check_bi()
             if isinstance(bi, BI):
                 self.bi_list.append(bi)
-            self.bars_ubi = bars_ubi_
             return
 
+        bars_ubi = self.bars_ubi
         if self.verbose and len(bars_ubi) > 100:
             logger.info(f"{self.symbol} - {self.freq} - {bars_ubi[-1].dt} 未完成笔延伸数量: {len(bars_ubi)}")
 
-        if envs.get_bi_change_th() > 0.5 and len(self.bi_list) >= 5:
+        # 只有存在笔结束分型的候选时才需要计算 benchmark
+        if len(self.bi_list) >= 5 and self._ubi_fx_best and self._ubi_fx_best[-1] >= 0 \
+                and envs.get_bi_change_th() > 0.5:
             price_seq = [x.power_price for x in self.bi_list[-5:]]
             benchmark = min(self.bi_list[-1].power_price, sum(price_seq) / len(price_seq))
         else:
             benchmark = None
 
-        bi, bars_ubi_ = check_bi(bars_ubi, benchmark)
-        self.bars_ubi = bars_ubi_
+        bi = self.__check_bi(benchmark)
         if isinstance(bi, BI):
             self.bi_list.append(bi)
 
@@ -260,7 +471,7 @@ class CZSC:
                 or (last_bi.direction == Direction.Down and bars_ubi[-1].low < last_bi.low):
             # 当前笔被破坏，将当前笔的bars与bars_ubi进行合并，并丢弃，这里容易出错，多一根K线就可能导致错误
             # 必须是 -2，因为最后一根无包含K线有可能是未完成的
-            self.bars_ubi = last_bi.bars[:-2] + [x for x in bars_ubi if x.dt >= last_bi.bars[-2].dt]
+            self.__reset_ubi(last_bi.bars[:-2] + [x for x in bars_ubi if x.dt >= last_bi.bars[-2].dt])
             self.bi_list.pop(-1)
 
     def update(self, bar: RawBar):
@@ -268,50 +479,117 @@ class CZSC:
 
         :param bar: 单根K线对象
         """
-        # 更新K线序列
-        if not self.bars_raw or bar.dt != self.bars_raw[-1].dt:
-            self.bars_raw.append(bar)
-            last_bars = [bar]
+        self._memo = {}
+
+        # 更新K线序列；列式存储时，raw_seq 中保存的是 BarStore 视图，不再持有输入的 RawBar 对象
+        bars_raw, raw_seq = self.bars_raw, self._raw_seq
+        if not bars_raw or bar.dt != bars_raw[-1].dt:
+            bars_raw.append(bar)
+            i = raw_seq.append(bars_raw[-1])
+            last_bars = range(i, i + 1)
         else:
             # 当前 bar 是上一根 bar 的时间延伸
-            self.bars_raw[-1] = bar
-            last_bars = self.bars_ubi.pop(-1).raw_bars
-            assert bar.dt == last_bars[-1].dt, f"{bar.dt} != {last_bars[-1].dt}，时间错位"
-            last_bars[-1] = bar
-
-        # 去除包含关系
+            bars_raw[-1] = bar
+            elements = self.bars_ubi.pop(-1).elements
+            assert bar.dt == elements[-1].dt, f"{bar.dt} != {elements[-1].dt}，时间错位"
+            raw_seq[elements.end - 1] = bars_raw[-1]
+            last_bars = range(elements.start, elements.end)
+            if self.indicators:
+                self.indicators.truncate(elements.end - 1)
+            self._ubi_dirty = min(self._ubi_dirty, len(self.bars_ubi))
+
+        # 去除包含关系；最新的K线直接使用输入的 bar，NewBar 复用它的字段值
         bars_ubi = self.bars_ubi
-        for bar in last_bars:
+        for i in last_bars:
+            k = bar if i == last_bars[-1] else raw_seq[i]
             if len(bars_ubi) < 2:
-                bars_ubi.append(NewBar(symbol=bar.symbol, id=bar.id, freq=bar.freq, dt=bar.dt,
-                                       open=bar.open, close=bar.close, amount=bar.amount,
-                                       high=bar.high, low=bar.low, vol=bar.vol, elements=[bar]))
+                bars_ubi.append(NewBar(symbol=k.symbol, id=k.id, freq=k.freq, dt=k.dt,
+                                       open=k.open, close=k.close, amount=k.amount,
+                                       high=k.high, low=k.low, vol=k.vol, elements=raw_seq.range(i, i + 1)))
             else:
                 k1, k2 = bars_ubi[-2:]
-                has_include, k3 = remove_include(k1, k2, bar)
+                has_include, k3 = remove_include(k1, k2, k)
                 if has_include:
                     bars_ubi[-1] = k3
                 else:
+                    k3.elements = raw_seq.range(i, i + 1)
                     bars_ubi.append(k3)
+            self._ubi_dirty = min(self._ubi_dirty, len(bars_ubi) - 1)
         self.bars_ubi = bars_ubi
 
         # 更新笔
         self.__update_bi()
 
-        # 根据最大笔数量限制完成 bi_list, bars_raw 序列的数量控制
-        self.bi_list = self.bi_list[-self.max_bi_num:]
+        # 根据最大笔数量限制完成 bi_list, bars_raw 序列的数量控制；
+        # 只有在确实需要移除时才生成新的列表，单根K线的均摊成本为 O(1)，与历史K线数量无关
+        if len(self.bi_list) > self.max_bi_num:
+            self.bi_list = self.bi_list[-self.max_bi_num:]
         if self.bi_list:
             sdt = self.bi_list[0].fx_a.elements[0].dt
-            s_index = 0
-            for i, bar in enumerate(self.bars_raw):
-                if bar.dt >= sdt:
-                    s_index = i
-                    break
-            self.bars_raw = self.bars_raw[s_index:]
+            if self.columnar:
+                self.bars_raw.drop_before(sdt)
+            elif self.bars_raw[0].dt < sdt:
+                # 需要移除的K线都在序列头部，查找成本与移除数量成正比
+                s_index = 0
+                for i, bar in enumerate(self.bars_raw):
+                    if bar.dt >= sdt:
+                        s_index = i
+                        break
+                if s_index > 0:
+                    self.bars_raw = self.bars_raw[s_index:]
+
+        # 最早仍被引用的原始K线是第一笔（或 bars_ubi）的第一根无包含K线中的K线
+        first = self.bi_list[0].bars[0] if self.bi_list else self.bars_ubi[0]
+        raw_seq.drop_before(first.elements.start)
 
         # 如果有信号计算函数，则进行信号计算
         self.signals = self.get_signals(c=self) if self.get_signals else OrderedDict()
 
+    def __ind_rows(self):
+        """bars_raw 在指标列存储中对应的行号区间 [start, end)"""
+        end = len(self._raw_seq)
+        return end - len(self.bars_raw), end
+
+    def ind(self, key: str, field: str = None) -> np.ndarray:
+        """读取与 bars_raw 对齐的指标列，返回只读的零拷贝视图，尚未计算的K线为 nan
+
+        >>> cache_key = update_macd_cache(c)
+        >>> macd = c.ind(cache_key, "macd")[-5:]
+
+        :param key: 指标的缓存键，一般是 update_*_cache 函数的返回值
+        :param field: 多值指标的字段名，如 MACD 的 dif / dea / macd；单值指标不需要指定
+        :return: 长度与 bars_raw 相同的 NumPy 数组
+        """
+        start, end = self.__ind_rows()
+        return self.indicators.column(key, field, start, end)
+
+    def has_ind(self, key: str, i: int = -1) -> bool:
+        """bars_raw[i] 是否已经计算了指标 key，默认检查最后一根K线"""
+        start, end = self.__ind_rows()
+        return self.indicators.has(key, (end if i < 0 else start) + i)
+
+    def set_ind(self, key: str, values, i: int = 0):
+        """写入 bars_raw[i:] 的指标值，写入后这些K线的 bar.cache[key] 同样可以读取到指标值
+
+        :param key: 指标的缓存键
+        :param values: 单值指标为一维数组；多值指标为 {字段: 一维数组}，长度与 bars_raw[i:] 相同
+        :param i: 第一个值对应的K线在 bars_raw 中的位置，可以是负数
+        """
+        start, end = self.__ind_rows()
+        if i < 0:
+            i += end - start
+        store = self.indicators
+        store.write(key, start + i, values, start, end)
+
+        # bar.cache 兼容层：K线的 cache 替换为 IndicatorCache，原有的缓存数据保留
+        for row, bar in enumerate(self.bars_raw[i:], start + i):
+            cache = bar._cache if isinstance(bar, RawBar) else bar.cache
+            if isinstance(cache, IndicatorCache):
+                if cache.store is store:
+                    continue
+                cache = dict(cache)
+            bar.cache = IndicatorCache(store, row, cache or None)
+
     def to_echarts(self, width: str = "1400px", height: str = '580px', bs=[]):
         """绘制K线分析图
 
@@ -382,18 +660,33 @@ class CZSC:
         chart.render(file_html)
         webbrowser.open(file_html)
 
+    def __memoize(self, key: str, func):
+        """缓存依赖 bars_ubi / bi_list 的属性值，每次 update 后失效
+
+        :param key: 缓存名称
+        :param func: 计算函数
+        :return: 属性值
+        """
+        memo = self._memo
+        if key not in memo:
+            memo[key] = func()
+        return memo[key]
+
     @property
     def last_bi_extend(self):
         """判断最后一笔是否在延伸中，True 表示延伸中"""
-        if self.bi_list[-1].direction == Direction.Up \
-                and max([x.high for x in self.bars_ubi]) > self.bi_list[-1].high:
-            return True
+        def __default():
+            if self.bi_list[-1].direction == Direction.Up \
+                    and max([x.high for x in self.bars_ubi]) > self.bi_list[-1].high:
+                return True
 
-        if self.bi_list[-1].direction == Direction.Down \
-                and min([x.low for x in self.bars_ubi]) < self.bi_list[-1].low:
-            return True
+            if self.bi_list[-1].direction == Direction.Down \
+                    and min([x.low for x in self.bars_ubi]) < self.bi_list[-1].low:
+                return True
 
-        return False
+            return False
+
+        return self.__memoize("last_bi_extend", __default)
 
     @property
     def finished_bis(self) -> List[BI]:
@@ -406,47 +699,57 @@ class CZSC:
 
     @property
     def ubi_fxs(self) -> List[FX]:
-        """bars_ubi 中的分型"""
-        if not self.bars_ubi:
-            return []
-        else:
-            return check_fxs(self.bars_ubi)
+        """bars_ubi 中的分型，与 check_fxs(self.bars_ubi) 的结果一致，直接使用增量识别的分型状态"""
+        def __default():
+            if len(self.bars_ubi) < 3:
+                return []
+            if self._ubi_dirty < len(self.bars_ubi):
+                self.__sync_ubi_fxs()
+            return list(self._ubi_fxs)
+
+        return self.__memoize("ubi_fxs", __default)
 
     @property
     def ubi(self):
         """Unfinished Bi，未完成的笔"""
-        ubi_fxs = self.ubi_fxs
-        if not self.bars_ubi or not self.bi_list or not ubi_fxs:
-            return None
-
-        bars_raw = [y for x in self.bars_ubi for y in x.raw_bars]
-        # 获取最高点和最低点，以及对应的时间
-        high_bar = max(bars_raw, key=lambda x: x.high)
-        low_bar = min(bars_raw, key=lambda x: x.low)
-        direction = Direction.Up if self.bi_list[-1].direction == Direction.Down else Direction.Down
-
-        bi = {
-            "symbol": self.symbol,
-            "direction": direction,
-            "high": high_bar.high,
-            "low": low_bar.low,
-            "high_bar": high_bar,
-            "low_bar": low_bar,
-            "bars": self.bars_ubi,
-            "raw_bars": bars_raw,
-            "fxs": ubi_fxs,
-            "fx_a": ubi_fxs[0],
-        }
-        return bi
+        def __default():
+            ubi_fxs = self.ubi_fxs
+            if not self.bars_ubi or not self.bi_list or not ubi_fxs:
+                return None
+
+            bars_raw = [y for x in self.bars_ubi for y in x.raw_bars]
+            # 获取最高点和最低点，以及对应的时间
+            high_bar = max(bars_raw, key=lambda x: x.high)
+            low_bar = min(bars_raw, key=lambda x: x.low)
+            direction = Direction.Up if self.bi_list[-1].direction == Direction.Down else Direction.Down
+
+            bi = {
+                "symbol": self.symbol,
+                "direction": direction,
+                "high": high_bar.high,
+                "low": low_bar.low,
+                "high_bar": high_bar,
+                "low_bar": low_bar,
+                "bars": self.bars_ubi,
+                "raw_bars": bars_raw,
+                "fxs": ubi_fxs,
+                "fx_a": ubi_fxs[0],
+            }
+            return bi
+
+        return self.__memoize("ubi", __default)
 
     @property
     def fx_list(self) -> List[FX]:
         """分型列表，包括 bars_ubi 中的分型"""
-        fxs = []
-        for bi_ in self.bi_list:
-            fxs.extend(bi_.fxs[1:])
-        ubi = self.ubi_fxs
-        for x in ubi:
-            if not fxs or x.dt > fxs[-1].dt:
-                fxs.append(x)
-        return fxs
+        def __default():
+            fxs = []
+            for bi_ in self.bi_list:
+                fxs.extend(bi_.fxs[1:])
+            ubi = self.ubi_fxs
+            for x in ubi:
+                if not fxs or x.dt > fxs[-1].dt:
+                    fxs.append(x)
+            return fxs
+
+        return self.__memoize("fx_list", __default)
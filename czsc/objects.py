@@ -7,30 +7,76 @@ describe: 常用对象结构
 """
 import math
 import hashlib
+import numpy as np
 import pandas as pd
-from copy import deepcopy
 from dataclasses import dataclass, field
 from datetime import datetime
 from loguru import logger
-from deprecated import deprecated
-from typing import List, Callable, Dict
+from typing import List, Callable, Dict, Union
+from collections.abc import Sequence
 from czsc.enum import Mark, Direction, Freq, Operate
 from czsc.utils.corr import single_linear
+from czsc.utils.ta import RSQ
+from czsc.utils.ind_store import IndicatorCache
 
 
-@deprecated(version="1.0.0", reason="请使用 RawBar")
 @dataclass
 class Tick:
+    """逐笔行情，BarGenerator.update_tick 的输入；vol / amount 是这笔行情的成交增量，不是累计值"""
     symbol: str
     name: str = ""
     price: float = 0
     vol: float = 0
+    dt: datetime = None
+    amount: float = 0
 
 
-@dataclass
-class RawBar:
+class _SlotsObject:
+    """使用 __slots__ 保存字段的对象基类
+
+    1. cache 在第一次使用时才创建，绝大多数没有缓存数据的对象不需要额外分配字典；
+    2. 通过 __dict__ 属性兼容按字典方式读取字段的代码，如 bar.__dict__；
+    3. 显式实现 __getstate__ / __setstate__，保证 pickle、deepcopy 正常工作。
+    """
+
+    __slots__ = ()
+
+    @property
+    def cache(self) -> dict:
+        """cache 用户缓存，第一次使用时创建"""
+        if self._cache is None:
+            self._cache = {}
+        return self._cache
+
+    @cache.setter
+    def cache(self, value: dict):
+        if isinstance(self._cache, IndicatorCache) and not isinstance(value, IndicatorCache):
+            # 整体替换缓存时，保留与 CZSC 指标列存储的关联
+            value = self._cache.rebind(value)
+        self._cache = value
+
+    @property
+    def __dict__(self):
+        res = {name: getattr(self, name) for name in self.__slots__ if name != "_cache"}
+        cache = self._cache if self._cache is not None else {}
+        # 指标列存储中的缓存转换为普通字典，保存的是当前时刻的快照
+        res["cache"] = dict(cache) if isinstance(cache, IndicatorCache) else cache
+        return res
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+@dataclass(init=False)
+class RawBar(_SlotsObject):
     """原始K线元素"""
 
+    __slots__ = ("symbol", "id", "dt", "freq", "open", "close", "high", "low", "vol", "amount", "_cache")
+
     symbol: str
     id: int  # id 必须是升序
     dt: datetime
@@ -41,7 +87,20 @@ class RawBar:
     low: float
     vol: float
     amount: float
-    cache: dict = field(default_factory=dict)  # cache 用户缓存，一个最常见的场景是缓存技术指标计算结果
+
+    def __init__(self, symbol: str, id: int, dt: datetime, freq: Freq, open: float, close: float,
+                 high: float, low: float, vol: float, amount: float, cache: dict = None):
+        self.symbol = symbol
+        self.id = id
+        self.dt = dt
+        self.freq = freq
+        self.open = open
+        self.close = close
+        self.high = high
+        self.low = low
+        self.vol = vol
+        self.amount = amount
+        self._cache = cache  # cache 用户缓存，一个最常见的场景是缓存技术指标计算结果
 
     @property
     def upper(self):
@@ -59,10 +118,106 @@ class RawBar:
         return abs(self.open - self.close)
 
 
-@dataclass
-class NewBar:
+class RawBarSeq:
+    """CZSC 内部的原始K线序列，只在尾部追加，NewBar.elements 通过 RawBarRange 引用其中连续的一段
+
+    下标是从 0 开始的绝对位置，移除头部K线后，剩余K线的下标保持不变。
+    """
+
+    __slots__ = ("bars", "offset")
+
+    def __init__(self):
+        self.bars = []
+        self.offset = 0     # bars[0] 的绝对位置
+
+    def __len__(self):
+        return self.offset + len(self.bars)
+
+    def __getitem__(self, i: int):
+        if i < self.offset:
+            raise IndexError(f"第 {i} 根原始K线已从 RawBarSeq 中移除")
+        return self.bars[i - self.offset]
+
+    def __setitem__(self, i: int, bar):
+        if i < self.offset:
+            raise IndexError(f"第 {i} 根原始K线已从 RawBarSeq 中移除")
+        self.bars[i - self.offset] = bar
+
+    def append(self, bar) -> int:
+        """追加一根K线，返回它的绝对位置"""
+        self.bars.append(bar)
+        return self.offset + len(self.bars) - 1
+
+    def range(self, start: int, end: int) -> "RawBarRange":
+        return RawBarRange(self, start, end)
+
+    def drop_before(self, i: int):
+        """不再需要绝对位置 i 之前的K线；被移除的部分超过一半时才真正删除，均摊成本为 O(1)"""
+        n = i - self.offset
+        if n > 0 and n * 2 >= len(self.bars):
+            del self.bars[:n]
+            self.offset = i
+
+
+class RawBarRange:
+    """NewBar.elements 的区间表示：RawBarSeq 中 [start, end) 区间的原始K线
+
+    支持 len、迭代、下标和切片访问，合并K线时只需要把 end 加一，不需要复制列表。
+    """
+
+    __slots__ = ("seq", "start", "end")
+
+    def __init__(self, seq: RawBarSeq, start: int, end: int):
+        self.seq = seq
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        seq = self.seq
+        if self.start < seq.offset:
+            raise IndexError(f"第 {self.start} 根原始K线已从 RawBarSeq 中移除")
+        return iter(seq.bars[self.start - seq.offset: self.end - seq.offset])
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.seq[self.start + i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("RawBarRange index out of range")
+        return self.seq[self.start + item]
+
+    def __eq__(self, other):
+        if isinstance(other, (RawBarRange, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def followed_by(self, bar) -> bool:
+        """bar 是否紧跟在区间之后"""
+        if self.end >= len(self.seq):
+            return False
+        x = self.seq[self.end]
+        return x is bar or x.dt == bar.dt
+
+    def extend(self) -> "RawBarRange":
+        """返回向后扩展一根K线的新区间"""
+        return RawBarRange(self.seq, self.start, self.end + 1)
+
+
+@dataclass(init=False)
+class NewBar(_SlotsObject):
     """去除包含关系后的K线元素"""
 
+    __slots__ = ("symbol", "id", "dt", "freq", "open", "close", "high", "low", "vol", "amount", "elements", "_cache")
+
     symbol: str
     id: int  # id 必须是升序
     dt: datetime
@@ -73,24 +228,50 @@ class NewBar:
     low: float
     vol: float
     amount: float
-    elements: List = field(default_factory=list)  # 存入具有包含关系的原始K线
-    cache: dict = field(default_factory=dict)  # cache 用户缓存
+    elements: List  # 存入具有包含关系的原始K线，CZSC 中是 RawBarRange，手动创建时也可以是 List[RawBar]
+
+    def __init__(self, symbol: str, id: int, dt: datetime, freq: Freq, open: float, close: float,
+                 high: float, low: float, vol: float, amount: float, elements: List = None, cache: dict = None):
+        self.symbol = symbol
+        self.id = id
+        self.dt = dt
+        self.freq = freq
+        self.open = open
+        self.close = close
+        self.high = high
+        self.low = low
+        self.vol = vol
+        self.amount = amount
+        self.elements = elements if elements is not None else []
+        self._cache = cache
 
     @property
-    def raw_bars(self):
-        return self.elements
+    def raw_bars(self) -> List[RawBar]:
+        return list(self.elements)
 
 
-@dataclass
-class FX:
+@dataclass(init=False)
+class FX(_SlotsObject):
+    __slots__ = ("symbol", "dt", "mark", "high", "low", "fx", "elements", "_cache")
+
     symbol: str
     dt: datetime
     mark: Mark
     high: float
     low: float
     fx: float
-    elements: List = field(default_factory=list)
-    cache: dict = field(default_factory=dict)  # cache 用户缓存
+    elements: List
+
+    def __init__(self, symbol: str, dt: datetime, mark: Mark, high: float, low: float, fx: float,
+                 elements: List = None, cache: dict = None):
+        self.symbol = symbol
+        self.dt = dt
+        self.mark = mark
+        self.high = high
+        self.low = low
+        self.fx = fx
+        self.elements = elements if elements is not None else []
+        self._cache = cache
 
     @property
     def new_bars(self):
@@ -196,6 +377,54 @@ def create_fake_bis(fxs: List[FX]) -> List[FakeBI]:
     return fake_bis
 
 
+class BIStats:
+    """笔的统计特征，在笔创建时一次性计算，BI 的相关属性直接读取这里的结果
+
+    raw_bars 是构成笔的原始K线（不含首尾两根无包含K线），power_volume 同样不含首尾两根，rsq 使用 NumPy 计算。
+    """
+
+    __slots__ = ("high", "low", "power_price", "power_volume", "raw_bars", "rsq", "hypotenuse", "angle")
+
+    def __init__(self, fx_a: "FX", fx_b: "FX", bars: List[NewBar]):
+        self.high = max(fx_a.high, fx_b.high)
+        self.low = min(fx_a.low, fx_b.low)
+        self.power_price = round(abs(fx_b.fx - fx_a.fx), 2)
+
+        inner = bars[1:-1]
+        self.raw_bars = self.__flatten(inner)
+        self.power_volume = sum([x.vol for x in inner])
+        self.rsq = RSQ(np.fromiter((x.close for x in self.raw_bars), dtype=np.double, count=len(self.raw_bars)))
+        self.hypotenuse = pow(pow(self.power_price, 2) + pow(len(self.raw_bars), 2), 1 / 2)
+        self.angle = round(math.asin(self.power_price / self.hypotenuse) * 180 / 3.14, 2) if self.hypotenuse else 0
+
+    @staticmethod
+    def __flatten(bars: List[NewBar]) -> List[RawBar]:
+        """展开 NewBar 列表中的原始K线
+
+        CZSC 中相邻 NewBar 的 elements 是同一个 RawBarSeq 上首尾相接的区间，这种情况下直接切一次即可。
+        """
+        if not bars:
+            return []
+        first = bars[0].elements
+        if isinstance(first, RawBarRange):
+            end = first.start
+            for bar in bars:
+                e = bar.elements
+                if not isinstance(e, RawBarRange) or e.seq is not first.seq or e.start != end:
+                    break
+                end = e.end
+            else:
+                return list(RawBarRange(first.seq, first.start, end))
+        return [x for bar in bars for x in bar.elements]
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
 @dataclass
 class BI:
     symbol: str
@@ -205,10 +434,12 @@ class BI:
     direction: Direction
     bars: List[NewBar] = field(default_factory=list)
     cache: dict = field(default_factory=dict)  # cache 用户缓存
+    stats: BIStats = field(init=False, repr=False, compare=False)  # 创建时计算的统计特征
 
     def __post_init__(self):
         self.sdt = self.fx_a.dt
         self.edt = self.fx_b.dt
+        self.stats = BIStats(self.fx_a, self.fx_b, self.bars)
 
     def __repr__(self):
         return (
@@ -247,7 +478,7 @@ class BI:
         value = cache.get(key, None)
 
         if not value:
-            value = single_linear([x.__dict__[price_key] for x in self.raw_bars])
+            value = single_linear([getattr(x, price_key) for x in self.raw_bars])
             cache[key] = value
             self.cache = cache
         return value
@@ -265,14 +496,11 @@ class BI:
 
     @property
     def high(self):
-        def __default():
-            return max(self.fx_a.high, self.fx_b.high)
-
-        return self.get_cache_with_default("high", __default)
+        return self.stats.high
 
     @property
     def low(self):
-        return min(self.fx_a.low, self.fx_b.low)
+        return self.stats.low
 
     @property
     def power(self):
@@ -281,12 +509,12 @@ class BI:
     @property
     def power_price(self):
         """价差力度"""
-        return round(abs(self.fx_b.fx - self.fx_a.fx), 2)
+        return self.stats.power_price
 
     @property
     def power_volume(self):
         """成交量力度"""
-        return sum([x.vol for x in self.bars[1:-1]])
+        return self.stats.power_volume
 
     @property
     def change(self):
@@ -302,30 +530,22 @@ class BI:
     @property
     def rsq(self):
         """笔的原始K线 close 单变量线性回归 r2"""
-        value = self.get_price_linear("close")
-        return round(value["r2"], 4)
+        return self.stats.rsq
 
     @property
     def raw_bars(self):
         """构成笔的原始K线序列"""
-
-        def __default():
-            value = []
-            for bar in self.bars[1:-1]:
-                value.extend(bar.raw_bars)
-            return value
-
-        return self.get_cache_with_default("raw_bars", __default)
+        return self.stats.raw_bars
 
     @property
     def hypotenuse(self):
         """笔的斜边长度"""
-        return pow(pow(self.power_price, 2) + pow(len(self.raw_bars), 2), 1 / 2)
+        return self.stats.hypotenuse
 
     @property
     def angle(self):
         """笔的斜边与竖直方向的夹角，角度越大，力度越大"""
-        return round(math.asin(self.power_price / self.hypotenuse) * 180 / 3.14, 2)
+        return self.stats.angle
 
 
 @dataclass
@@ -410,6 +630,69 @@ class ZS:
         )
 
 
+class SignalsFrame:
+    """信号 DataFrame 的分类编码，用于 Signal / Factor / Event / Position 的 match_frame 向量化匹配
+
+    每个信号列只做一次分类编码，每个不同的信号值只解析一次，单个信号的匹配结果按信号缓存；
+    多个事件匹配同一个 DataFrame 时，可以共用一个 SignalsFrame 对象。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.__columns = {}
+        self.__signals = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def column(self, key: str):
+        """获取信号列的编码：每行的分类编号，以及每个分类的 v1, v2, v3, score"""
+        col = self.__columns.get(key)
+        if col is None:
+            if key not in self.df.columns:
+                raise ValueError(f"{key} 不在信号列表中")
+            codes, uniques = pd.factorize(self.df[key])
+            if (codes < 0).any() or any(not v for v in uniques):
+                raise ValueError(f"{key} 不在信号列表中")
+
+            parts = [v.split("_") for v in uniques]
+            if any(len(x) != 4 for x in parts):
+                raise ValueError(f"{key} 的信号值格式错误，应为 v1_v2_v3_score")
+            v1, v2, v3, score = zip(*parts) if parts else ((), (), (), ())
+            col = self.__columns[key] = (codes, np.array(v1, dtype=object), np.array(v2, dtype=object),
+                                         np.array(v3, dtype=object), np.array([int(x) for x in score], dtype=np.int64))
+        return col
+
+    def signal(self, signal: "Signal") -> np.ndarray:
+        """单个信号在每一行上的匹配结果，与 Signal.is_match 一致"""
+        mask = self.__signals.get(signal.signal)
+        if mask is None:
+            codes, v1, v2, v3, score = self.column(signal.key)
+            m = score >= signal.score
+            if signal.v1 != "任意":
+                m &= v1 == signal.v1
+            if signal.v2 != "任意":
+                m &= v2 == signal.v2
+            if signal.v3 != "任意":
+                m &= v3 == signal.v3
+            mask = self.__signals[signal.signal] = m[codes]
+        return mask
+
+    def all(self, signals: List["Signal"]) -> np.ndarray:
+        """全部信号都满足，signals 为空时全部为 True"""
+        mask = np.ones(len(self.df), dtype=bool)
+        for signal in signals or []:
+            mask &= self.signal(signal)
+        return mask
+
+    def any(self, signals: List["Signal"]) -> np.ndarray:
+        """任一信号满足，signals 为空时全部为 False"""
+        mask = np.zeros(len(self.df), dtype=bool)
+        for signal in signals or []:
+            mask |= self.signal(signal)
+        return mask
+
+
 @dataclass
 class Signal:
     signal: str = ""
@@ -551,6 +834,20 @@ class Factor:
                 return True
         return False
 
+    def match_frame(self, df: Union[pd.DataFrame, SignalsFrame]) -> np.ndarray:
+        """在信号 DataFrame 的每一行上判断 factor 是否满足，结果与逐行调用 is_match 一致
+
+        与 is_match 不同，所有信号都会参与计算，用到的信号列缺失或有空值时抛出 ValueError
+
+        :param df: 信号 DataFrame，每行是一个信号字典；也可以传入 SignalsFrame 对象
+        :return: 每一行是否满足
+        """
+        frame = df if isinstance(df, SignalsFrame) else SignalsFrame(df)
+        mask = frame.all(self.signals_all) & ~frame.any(self.signals_not)
+        if self.signals_any:
+            mask &= frame.any(self.signals_any)
+        return mask
+
     def dump(self) -> dict:
         """将 Factor 对象转存为 dict"""
         signals_all = [x.signal for x in self.signals_all]
@@ -671,6 +968,27 @@ class Event:
 
         return False, None
 
+    def match_frame(self, df: Union[pd.DataFrame, SignalsFrame]):
+        """在信号 DataFrame 的每一行上判断 event 是否满足，结果与逐行调用 is_match 一致
+
+        与 is_match 不同，所有信号都会参与计算，用到的信号列缺失或有空值时抛出 ValueError
+
+        :param df: 信号 DataFrame，每行是一个信号字典；也可以传入 SignalsFrame 对象，多个事件共用编码结果
+        :return: (每一行是否满足, 每一行第一个满足的因子名称，不满足时为 None)
+        """
+        frame = df if isinstance(df, SignalsFrame) else SignalsFrame(df)
+        mask = frame.all(self.signals_all) & ~frame.any(self.signals_not)
+        if self.signals_any:
+            mask &= frame.any(self.signals_any)
+
+        names = np.full(len(frame), None, dtype=object)
+        rest = mask.copy()
+        for factor in self.factors:
+            m = rest & factor.match_frame(frame)
+            names[m] = factor.name
+            rest &= ~m
+        return mask & ~rest, names
+
     def dump(self) -> dict:
         """将 Event 对象转存为 dict"""
         signals_all = [x.signal for x in self.signals_all] if self.signals_all else []
@@ -721,28 +1039,264 @@ class Event:
         return e
 
 
-def cal_break_even_point(seq: List[float]) -> float:
+class EventMatcher:
+    """事件匹配器：把一组 Event 编译成整数编码的判断条件，匹配结果与逐个调用 Event.is_match 一致
+
+    1. 信号名称按出现顺序编号；信号值 v1 / v2 / v3 中出现的字符串编码为整数，任意 编码为 -1；
+    2. 每个不同的信号值字符串只解析一次，解析结果 (v1, v2, v3, score) 按字符串缓存；
+    3. 每次匹配时，每个信号名称只在第一次用到时从信号字典中取值，之后的判断只做整数比较，并且保留短路求值。
+
+    >>> matcher = EventMatcher(position.events)
+    >>> i, factor_name = matcher.match(s)       # 第一个满足的事件序号，以及该事件中第一个满足的因子名称
+    """
+
+    def __init__(self, events: List[Event]):
+        self.events = events
+        self.keys = []          # 信号名称，下标为信号名称编号
+        self.vocab = {}         # 信号值中的字符串 -> 整数编码
+        self.__parsed = {}      # 信号值字符串 -> (v1, v2, v3, score) 编码
+        key_index = {}
+
+        def _signal(signal: Signal):
+            if signal.key not in key_index:
+                key_index[signal.key] = len(self.keys)
+                self.keys.append(signal.key)
+            codes = [-1 if v == "任意" else self.vocab.setdefault(v, len(self.vocab))
+                     for v in (signal.v1, signal.v2, signal.v3)]
+            return (key_index[signal.key], *codes, signal.score)
+
+        def _signals(signals: List[Signal]):
+            return tuple(_signal(x) for x in signals) if signals else ()
+
+        self.__events = [
+            (_signals(e.signals_not), _signals(e.signals_all), _signals(e.signals_any),
+             tuple((_signals(f.signals_not), _signals(f.signals_all), _signals(f.signals_any), f.name)
+                   for f in e.factors))
+            for e in events
+        ]
+
+    def __repr__(self):
+        return f"<EventMatcher~{len(self.events)} events, {len(self.keys)} keys>"
+
+    def __parse(self, s: dict, k: int, values: list):
+        """解析信号字典中编号为 k 的信号值，保存在 values 中"""
+        key = self.keys[k]
+        v = s.get(key, None)
+        if not v:
+            raise ValueError(f"{key} 不在信号列表中")
+
+        p = self.__parsed.get(v)
+        if p is None:
+            v1, v2, v3, score = v.split("_")
+            vocab = self.vocab
+            p = (vocab.get(v1, -2), vocab.get(v2, -2), vocab.get(v3, -2), int(score))
+            if len(self.__parsed) > 100000:
+                self.__parsed.clear()
+            self.__parsed[v] = p
+        values[k] = p
+        return p
+
+    def __is_match(self, sig: tuple, s: dict, values: list) -> bool:
+        k, c1, c2, c3, score = sig
+        p = values[k] or self.__parse(s, k, values)
+        return p[3] >= score and (c1 < 0 or p[0] == c1) and (c2 < 0 or p[1] == c2) and (c3 < 0 or p[2] == c3)
+
+    def __any(self, sigs: tuple, s: dict, values: list) -> bool:
+        for sig in sigs:
+            if self.__is_match(sig, s, values):
+                return True
+        return False
+
+    def __all(self, sigs: tuple, s: dict, values: list) -> bool:
+        for sig in sigs:
+            if not self.__is_match(sig, s, values):
+                return False
+        return True
+
+    def __match_event(self, event: tuple, s: dict, values: list):
+        """与 Event.is_match 的判断顺序一致，满足时返回因子名称，否则返回 None"""
+        sigs_not, sigs_all, sigs_any, factors = event
+        if self.__any(sigs_not, s, values) or not self.__all(sigs_all, s, values):
+            return None
+        if sigs_any and not self.__any(sigs_any, s, values):
+            return None
+
+        for f_not, f_all, f_any, name in factors:
+            if self.__any(f_not, s, values) or not self.__all(f_all, s, values):
+                continue
+            if f_any and not self.__any(f_any, s, values):
+                continue
+            return name
+        return None
+
+    def match(self, s: dict):
+        """按顺序匹配事件，返回第一个满足的事件序号和因子名称；都不满足时返回 (-1, None)
+
+        :param s: 信号字典
+        :return: (事件序号, 因子名称)
+        """
+        values = [None] * len(self.keys)
+        for i, event in enumerate(self.__events):
+            name = self.__match_event(event, s, values)
+            if name is not None:
+                return i, name
+        return -1, None
+
+    def is_match(self, s: dict) -> List[tuple]:
+        """匹配全部事件，结果与 [event.is_match(s) for event in self.events] 一致
+
+        :param s: 信号字典
+        :return: 每个事件的 (是否满足, 因子名称)
+        """
+        values = [None] * len(self.keys)
+        res = []
+        for event in self.__events:
+            name = self.__match_event(event, s, values)
+            res.append((name is not None, name))
+        return res
+
+
+def cal_break_even_point(seq: List[float], weights: List[int] = None) -> float:
     """计算单笔收益序列的盈亏平衡点
 
+    收益按二进制浮点数的精确值换算成整数后累加，没有浮点累加误差，
+    因此按 weights 加权计算的结果与把 seq[i] 重复 weights[i] 次后计算的结果严格一致。
+
     :param seq: 单笔收益序列
+    :param weights: 每个收益重复的次数，默认 None 表示都是 1
     :return: 盈亏平衡点
     """
-    if len(seq) <= 0 or sum(seq) < 0:
+    if weights is None:
+        weights = [1] * len(seq)
+    total = sum(weights)
+    if total <= 0:
+        return 1.0
+
+    # 浮点数的分母都是 2 的幂，统一到最大的分母后，所有收益都是精确的整数
+    ratios = [float(x).as_integer_ratio() for x in seq]
+    den = max(d for _, d in ratios)
+    seq = [n * (den // d) for n, d in ratios]
+    if sum(s_ * w_ for s_, w_ in zip(seq, weights)) < 0:
         return 1.0
 
-    seq = sorted(seq)
     sub_ = 0
     sub_i = 0
-    for i, s_ in enumerate(seq):
-        sub_ += s_
-        sub_i = i + 1
+    for s_, w_ in sorted(zip(seq, weights), key=lambda x: x[0]):
+        if s_ >= 0 and sub_ + s_ * w_ >= 0:
+            # 在这一组内累计收益转正，只需要其中的前 k 笔，k = ceil(-sub_ / s_)
+            sub_i += 1 if sub_ + s_ >= 0 else -(sub_ // s_)
+            break
+        sub_ += s_ * w_
+        sub_i += w_
         if sub_ >= 0:
             break
 
-    return sub_i / len(seq)
+    return sub_i / total
+
+
+class _RecordBuffer:
+    """按列存储、按行追加的 numpy 数组缓冲区
+
+    1. 每列是一个定长的 numpy 数组，容量不足时倍增，追加一行只需要写入各列；
+    2. 扩容时总是分配新数组，已经通过 column 返回的数组视图不会被后续写入修改；
+    3. 设置 max_size 后最多保留最近 max_size 行，超出部分在扩容时丢弃。
+    """
+
+    def __init__(self, dtypes: Dict[str, str], max_size: int = None, capacity: int = 256):
+        assert max_size is None or max_size > 0, "max_size 必须大于 0"
+        self.max_size = max_size
+        self.capacity = capacity if not max_size else min(capacity, 2 * max_size)
+        self.arrays = {k: np.empty(self.capacity, dtype=v) for k, v in dtypes.items()}
+        self.end = 0  # 已经写入的行数，有效数据为 [start, end)
+
+    @property
+    def start(self) -> int:
+        return max(0, self.end - self.max_size) if self.max_size else 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def append(self, *values):
+        if self.end == self.capacity:
+            self.__reserve()
+        for arr, v in zip(self.arrays.values(), values):
+            arr[self.end] = v
+        self.end += 1
+
+    def __reserve(self):
+        start, n = self.start, len(self)
+        capacity = max(2 * n, 256)
+        if self.max_size:
+            capacity = min(capacity, 2 * self.max_size)
+        for k, arr in self.arrays.items():
+            new = np.empty(capacity, dtype=arr.dtype)
+            new[:n] = arr[start: self.end]
+            self.arrays[k] = new
+        self.capacity, self.end = capacity, n
+
+    def column(self, key: str) -> np.ndarray:
+        """返回有效数据的只读数组视图"""
+        res = self.arrays[key][self.start: self.end]
+        res.flags.writeable = False
+        return res
+
+    def row(self, i: int) -> tuple:
+        """返回第 i 行（支持负数下标）的 Python 标量元组"""
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("record index out of range")
+        return tuple(arr[self.start + i].item() for arr in self.arrays.values())
+
+
+class _OperatesView(Sequence):
+    """Position.operates 的只读视图，按下标取出的每条操作记录都是字典，与原来的操作列表兼容"""
+
+    def __init__(self, position: "Position"):
+        self.position = position
+
+    def __len__(self):
+        return len(self.position._operates)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        pos = self.position
+        dt, bid, price, op, desc, p = pos._operates.row(i)
+        return {
+            "symbol": pos.symbol,
+            "dt": pos._to_timestamp(dt),
+            "bid": bid,
+            "price": price,
+            "op": Position.OPERATES[op],
+            "op_desc": pos._op_descs[desc],
+            "pos": p,
+        }
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为 DataFrame，列与原来的 pd.DataFrame(operates) 一致"""
+        pos = self.position
+        buf = pos._operates
+        return pd.DataFrame({
+            "symbol": pos.symbol,
+            "dt": pos._to_datetime(buf.column("dt")),
+            "bid": buf.column("bid"),
+            "price": buf.column("price"),
+            "op": np.array(Position.OPERATES, dtype=object)[buf.column("op")],
+            "op_desc": np.array(pos._op_descs, dtype=object)[buf.column("op_desc")],
+            "pos": buf.column("pos"),
+        }, index=pd.RangeIndex(len(buf)), copy=False)
 
 
 class Position:
+    # 操作记录中 op 列的编码
+    OPERATES = [Operate.LO, Operate.LE, Operate.SO, Operate.SE]
+
     def __init__(
         self,
         symbol: str,
@@ -753,6 +1307,7 @@ class Position:
         stop_loss=1000,
         T0: bool = False,
         name=None,
+        max_records: int = None,
     ):
         """简单持仓对象，仓位表达：1 持有多头，-1 持有空头，0 空仓
 
@@ -765,6 +1320,8 @@ class Position:
         :param stop_loss: 最大允许亏损比例，单位：BP， 1BP = 0.01%；成本的计算以最近一个开仓事件触发价格为准
         :param T0: 是否允许T0交易，默认为 False 表示不允许T0交易
         :param name: 仓位名称，默认值为第一个开仓事件的名称
+        :param max_records: 内存中最多保留的持仓状态和操作记录数量，默认 None 表示全部保留；
+                实盘长期运行时可以设置，超出的早期记录会被丢弃，holds / operates / pairs 只包含保留的记录
         """
         assert name, "name 是必须的参数"
         self.symbol = symbol
@@ -781,8 +1338,8 @@ class Position:
         self.T0 = T0
 
         self.pos_changed = False  # 仓位是否发生变化
-        self.operates = []  # 事件触发的操作列表
-        self.holds = []  # 持仓状态列表
+        self.max_records = max_records
+        self.__init_records()
         self.pos = 0
 
         # 辅助判断的缓存数据
@@ -803,6 +1360,71 @@ class Position:
             f"timeout={self.timeout}, stop_loss={self.stop_loss}BP, T0={self.T0}, interval={self.interval}s)"
         )
 
+    def __init_records(self):
+        """初始化持仓状态和操作记录的列式缓冲区，时间统一保存为 int64 纳秒"""
+        self._holds = _RecordBuffer({"dt": "int64", "pos": "int8", "price": "float64"}, self.max_records)
+        self._operates = _RecordBuffer(
+            {"dt": "int64", "bid": "int64", "price": "float64", "op": "int8", "op_desc": "int32", "pos": "int8"},
+            self.max_records,
+        )
+        self._op_descs = []  # 操作描述字符串表，操作记录中只保存下标
+        self._op_desc_codes = {}
+        self._dt_tz = None  # 传入信号 dt 的时区
+
+    def __setstate__(self, state):
+        # 兼容旧版本中 holds / operates 以字典列表保存的序列化对象
+        holds, operates = state.pop("holds", None), state.pop("operates", None)
+        self.__dict__.update(state)
+        if holds is not None:
+            self.max_records = None
+            self.__init_records()
+            for x in operates:
+                self._add_operate(x["dt"], x["bid"], x["price"], x["op"], x["op_desc"], x["pos"])
+            for x in holds:
+                self._holds.append(self._to_ns(x["dt"]), x["pos"], x["price"])
+
+    def _to_ns(self, dt) -> int:
+        dt = pd.Timestamp(dt)
+        self._dt_tz = dt.tz
+        return dt.value
+
+    def _to_timestamp(self, ns: int) -> pd.Timestamp:
+        return pd.Timestamp(ns, tz=self._dt_tz)
+
+    def _to_datetime(self, ns: np.ndarray):
+        dt = ns.view("datetime64[ns]")
+        if self._dt_tz is not None:
+            dt = pd.DatetimeIndex(dt).tz_localize("UTC").tz_convert(self._dt_tz)
+        return dt
+
+    def _add_operate(self, dt, bid, price, op, op_desc, pos):
+        code = self._op_desc_codes.get(op_desc)
+        if code is None:
+            code = self._op_desc_codes[op_desc] = len(self._op_descs)
+            self._op_descs.append(op_desc)
+        self._operates.append(self._to_ns(dt), bid, price, self.OPERATES.index(op), code, pos)
+
+    @property
+    def operates(self) -> _OperatesView:
+        """事件触发的操作列表
+
+        按下标取出的每条记录都是字典，键为 symbol, dt, bid, price, op, op_desc, pos；
+        内部按列保存，需要整体分析时使用 self.operates.to_dataframe()
+        """
+        return _OperatesView(self)
+
+    @property
+    def holds(self) -> pd.DataFrame:
+        """持仓状态，列为 dt, pos, price，每次传入信号记录一行
+
+        数值列是内部数组的只读零拷贝视图，需要原地修改时先调用 .copy()
+        """
+        buf = self._holds
+        return pd.DataFrame(
+            {"dt": self._to_datetime(buf.column("dt")), "pos": buf.column("pos"), "price": buf.column("price")},
+            copy=False,
+        )
+
     @property
     def unique_signals(self) -> List[str]:
         """获取所有事件的唯一信号列表"""
@@ -817,6 +1439,31 @@ class Position:
 
         return get_signals_config(self.unique_signals, signals_module)
 
+    def match_frame(self, df: Union[pd.DataFrame, SignalsFrame]):
+        """在信号 DataFrame 的每一行上按顺序匹配 self.events，结果与逐行调用 self.matcher.match 一致
+
+        :param df: 信号 DataFrame，每行是一个信号字典；也可以传入 SignalsFrame 对象
+        :return: (每一行第一个满足的事件序号，都不满足时为 -1, 该事件中第一个满足的因子名称，都不满足时为 None)
+        """
+        frame = df if isinstance(df, SignalsFrame) else SignalsFrame(df)
+        index = np.full(len(frame), -1, dtype=np.int64)
+        names = np.full(len(frame), None, dtype=object)
+        for i, event in enumerate(self.events):
+            m, f = event.match_frame(frame)
+            m &= index < 0
+            index[m] = i
+            names[m] = f[m]
+        return index, names
+
+    @property
+    def matcher(self) -> EventMatcher:
+        """self.events 编译后的事件匹配器，self.events 被替换或增删事件时重新编译"""
+        matcher = getattr(self, "_matcher", None)
+        if matcher is None or matcher.events is not self.events or self._matcher_len != len(self.events):
+            self._matcher = matcher = EventMatcher(self.events)
+            self._matcher_len = len(self.events)
+        return matcher
+
     def dump(self, with_data=False):
         """将对象转换为 dict"""
         raw = {
@@ -830,7 +1477,7 @@ class Position:
             "T0": self.T0,
         }
         if with_data:
-            raw.update({"pairs": self.pairs, "holds": self.holds})
+            raw.update({"pairs": self.pairs.to_dict("records"), "holds": self.holds.to_dict("records")})
         return raw
 
     @classmethod
@@ -853,10 +1500,10 @@ class Position:
         return pos
 
     @property
-    def pairs(self):
-        """开平交易列表
+    def pairs(self) -> pd.DataFrame:
+        """开平交易列表，由 self.operates 中每个开仓操作与紧随其后的操作配对得到
 
-        返回样例：
+        返回样例（to_dict("records") 之后）：
 
         [{'标的代码': '000001.SH',
           '交易方向': '多头',
@@ -885,33 +1532,36 @@ class Position:
         2. 持仓天数，单位是 自然日
         3. 持仓K线数，指基础周期K线数量
         """
-        pairs = []
-
-        for op1, op2 in zip(self.operates, self.operates[1:]):
-            if op1["op"] not in [Operate.LO, Operate.SO]:
-                continue
-
-            ykr = (
-                op2["price"] / op1["price"] - 1
-                if op1["op"] == Operate.LO
-                else 1 - op2["price"] / op1["price"]
-            )
-            pair = {
-                "标的代码": self.symbol,
-                "策略标记": self.name,
-                "交易方向": "多头" if op1["op"] == Operate.LO else "空头",
-                "开仓时间": op1["dt"],
-                "平仓时间": op2["dt"],
-                "开仓价格": op1["price"],
-                "平仓价格": op2["price"],
-                "持仓K线数": op2["bid"] - op1["bid"],
-                "事件序列": f"{op1['op_desc']} -> {op2['op_desc']}",
-                "持仓天数": (op2["dt"] - op1["dt"]).total_seconds() / (24 * 3600),
-                "盈亏比例": round(ykr * 10000, 2),  # 盈亏比例 转换成以 BP 为单位的收益，1BP = 0.0001
-            }
-            pairs.append(pair)
-
-        return pairs
+        return self._get_pairs(self.operates.to_dataframe())
+
+    def _get_pairs(self, dfo: pd.DataFrame) -> pd.DataFrame:
+        """由操作记录 DataFrame 生成开平交易 DataFrame"""
+        columns = ["标的代码", "策略标记", "交易方向", "开仓时间", "平仓时间", "开仓价格", "平仓价格",
+                   "持仓K线数", "事件序列", "持仓天数", "盈亏比例"]
+        is_open = dfo["op"].isin([Operate.LO, Operate.SO]).to_numpy()[:-1]
+        if not is_open.any():
+            return pd.DataFrame(columns=columns)
+
+        o1 = dfo.iloc[:-1][is_open].reset_index(drop=True)
+        o2 = dfo.iloc[1:][is_open].reset_index(drop=True)
+        is_long = (o1["op"] == Operate.LO).to_numpy()
+        p1, p2 = o1["price"].to_numpy(dtype=np.float64), o2["price"].to_numpy(dtype=np.float64)
+        ykr = np.where(is_long, p2 / p1 - 1, 1 - p2 / p1)
+        dt1, dt2 = pd.to_datetime(o1["dt"]), pd.to_datetime(o2["dt"])
+        pairs = pd.DataFrame({
+            "标的代码": self.symbol,
+            "策略标记": self.name,
+            "交易方向": np.where(is_long, "多头", "空头"),
+            "开仓时间": dt1,
+            "平仓时间": dt2,
+            "开仓价格": p1,
+            "平仓价格": p2,
+            "持仓K线数": o2["bid"] - o1["bid"],
+            "事件序列": o1["op_desc"] + " -> " + o2["op_desc"],
+            "持仓天数": (dt2 - dt1).dt.total_seconds() / (24 * 3600),
+            "盈亏比例": [round(x * 10000, 2) for x in ykr.tolist()],  # 盈亏比例 转换成以 BP 为单位的收益，1BP = 0.0001
+        })
+        return pairs[columns]
 
     def evaluate_holds(self, trade_dir: str = "多空") -> dict:
         """按持仓信号评估交易表现
@@ -919,12 +1569,11 @@ class Position:
         :param trade_dir: 交易方向，可选值 ['多头', '空头', '多空']
         :return: 交易表现
         """
-        holds = deepcopy(self.holds)
+        dfh = self.holds
         if trade_dir != "多空":
             _OD = 1 if trade_dir == "多头" else -1
-            for hold in holds:
-                if hold["pos"] != 0 and hold["pos"] != _OD:
-                    hold["pos"] = 0
+            # 整列替换，不修改 self.holds 背后的数组
+            dfh["pos"] = np.where(dfh["pos"] == _OD, dfh["pos"], 0)
 
         p = {
             "交易标的": self.symbol,
@@ -940,12 +1589,11 @@ class Position:
             "日胜率": 0,
         }
 
-        if len(holds) == 0 or all(x["pos"] == 0 for x in holds):
+        if len(dfh) == 0 or (dfh["pos"] == 0).all():
             return p
 
-        dfh = pd.DataFrame(holds)
         dfh["n1b"] = (dfh["price"].shift(-1) - dfh["price"]) / dfh["price"]
-        dfh["trade_date"] = dfh["dt"].apply(lambda x: x.strftime("%Y-%m-%d"))
+        dfh["trade_date"] = dfh["dt"].dt.normalize()
         dfh["edge"] = dfh["n1b"] * dfh["pos"]  # 持有下一根K线的边际收益
 
         # 按日期聚合
@@ -996,7 +1644,8 @@ class Position:
 
         - 首先，检查最新信号的时间是否在上次信号之前，如果是则打印警告信息并返回。
         - 初始化一些变量，包括操作类型（op）和操作描述（op_desc）。
-        - 遍历所有的事件，检查是否与最新信号匹配。如果匹配，则记录操作类型和操作描述，并跳出循环。
+        - 遍历所有的事件，检查是否与最新信号匹配。如果匹配，则记录操作类型和操作描述，并跳出循环；
+          匹配通过 self.matcher（参见 EventMatcher）执行，结果与逐个调用 Event.is_match 一致。
         - 提取最新信号的相关信息，包括交易对符号、时间、价格和成交量。
         - 更新持仓状态的结束时间为最新信号的时间。
         - 如果操作类型是开仓（LO或SO），更新最后一个事件的信息。
@@ -1027,14 +1676,13 @@ class Position:
         self.pos_changed = False
         op = Operate.HO
         op_desc = ""
-        for event in self.events:
-            m, f = event.is_match(s)
-            if m:
-                op = event.operate
-                op_desc = f"{event.name}@{f}"
-                break
+        i, f = self.matcher.match(s)
+        if i >= 0:
+            event = self.events[i]
+            op = event.operate
+            op_desc = f"{event.name}@{f}"
 
-        symbol, dt, price, bid = s["symbol"], s["dt"], s["close"], s["id"]
+        dt, price, bid = s["dt"], s["close"], s["id"]
         self.end_dt = dt
 
         # 当有新的开仓 event 发生，更新 last_event
@@ -1049,15 +1697,7 @@ class Position:
 
         def __create_operate(_op, _op_desc):
             self.pos_changed = True
-            return {
-                "symbol": symbol,
-                "dt": dt,
-                "bid": bid,
-                "price": price,
-                "op": _op,
-                "op_desc": _op_desc,
-                "pos": self.pos,
-            }
+            self._add_operate(dt, bid, price, _op, _op_desc, self.pos)
 
         # 更新仓位
         if op == Operate.LO:
@@ -1067,13 +1707,13 @@ class Position:
             ):
                 # 与前一次开多间隔时间大于 interval，直接开多
                 self.pos = 1
-                self.operates.append(__create_operate(Operate.LO, op_desc))
+                __create_operate(Operate.LO, op_desc)
                 self.last_lo_dt = dt
             else:
                 # 与前一次开多间隔时间小于 interval，仅对空头平仓
                 if self.pos == -1 and (self.T0 or dt.date() != self.last_so_dt.date()):
                     self.pos = 0
-                    self.operates.append(__create_operate(Operate.SE, op_desc))
+                    __create_operate(Operate.SE, op_desc)
 
         if op == Operate.SO:
             if self.pos != -1 and (
@@ -1082,13 +1722,13 @@ class Position:
             ):
                 # 与前一次开空间隔时间大于 interval，直接开空
                 self.pos = -1
-                self.operates.append(__create_operate(Operate.SO, op_desc))
+                __create_operate(Operate.SO, op_desc)
                 self.last_so_dt = dt
             else:
                 # 与前一次开空间隔时间小于 interval，仅对多头平仓
                 if self.pos == 1 and (self.T0 or dt.date() != self.last_lo_dt.date()):
                     self.pos = 0
-                    self.operates.append(__create_operate(Operate.LE, op_desc))
+                    __create_operate(Operate.LE, op_desc)
 
         # 多头出场
         if self.pos == 1 and (self.T0 or dt.date() != self.last_lo_dt.date()):
@@ -1097,21 +1737,17 @@ class Position:
             # 多头平仓
             if op == Operate.LE:
                 self.pos = 0
-                self.operates.append(__create_operate(Operate.LE, op_desc))
+                __create_operate(Operate.LE, op_desc)
 
             # 多头止损
             if price / self.last_event["price"] - 1 < -self.stop_loss / 10000:
                 self.pos = 0
-                self.operates.append(
-                    __create_operate(Operate.LE, f"平多@{self.stop_loss}BP止损")
-                )
+                __create_operate(Operate.LE, f"平多@{self.stop_loss}BP止损")
 
             # 多头超时
             if bid - self.last_event["bid"] > self.timeout:
                 self.pos = 0
-                self.operates.append(
-                    __create_operate(Operate.LE, f"平多@{self.timeout}K超时")
-                )
+                __create_operate(Operate.LE, f"平多@{self.timeout}K超时")
 
         # 空头出场
         if self.pos == -1 and (self.T0 or dt.date() != self.last_so_dt.date()):
@@ -1120,20 +1756,124 @@ class Position:
             # 空头平仓
             if op == Operate.SE:
                 self.pos = 0
-                self.operates.append(__create_operate(Operate.SE, op_desc))
+                __create_operate(Operate.SE, op_desc)
 
             # 空头止损
             if 1 - price / self.last_event["price"] < -self.stop_loss / 10000:
                 self.pos = 0
-                self.operates.append(
-                    __create_operate(Operate.SE, f"平空@{self.stop_loss}BP止损")
-                )
+                __create_operate(Operate.SE, f"平空@{self.stop_loss}BP止损")
 
             # 空头超时
             if bid - self.last_event["bid"] > self.timeout:
                 self.pos = 0
-                self.operates.append(
-                    __create_operate(Operate.SE, f"平空@{self.timeout}K超时")
-                )
+                __create_operate(Operate.SE, f"平空@{self.timeout}K超时")
+
+        self._holds.append(self._to_ns(dt), self.pos, price)
+
+    def simulate(self, df: pd.DataFrame, match=None) -> dict:
+        """在信号 DataFrame 上批量回放持仓状态，结果与新建 Position 后逐行调用 update 一致，不改变当前对象的状态
+
+        事件匹配使用 match_frame 一次完成，状态机只在整数和浮点数组上循环，只在仓位变化时记录操作，不为每根K线创建字典
+
+        :param df: 信号 DataFrame，必须包含 symbol, dt, id, close 列，以及事件用到的信号列，按 dt 升序
+        :param match: 预先计算的 self.match_frame(df) 结果，默认 None，在函数内计算
+        :return: 字典，包含：
+
+            - holds: 持仓状态 DataFrame，列为 dt, pos, price，与 update 后的 self.holds 一致
+            - operates: 操作 DataFrame，与 update 后的 self.operates 一致
+            - pairs: 开平交易 DataFrame，与 update 后的 self.pairs 一致
+        """
+        index, names = match if match is not None else self.match_frame(df)
+        n = len(df)
+        dts = pd.to_datetime(df["dt"])
+        local = dts.dt.tz_localize(None) if dts.dt.tz is not None else dts
+        ns = local.values.astype("datetime64[ns]").astype(np.int64)
+        days = ns // (24 * 3600 * 10**9)
+        prices = df["close"].to_numpy(dtype=np.float64)
+        bids = df["id"].to_numpy()
+
+        # 事件操作编码：0 - 无事件，1 - 开多，2 - 开空，3 - 平多，4 - 平空
+        codes = {Operate.LO: 1, Operate.SO: 2, Operate.LE: 3, Operate.SE: 4}
+        event_ops = np.array([codes[e.operate] for e in self.events] + [0], dtype=np.int8)
+        ops = event_ops[index].tolist()     # index 为 -1 时取到最后的 0
+        ns_, days_, prices_, bids_ = ns.tolist(), days.tolist(), prices.tolist(), bids.tolist()
+
+        T0, interval, timeout = self.T0, self.interval, self.timeout
+        sl = -self.stop_loss / 10000
+        sl_desc_l, sl_desc_s = f"平多@{self.stop_loss}BP止损", f"平空@{self.stop_loss}BP止损"
+        to_desc_l, to_desc_s = f"平多@{self.timeout}K超时", f"平空@{self.timeout}K超时"
+
+        pos = 0
+        end_ns = None
+        lo_ns = lo_day = so_ns = so_day = None
+        ev_price = ev_bid = None
+        holds_pos = np.zeros(n, dtype=np.int8)
+        valid = np.ones(n, dtype=bool)
+        records = []        # (行号, 操作编码, 操作描述, 操作后仓位)
+
+        for i in range(n):
+            if end_ns is not None and ns_[i] <= end_ns:
+                valid[i] = False
+                continue
 
-        self.holds.append({"dt": self.end_dt, "pos": self.pos, "price": price})
+            op, t, day, price, bid = ops[i], ns_[i], days_[i], prices_[i], bids_[i]
+            end_ns = t
+            desc = f"{self.events[index[i]].name}@{names[i]}" if op else ""
+            if op == 1 or op == 2:
+                ev_price, ev_bid = price, bid
+
+            if op == 1:
+                if pos != 1 and (lo_ns is None or (t - lo_ns) / 1e9 > interval):
+                    pos = 1
+                    records.append((i, 1, desc, pos))
+                    lo_ns, lo_day = t, day
+                elif pos == -1 and (T0 or day != so_day):
+                    pos = 0
+                    records.append((i, 4, desc, pos))
+
+            if op == 2:
+                if pos != -1 and (so_ns is None or (t - so_ns) / 1e9 > interval):
+                    pos = -1
+                    records.append((i, 2, desc, pos))
+                    so_ns, so_day = t, day
+                elif pos == 1 and (T0 or day != lo_day):
+                    pos = 0
+                    records.append((i, 3, desc, pos))
+
+            if pos == 1 and (T0 or day != lo_day):
+                if op == 3:
+                    pos = 0
+                    records.append((i, 3, desc, pos))
+                if price / ev_price - 1 < sl:
+                    pos = 0
+                    records.append((i, 3, sl_desc_l, pos))
+                if bid - ev_bid > timeout:
+                    pos = 0
+                    records.append((i, 3, to_desc_l, pos))
+
+            if pos == -1 and (T0 or day != so_day):
+                if op == 4:
+                    pos = 0
+                    records.append((i, 4, desc, pos))
+                if 1 - price / ev_price < sl:
+                    pos = 0
+                    records.append((i, 4, sl_desc_s, pos))
+                if bid - ev_bid > timeout:
+                    pos = 0
+                    records.append((i, 4, to_desc_s, pos))
+
+            holds_pos[i] = pos
+
+        if not valid.all():
+            logger.warning(f"{self.name} 有 {n - valid.sum()} 行信号的时间不晚于上一行，已跳过")
+
+        holds = pd.DataFrame({"dt": df["dt"].to_numpy()[valid], "pos": holds_pos[valid], "price": prices[valid]})
+
+        op_map = {1: Operate.LO, 2: Operate.SO, 3: Operate.LE, 4: Operate.SE}
+        rows = [r[0] for r in records]
+        symbols, raw_dts = df["symbol"].iloc[rows].tolist(), df["dt"].iloc[rows].tolist()
+        operates = [{"symbol": symbols[k], "dt": raw_dts[k], "bid": bids_[i], "price": prices_[i],
+                     "op": op_map[op], "op_desc": desc, "pos": p} for k, (i, op, desc, p) in enumerate(records)]
+        columns = ["symbol", "dt", "bid", "price", "op", "op_desc", "pos"]
+        operates = pd.DataFrame(operates, columns=columns)
+        return {"holds": holds, "operates": operates, "pairs": self._get_pairs(operates)}
@@ -10,7 +10,7 @@ import shutil
 import pandas as pd
 from copy import deepcopy
 from loguru import logger
-from czsc.objects import Event
+from czsc.objects import Event, SignalsFrame
 from typing import List, Dict, Callable, Any, Union
 from czsc.traders.sig_parse import get_signals_freqs
 from czsc.traders.base import generate_czsc_signals
@@ -124,8 +124,8 @@ class EventMatchSensor:
         4. 创建一个新的 events 复制品（以防止修改原始事件列表），并创建一个空列表 new_cols，用于存储新添加的列名。
         5. 遍历新的 events 列表，对于每个 event：
             a. 获取 event 的名称 e_name。
-            b. 使用 apply 函数应用 is_match 方法来判断每行数据是否与该事件相匹配。
-                结果是一个布尔值和一个 float 值（表示匹配得分），它们分别被保存为 e_name 和 f'{e_name}_F' 列。
+            b. 使用 match_frame 方法一次判断所有行是否与该事件相匹配，所有事件共用 sigs 的信号编码（SignalsFrame）。
+                结果是一个布尔值和第一个满足的因子名称，它们分别被保存为 e_name 和 f'{e_name}_F' 列。
             c. 将这两个新列名添加到 new_cols 列表中。
         6. 在 sigs 数据框中添加一列 n1b，表示涨跌幅。
         7. 最后，重新组织 sigs 数据框的列顺序，使其包含以下列：symbol、dt、open、close、high、low、vol、amount、n1b 以及所有新添加的列。
@@ -136,10 +136,11 @@ class EventMatchSensor:
             sigs = generate_czsc_signals(bars, deepcopy(self.signals_config), sdt=self.sdt, df=False)
             sigs = pd.DataFrame(sigs)
             events = deepcopy(self.events)
+            frame = SignalsFrame(sigs)
             new_cols = []
             for event in events:
                 e_name = event.name
-                sigs[[e_name, f'{e_name}_F']] = sigs.apply(event.is_match, axis=1, result_type="expand")  # type: ignore
+                sigs[e_name], sigs[f'{e_name}_F'] = event.match_frame(frame)
                 new_cols.extend([e_name, f'{e_name}_F'])
             sigs['n1b'] = (sigs['close'].shift(-1) / sigs['close'] - 1) * 10000
             sigs = sigs[['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount', 'n1b'] + new_cols]  # type: ignore
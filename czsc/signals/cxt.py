@@ -1206,20 +1206,17 @@ def cxt_bi_end_V230618(c: CZSC, **kwargs) -> OrderedDict:
         price_range = max_price - min_price
 
         # 计算当前k线所覆盖的笔内价格范围，并用百分比表示
+        bars_pct = []
         for bar in raw_bars[:-1]:
             bar_high_pct = int((100 * (bar.high - min_price) / price_range))
             bar_low_pct = int((100 * (bar.low - min_price) / price_range))
-            bar.dt_high_pct = bar_high_pct
-            bar.dt_low_pct = bar_low_pct
+            bars_pct.append((bar_high_pct, bar_low_pct))
 
         # 用这个list保存每个价格的重叠次数，把每个价格映射到100以内的区间内
         df_chengjiaoqu = [[i, 0] for i in range(101)]
 
         # 对每个k线进行映射，把该k线的价格范围映射到df_chengjiaoqu
-        for bar in raw_bars[:-1]:
-            range_max = bar.dt_high_pct
-            range_min = bar.dt_low_pct
-
+        for range_max, range_min in bars_pct:
             if range_max == range_min:
                 df_chengjiaoqu[range_max][1] += 1
             else:
@@ -21,11 +21,62 @@ import pandas as pd
 import numpy as np
 from collections import OrderedDict
 from deprecated import deprecated
+from typing import Callable
 from czsc.analyze import CZSC
 from czsc.objects import Signal, Direction, BI, RawBar, FX, Mark, ZS
 from czsc.traders.base import CzscSignals
 from czsc.utils import get_sub_elements, fast_slow_cross, count_last_same, create_single_signal, single_linear
 from czsc.utils.sig import cross_zero_axis, cal_cross_num, down_cross_count
+from czsc.utils.ta_stream import StreamSMA, StreamEMA, StreamBBANDS, StreamSTOCH, StreamMACD
+
+
+def __get_stream(c: CZSC, cache_key: str, min_count: int):
+    """获取 cache_key 对应的流式指标，流式指标保存在 c.cache 中；返回 None 表示需要重新初始化缓存"""
+    stream = c.cache.get(f"stream#{cache_key}", None)
+    if stream is None or len(c.bars_raw) < min_count or not c.bars_raw[0].dt <= stream.dt <= c.bars_raw[-1].dt:
+        return None
+    return stream
+
+
+def __init_stream(c: CZSC, cache_key: str, stream, values: Callable):
+    """使用 c.bars_raw 建立流式指标的状态，values 返回单根K线的指标输入"""
+    for bar in c.bars_raw:
+        stream.update(bar.dt, *values(bar))
+    c.cache[f"stream#{cache_key}"] = stream
+
+
+def __stream_bars(c: CZSC, stream) -> list:
+    """流式指标需要输入的K线：最后一根已输入的K线（可能已被同一时间的新K线替换）及其后的全部K线"""
+    bars = c.bars_raw
+    i = len(bars) - 1
+    while i > 0 and bars[i].dt > stream.dt:
+        i -= 1
+    return bars[i:]
+
+
+def __stream_update(c: CZSC, cache_key: str, stream, inputs: Callable, fields=None, output: Callable = None):
+    """流式计算新K线的指标值并写入 c.indicators，已有K线的指标值保持不变
+
+    :param inputs: 返回单根K线的指标输入
+    :param fields: 多值指标的字段名列表，单值指标为 None
+    :param output: 把流式指标的输出转换为与 fields 对应的元组
+    """
+    bars = __stream_bars(c, stream)
+    values = []
+    for bar in bars:
+        value = stream.update(bar.dt, *inputs(bar))
+        values.append(output(value) if output else value)
+    if fields:
+        values = dict(zip(fields, zip(*values)))
+    c.set_ind(cache_key, values, -len(bars))
+
+
+def __missing_count(c: CZSC, cache_key: str, n: int) -> int:
+    """bars_raw 尾部最多 n 根K线中，还没有指标 cache_key 的K线数量"""
+    for i in range(n):
+        if c.has_ind(cache_key, -i - 1):
+            return i
+    return n
 
 
 def update_ma_cache(c: CZSC, **kwargs):
@@ -52,29 +103,37 @@ def update_ma_cache(c: CZSC, **kwargs):
     assert ma_type in ma_type_map.keys(), f"{ma_type} 不是支持的均线类型，可选值：{list(ma_type_map.keys())}"
 
     cache_key = f"{ma_type}#{timeperiod}"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
+    # SMA / EMA 使用流式指标，每根K线的更新成本为 O(1)
+    stream_cls = {"SMA": StreamSMA, "EMA": StreamEMA}.get(ma_type, None)
+    if stream_cls:
+        stream = __get_stream(c, cache_key, timeperiod + 15)
+        need_init = stream is None
+    else:
+        stream = None
+        need_init = not c.has_ind(cache_key, -2) or len(c.bars_raw) < timeperiod + 15
+
+    if need_init:
         # 初始化缓存
         close = np.array([x.close for x in c.bars_raw])
         ma = ta.MA(close, timeperiod=timeperiod, matype=ma_type_map[ma_type.upper()])
         assert len(ma) == len(close)
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            _c.update({cache_key: ma[i] if ma[i] else close[i]})
-            c.bars_raw[i].cache = _c
+        c.set_ind(cache_key, np.where(ma != 0, ma, close))
+        if stream_cls:
+            __init_stream(c, cache_key, stream_cls(timeperiod), lambda x: (x.close,))
+
+    elif stream:
+        # 流式更新新K线的缓存，已有K线的缓存保持不变
+        __stream_update(c, cache_key, stream, lambda x: (x.close,))
 
     else:
         # 增量更新最近5个K线缓存
         close = np.array([x.close for x in c.bars_raw[-timeperiod - 10 :]])
         ma = ta.MA(close, timeperiod=timeperiod, matype=ma_type_map[ma_type.upper()])
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: ma[-i]})
-            c.bars_raw[-i].cache = _c
+        c.set_ind(cache_key, ma[-5:], -5)
     return cache_key
 
 
@@ -91,32 +150,25 @@ def update_macd_cache(c: CZSC, **kwargs):
     signalperiod = int(kwargs.get("signalperiod", 9))
 
     cache_key = f"MACD{fastperiod}#{slowperiod}#{signalperiod}"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
     min_count = signalperiod + slowperiod + 168
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < min_count + 15:
+    stream = __get_stream(c, cache_key, min_count + 15)
+    if stream is None:
         # 初始化缓存
         close = np.array([x.close for x in c.bars_raw])
         dif, dea, macd = MACD(close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            dif_i = dif[i] if dif[i] else close[i]
-            dea_i = dea[i] if dea[i] else close[i]
-            macd_i = dif_i - dea_i
-            _c.update({cache_key: {"dif": dif_i, "dea": dea_i, "macd": macd_i}})
-            c.bars_raw[i].cache = _c
+        dif = np.where(dif != 0, dif, close)
+        dea = np.where(dea != 0, dea, close)
+        # macd 与流式更新使用相同的口径 (dif - dea) * 2；dif、dea 为 0 时使用收盘价替代，此时 macd 本身就是 0
+        c.set_ind(cache_key, {"dif": dif, "dea": dea, "macd": macd})
+        __init_stream(c, cache_key, StreamMACD(fastperiod, slowperiod, signalperiod), lambda x: (x.close,))
 
     else:
-        # 增量更新最近5个K线缓存
-        close = np.array([x.close for x in c.bars_raw[-min_count - 10 :]])
-        dif, dea, macd = MACD(close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: {"dif": dif[-i], "dea": dea[-i], "macd": macd[-i]}})
-            c.bars_raw[-i].cache = _c
+        # 流式更新新K线的缓存，结果与使用全部K线计算 MACD 一致
+        __stream_update(c, cache_key, stream, lambda x: (x.close,), fields=("dif", "dea", "macd"))
     return cache_key
 
 
@@ -131,34 +183,22 @@ def update_boll_cache_V230228(c: CZSC, **kwargs):
     cache_key = f"BOLL{timeperiod}S{nbdev}"
     nbdev = nbdev / 10
 
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
-        # 初始化缓存
+    stream = __get_stream(c, cache_key, timeperiod + 15)
+    if stream is None:
+        # 初始化缓存；中线为 0 时，全部使用收盘价
         close = np.array([x.close for x in c.bars_raw])
         u1, m, l1 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=nbdev, nbdevdn=nbdev, matype=0)
-
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            if not m[i]:
-                _data = {"上轨": close[i], "中线": close[i], "下轨": close[i]}
-            else:
-                _data = {"上轨": u1[i], "中线": m[i], "下轨": l1[i]}
-            _c.update({cache_key: _data})
-            c.bars_raw[i].cache = _c
+        zero = m == 0
+        c.set_ind(cache_key, {k: np.where(zero, close, v) for k, v in {"上轨": u1, "中线": m, "下轨": l1}.items()})
+        __init_stream(c, cache_key, StreamBBANDS(timeperiod, nbdev), lambda x: (x.close,))
 
     else:
-        # 增量更新最近5个K线缓存
-        close = np.array([x.close for x in c.bars_raw[-timeperiod - 10 :]])
-        u1, m, l1 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=nbdev, nbdevdn=nbdev, matype=0)
-
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: {"上轨": u1[-i], "中线": m[-i], "下轨": l1[-i]}})
-            c.bars_raw[-i].cache = _c
+        # 流式更新新K线的缓存
+        __stream_update(c, cache_key, stream, lambda x: (x.close,), fields=("上轨", "中线", "下轨"))
 
     return cache_key
 
@@ -172,67 +212,27 @@ def update_boll_cache(c: CZSC, **kwargs):
     timeperiod = int(kwargs.get("timeperiod", 20))
     cache_key = f"BOLL{timeperiod}"
 
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
     dev_seq = (1.382, 2, 2.764)
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
-        # 初始化缓存
+    fields = ("上轨3", "上轨2", "上轨1", "中线", "下轨1", "下轨2", "下轨3")
+    stream = __get_stream(c, cache_key, timeperiod + 15)
+    if stream is None:
+        # 初始化缓存；中线为 0 时，全部使用收盘价
         close = np.array([x.close for x in c.bars_raw])
         u1, m, l1 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[0], nbdevdn=dev_seq[0], matype=0)
         u2, m, l2 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[1], nbdevdn=dev_seq[1], matype=0)
         u3, m, l3 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[2], nbdevdn=dev_seq[2], matype=0)
-
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            if not m[i]:
-                _data = {
-                    "上轨3": close[i],
-                    "上轨2": close[i],
-                    "上轨1": close[i],
-                    "中线": close[i],
-                    "下轨1": close[i],
-                    "下轨2": close[i],
-                    "下轨3": close[i],
-                }
-            else:
-                _data = {
-                    "上轨3": u3[i],
-                    "上轨2": u2[i],
-                    "上轨1": u1[i],
-                    "中线": m[i],
-                    "下轨1": l1[i],
-                    "下轨2": l2[i],
-                    "下轨3": l3[i],
-                }
-            _c.update({cache_key: _data})
-            c.bars_raw[i].cache = _c
+        zero = m == 0
+        c.set_ind(cache_key, {k: np.where(zero, close, v) for k, v in zip(fields, (u3, u2, u1, m, l1, l2, l3))})
+        __init_stream(c, cache_key, StreamBBANDS(timeperiod, dev_seq), lambda x: (x.close,))
 
     else:
-        # 增量更新最近5个K线缓存
-        close = np.array([x.close for x in c.bars_raw[-timeperiod - 10 :]])
-        u1, m, l1 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[0], nbdevdn=dev_seq[0], matype=0)
-        u2, m, l2 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[1], nbdevdn=dev_seq[1], matype=0)
-        u3, m, l3 = ta.BBANDS(close, timeperiod=timeperiod, nbdevup=dev_seq[2], nbdevdn=dev_seq[2], matype=0)
-
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update(
-                {
-                    cache_key: {
-                        "上轨3": u3[-i],
-                        "上轨2": u2[-i],
-                        "上轨1": u1[-i],
-                        "中线": m[-i],
-                        "下轨1": l1[-i],
-                        "下轨2": l2[-i],
-                        "下轨3": l3[-i],
-                    }
-                }
-            )
-            c.bars_raw[-i].cache = _c
+        # 流式更新新K线的缓存
+        __stream_update(c, cache_key, stream, lambda x: (x.close,), fields=fields,
+                        output=lambda x: (*x[0][::-1], x[1], *x[2]))
 
     return cache_key
 
@@ -313,7 +313,7 @@ def tas_macd_base_V221028(c: CZSC, **kwargs) -> OrderedDict:
 
     k1, k2, k3 = f"{c.freq.value}_D{di}MACD{fastperiod}#{slowperiod}#{signalperiod}#{key}_BS辅助V221028".split("_")
 
-    macd = [x.cache[cache_key][key.lower()] for x in c.bars_raw[-5 - di :]]
+    macd = c.ind(cache_key, key.lower())[-5 - di :]
     v1 = "多头" if macd[-di] >= 0 else "空头"
     v2 = "向上" if macd[-di] >= macd[-di - 1] else "向下"
 
@@ -346,8 +346,7 @@ def tas_macd_direct_V221106(c: CZSC, **kwargs) -> OrderedDict:
 
     cache_key = update_macd_cache(c, **kwargs)
     k1, k2, k3 = f"{c.freq.value}_D{di}K#MACD{fastperiod}#{slowperiod}#{signalperiod}方向_BS辅助V221106".split("_")
-    bars = get_sub_elements(c.bars_raw, di=di, n=3)
-    macd = [x.cache[cache_key]["macd"] for x in bars]
+    macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=3)
 
     if len(macd) != 3:
         v1 = "模糊"
@@ -396,8 +395,7 @@ def tas_macd_power_V221108(c: CZSC, **kwargs) -> OrderedDict:
 
     v1 = "其他"
     if len(c.bars_raw) > di + 10:
-        bar = c.bars_raw[-di]
-        dif, dea = bar.cache[cache_key]["dif"], bar.cache[cache_key]["dea"]
+        dif, dea = c.ind(cache_key, "dif")[-di], c.ind(cache_key, "dea")[-di]
 
         if dif >= dea >= 0:
             v1 = "超强"
@@ -440,9 +438,9 @@ def tas_macd_first_bs_V221201(c: CZSC, **kwargs):
 
     v1 = "其他"
     if len(bars) >= 100:
-        dif = [x.cache[cache_key]["dif"] for x in bars]
-        dea = [x.cache[cache_key]["dea"] for x in bars]
-        macd = [x.cache[cache_key]["macd"] for x in bars]
+        dif = get_sub_elements(c.ind(cache_key, "dif"), di=di, n=300)
+        dea = get_sub_elements(c.ind(cache_key, "dea"), di=di, n=300)
+        macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=300)
 
         cross = fast_slow_cross(dif, dea)
         up = [x for x in cross if x["类型"] == "金叉" and x["距离"] > 5]
@@ -497,9 +495,9 @@ def tas_macd_first_bs_V221216(c: CZSC, **kwargs):
     v1 = "其他"
     v2 = "任意"
     if len(bars) >= 100:
-        dif = [x.cache[cache_key]["dif"] for x in bars]
-        dea = [x.cache[cache_key]["dea"] for x in bars]
-        macd = [x.cache[cache_key]["macd"] for x in bars]
+        dif = get_sub_elements(c.ind(cache_key, "dif"), di=di, n=300)
+        dea = get_sub_elements(c.ind(cache_key, "dea"), di=di, n=300)
+        macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=300)
         n_bars = bars[-10:]
         m_bars = bars[-100:-10]
         high_n = max([x.high for x in n_bars])
@@ -563,9 +561,9 @@ def tas_macd_second_bs_V221201(c: CZSC, **kwargs):
     v1 = "其他"
     v2 = "任意"
     if len(bars) >= 100:
-        dif = [x.cache[cache_key]["dif"] for x in bars]
-        dea = [x.cache[cache_key]["dea"] for x in bars]
-        macd = [x.cache[cache_key]["macd"] for x in bars]
+        dif = get_sub_elements(c.ind(cache_key, "dif"), di=di, n=350)[50:]
+        dea = get_sub_elements(c.ind(cache_key, "dea"), di=di, n=350)[50:]
+        macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=350)[50:]
 
         cross = fast_slow_cross(dif, dea)
         up = [x for x in cross if x["类型"] == "金叉" and x["距离"] > 5]
@@ -619,8 +617,7 @@ def tas_macd_xt_V221208(c: CZSC, **kwargs):
 
     cache_key = update_macd_cache(c, **kwargs)
     k1, k2, k3 = f"{c.freq.value}_D{di}K#MACD{fastperiod}#{slowperiod}#{signalperiod}形态_BS辅助V221208".split("_")
-    bars = get_sub_elements(c.bars_raw, di=di, n=5)
-    macd = [x.cache[cache_key]["macd"] for x in bars]
+    macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=5)
 
     v1 = "其他"
     if len(macd) == 5:
@@ -737,9 +734,8 @@ def tas_macd_change_V221105(c: CZSC, **kwargs) -> OrderedDict:
         "_"
     )
 
-    bars = get_sub_elements(c.bars_raw, di=di, n=n)
-    dif = [x.cache[cache_key]["dif"] for x in bars]
-    dea = [x.cache[cache_key]["dea"] for x in bars]
+    dif = get_sub_elements(c.ind(cache_key, "dif"), di=di, n=n)
+    dea = get_sub_elements(c.ind(cache_key, "dea"), di=di, n=n)
 
     cross = fast_slow_cross(dif, dea)
     # 过滤低级别信号抖动造成的金叉死叉(这个参数根据自身需要进行修改）
@@ -807,8 +803,9 @@ def tas_ma_base_V221101(c: CZSC, **kwargs) -> OrderedDict:
 
     key = update_ma_cache(c, ma_type=ma_type, timeperiod=timeperiod)
     bars = get_sub_elements(c.bars_raw, di=di, n=3)
-    v1 = "多头" if bars[-1].close >= bars[-1].cache[key] else "空头"
-    v2 = "向上" if bars[-1].cache[key] >= bars[-2].cache[key] else "向下"
+    ma = get_sub_elements(c.ind(key), di=di, n=3)
+    v1 = "多头" if bars[-1].close >= ma[-1] else "空头"
+    v2 = "向上" if ma[-1] >= ma[-2] else "向下"
     return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1, v2=v2)
 
 
@@ -1197,13 +1194,13 @@ def update_kdj_cache(c: CZSC, **kwargs):
     slowd_period = int(kwargs.get("slowd_period", 3))
     cache_key = f"KDJ{fastk_period}#{slowk_period}#{slowd_period}"
 
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
     min_count = fastk_period + slowk_period
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < min_count + 15:
+    stream = __get_stream(c, cache_key, min_count + 15)
+    if stream is None:
         bars = c.bars_raw
         high = np.array([x.high for x in bars])
         low = np.array([x.low for x in bars])
@@ -1212,27 +1209,14 @@ def update_kdj_cache(c: CZSC, **kwargs):
         k, d = ta.STOCH(
             high, low, close, fastk_period=fastk_period, slowk_period=slowk_period, slowd_period=slowd_period
         )
-        j = list(map(lambda x, y: 3 * x - 2 * y, k, d))
-
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            _c.update({cache_key: {"k": k[i] if k[i] else 0, "d": d[i] if d[i] else 0, "j": j[i] if j[i] else 0}})
-            c.bars_raw[i].cache = _c
+        c.set_ind(cache_key, {"k": k, "d": d, "j": 3 * k - 2 * d})
+        stream = StreamSTOCH(fastk_period, slowk_period, slowd_period)
+        __init_stream(c, cache_key, stream, lambda x: (x.high, x.low, x.close))
 
     else:
-        bars = c.bars_raw[-min_count - 10 :]
-        high = np.array([x.high for x in bars])
-        low = np.array([x.low for x in bars])
-        close = np.array([x.close for x in bars])
-        k, d = ta.STOCH(
-            high, low, close, fastk_period=fastk_period, slowk_period=slowk_period, slowd_period=slowd_period
-        )
-        j = list(map(lambda x, y: 3 * x - 2 * y, k, d))
-
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: {"k": k[-i], "d": d[-i], "j": j[-i]}})
-            c.bars_raw[-i].cache = _c
+        # 流式更新新K线的缓存
+        __stream_update(c, cache_key, stream, lambda x: (x.high, x.low, x.close), fields=("k", "d", "j"),
+                        output=lambda x: (x[0], x[1], 3 * x[0] - 2 * x[1]))
 
     return cache_key
 
@@ -1364,30 +1348,20 @@ def update_rsi_cache(c: CZSC, **kwargs):
     """
     timeperiod = kwargs.get("timeperiod", 9)
     cache_key = f"RSI{timeperiod}"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
+    if not c.has_ind(cache_key, -2) or len(c.bars_raw) < timeperiod + 15:
         # 初始化缓存
         close = np.array([x.close for x in c.bars_raw])
-        rsi = ta.RSI(close, timeperiod=timeperiod)
-
-        for i in range(len(close)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            _c.update({cache_key: rsi[i] if rsi[i] else 0})
-            c.bars_raw[i].cache = _c
+        c.set_ind(cache_key, ta.RSI(close, timeperiod=timeperiod))
 
     else:
         # 增量更新最近5个K线缓存
         close = np.array([x.close for x in c.bars_raw[-timeperiod - 10 :]])
         rsi = ta.RSI(close, timeperiod=timeperiod)
-
-        for i in range(1, 6):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: rsi[-i]})
-            c.bars_raw[-i].cache = _c
+        c.set_ind(cache_key, rsi[-5:], -5)
 
     return cache_key
 
@@ -1791,12 +1765,10 @@ def tas_macd_bs1_V230313(c: CZSC, **kwargs):
     if len(bars) <= 100:
         return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1, v2=v2)
 
-    dif, dea, macd = [], [], []
     cache_key = update_macd_cache(c, **kwargs)
-    for x in bars:
-        dif.append(x.cache[cache_key]["dif"])
-        dea.append(x.cache[cache_key]["dea"])
-        macd.append(x.cache[cache_key]["macd"])
+    dif = get_sub_elements(c.ind(cache_key, "dif"), di=di, n=300)
+    dea = get_sub_elements(c.ind(cache_key, "dea"), di=di, n=300)
+    macd = get_sub_elements(c.ind(cache_key, "macd"), di=di, n=300)
 
     n_bars = bars[-10:]
     m_bars = bars[-100:-10]
@@ -1915,12 +1887,11 @@ def update_cci_cache(c: CZSC, **kwargs):
     """
     timeperiod = int(kwargs.get("timeperiod", 14))
     cache_key = f"CCI{timeperiod}"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
+    if not c.has_ind(cache_key, -2) or len(c.bars_raw) < timeperiod + 15:
         # 初始化缓存
         bars = c.bars_raw
     else:
@@ -1932,12 +1903,9 @@ def update_cci_cache(c: CZSC, **kwargs):
     close = np.array([x.close for x in bars])
     cci = ta.CCI(high, low, close, timeperiod=timeperiod)
 
-    for i in range(len(bars)):
-        _c = dict(bars[i].cache) if bars[i].cache else dict()
-        if cache_key not in _c.keys():
-            _c.update({cache_key: cci[i] if cci[i] else 0})
-            bars[i].cache = _c
-
+    # 只写入还没有缓存的K线
+    n = __missing_count(c, cache_key, len(bars))
+    c.set_ind(cache_key, cci[-n:], -n)
     return cache_key
 
 
@@ -2065,12 +2033,11 @@ def update_atr_cache(c: CZSC, **kwargs):
     """
     timeperiod = int(kwargs.get("timeperiod", 14))
     cache_key = f"ATR{timeperiod}"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
+    if not c.has_ind(cache_key, -2) or len(c.bars_raw) < timeperiod + 15:
         # 初始化缓存
         bars = c.bars_raw
     else:
@@ -2082,12 +2049,9 @@ def update_atr_cache(c: CZSC, **kwargs):
     close = np.array([x.close for x in bars])
     atr = ta.ATR(high, low, close, timeperiod=timeperiod)
 
-    for i in range(len(bars)):
-        _c = dict(bars[i].cache) if bars[i].cache else dict()
-        if cache_key not in _c.keys():
-            _c.update({cache_key: atr[i] if atr[i] else 0})
-            bars[i].cache = _c
-
+    # 只写入还没有缓存的K线
+    n = __missing_count(c, cache_key, len(bars))
+    c.set_ind(cache_key, atr[-n:], -n)
     return cache_key
 
 
@@ -2158,12 +2122,11 @@ def update_sar_cache(c: CZSC, **kwargs):
     :return:
     """
     cache_key = "SAR"
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < 50:
+    if not c.has_ind(cache_key, -2) or len(c.bars_raw) < 50:
         # 初始化缓存
         bars = c.bars_raw
     else:
@@ -2174,12 +2137,9 @@ def update_sar_cache(c: CZSC, **kwargs):
     low = np.array([x.low for x in bars])
     sar = ta.SAR(high, low)
 
-    for i in range(len(bars)):
-        _c = dict(bars[i].cache) if bars[i].cache else dict()
-        if cache_key not in _c.keys():
-            _c.update({cache_key: sar[i] if sar[i] else 0})
-            bars[i].cache = _c
-
+    # 只写入还没有缓存的K线
+    n = __missing_count(c, cache_key, len(bars))
+    c.set_ind(cache_key, sar[-n:], -n)
     return cache_key
 
 
@@ -2941,8 +2901,7 @@ def tas_macd_dist_V230408(c: CZSC, **kwargs) -> OrderedDict:
     if len(c.bi_list) < 3:
         return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1)
 
-    bars = get_sub_elements(c.bars_raw, di=1, n=w)
-    factors = [x.cache[cache_key][key.lower()] for x in bars]
+    factors = get_sub_elements(c.ind(cache_key, key.lower()), di=1, n=w)
     q = pd.cut(factors, n, labels=list(range(1, n + 1)), precision=5, duplicates="drop")[-1]
     return create_single_signal(k1=k1, k2=k2, k3=k3, v1=f"第{q}层")
 
@@ -2977,8 +2936,7 @@ def tas_macd_dist_V230409(c: CZSC, **kwargs) -> OrderedDict:
     if len(c.bi_list) < 3:
         return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1)
 
-    bars = get_sub_elements(c.bars_raw, di=1, n=w)
-    factors = [x.cache[cache_key][key.lower()] for x in bars]
+    factors = get_sub_elements(c.ind(cache_key, key.lower()), di=1, n=w)
     mean = np.mean(np.abs(factors))
     if max([abs(x) for x in factors[-n:]]) > mean * t / 10:
         v1 = f"{'多头' if factors[-1] > 0 else '空头'}远离"
@@ -3025,8 +2983,7 @@ def tas_macd_dist_V230410(c: CZSC, **kwargs) -> OrderedDict:
     if len(c.bi_list) < 3:
         return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1)
 
-    bars = get_sub_elements(c.bars_raw, di=1, n=w)
-    factors = [x.cache[cache_key][key.lower()] for x in bars]
+    factors = get_sub_elements(c.ind(cache_key, key.lower()), di=1, n=w)
     v1 = "多头" if factors[-1] > 0 else "空头"
     if v1 == "多头":
         factors = [x for x in factors if x > 0]
@@ -3428,12 +3385,13 @@ def tas_slope_V231019(c: CZSC, **kwargs) -> OrderedDict:
         return create_single_signal(k1=k1, k2=k2, k3=k3, v1=v1)
 
     cache_slope_key = f"tas_slope_V231019_{di}_{n}"
+    dif_all = c.ind(cache_key, "dif")
     for i, bar in enumerate(c.bars_raw):
         if i < n:
             continue
 
         if cache_slope_key not in bar.cache:
-            dif = [x.cache[cache_key]["dif"] for x in c.bars_raw[i - n : i]]
+            dif = dif_all[i - n : i].tolist()
             bar.cache[cache_slope_key] = single_linear(dif)["slope"]
 
     bars = get_sub_elements(c.bars_raw, di=di, n=n * 10)
@@ -3481,9 +3439,8 @@ def tas_double_ma_V240208(c: CZSC, **kwargs) -> OrderedDict:
     fast_ma_key = update_ma_cache(c, ma_type="SMA", timeperiod=N)
     slow_ma_key = update_ma_cache(c, ma_type="SMA", timeperiod=M)
 
-    bars = get_sub_elements(c.bars_raw, di=di, n=M * 30)
-    fast_ma = [x.cache[fast_ma_key] for x in bars]
-    slow_ma = [x.cache[slow_ma_key] for x in bars]
+    fast_ma = get_sub_elements(c.ind(fast_ma_key), di=di, n=M * 30)
+    slow_ma = get_sub_elements(c.ind(slow_ma_key), di=di, n=M * 30)
     cross_info = fast_slow_cross(fast_ma, slow_ma)
 
     if len(cross_info) < 3:
@@ -37,29 +37,22 @@ def update_vol_ma_cache(c: CZSC, ma_type: str, timeperiod: int, **kwargs):
     assert ma_type in ma_type_map.keys(), f"{ma_type} 不是支持的均线类型，可选值：{list(ma_type_map.keys())}"
     cache_key = f"VOL#{ma_type}#{timeperiod}"
 
-    if c.bars_raw[-1].cache and c.bars_raw[-1].cache.get(cache_key, None):
+    if c.has_ind(cache_key):
         # 如果最后一根K线已经有对应的缓存，不执行更新
         return cache_key
 
-    last_cache = dict(c.bars_raw[-2].cache) if c.bars_raw[-2].cache else dict()
-    if cache_key not in last_cache.keys() or len(c.bars_raw) < timeperiod + 15:
+    if not c.has_ind(cache_key, -2) or len(c.bars_raw) < timeperiod + 15:
         # 初始化缓存
         data = np.array([x.vol for x in c.bars_raw], dtype=np.float64)
         ma = ta.MA(data, timeperiod=timeperiod, matype=ma_type_map[ma_type.upper()]) # type: ignore
         assert len(ma) == len(data)
-        for i in range(len(data)):
-            _c = dict(c.bars_raw[i].cache) if c.bars_raw[i].cache else dict()
-            _c.update({cache_key: ma[i] if ma[i] else data[i]})
-            c.bars_raw[i].cache = _c
+        c.set_ind(cache_key, np.where(ma != 0, ma, data))
 
     else:
         # 增量更新最近3个K线缓存
         data = np.array([x.vol for x in c.bars_raw[-timeperiod - 10:]], dtype=np.float64)
         ma = ta.MA(data, timeperiod=timeperiod, matype=ma_type_map[ma_type.upper()]) # type: ignore
-        for i in range(1, 4):
-            _c = dict(c.bars_raw[-i].cache) if c.bars_raw[-i].cache else dict()
-            _c.update({cache_key: ma[-i]})
-            c.bars_raw[-i].cache = _c
+        c.set_ind(cache_key, ma[-3:], -3)
     return cache_key
 
 
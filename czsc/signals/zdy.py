@@ -1163,7 +1163,7 @@ def zdy_dif_V230528(c: CZSC, **kwargs) -> OrderedDict:
 
         return peaks, valleys
 
-    dif_values = [x.cache[cache_key]["dif"] for x in c.bars_raw[-1000:]]
+    dif_values = c.ind(cache_key, "dif")[-1000:].tolist()
     peaks, valleys = _find_peaks_valleys(dif_values)
 
     if len(peaks) < n or len(valleys) < n:
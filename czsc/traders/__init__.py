@@ -6,14 +6,17 @@ create_dt: 2021/11/1 22:20
 describe: 交易员（traders）：使用 CZSC 分析工具进行择时策略的开发，交易等
 """
 from czsc.traders.base import (
-    CzscSignals, CzscTrader, generate_czsc_signals, check_signals_acc, get_unique_signals
+    CzscSignals, CzscTrader, generate_czsc_signals, iter_czsc_signals, create_czsc_signals, check_signals_acc,
+    get_unique_signals
 )
 
 from czsc.traders.performance import (
     PairsPerformance, combine_holds_and_pairs, combine_dates_and_pairs, stock_holds_performance
 )
 from czsc.traders.dummy import DummyBacktest
-from czsc.traders.sig_parse import SignalsParser, get_signals_config, get_signals_freqs
+from czsc.traders.sig_parse import SignalsParser, get_signals_config, get_signals_freqs, compile_signals_config
 from czsc.traders.weight_backtest import WeightBacktest, get_ensemble_weight, long_short_equity, stoploss_by_direction
 from czsc.traders.rwc import RedisWeightsClient, get_strategy_mates, get_heartbeat_time, clear_strategy, get_strategy_weights
 from czsc.traders.optimize import OpensOptimize, ExitsOptimize
+from czsc.traders.universe import CzscUniverse
+from czsc.traders.sig_store import generate_signals_dataset, read_signals_dataset, SignalsStore
@@ -14,7 +14,7 @@ from loguru import logger
 from datetime import datetime, timedelta
 from deprecated import deprecated
 from collections import OrderedDict
-from typing import Callable, List, AnyStr, Union, Optional
+from typing import Callable, List, AnyStr, Union, Optional, Iterator, Tuple
 from pyecharts.charts import Tab
 from pyecharts.components import Table
 from pyecharts.options import ComponentTitleOpts
@@ -22,8 +22,9 @@ from czsc.analyze import CZSC
 from czsc.objects import Position, RawBar, Signal
 from czsc.utils.bar_generator import BarGenerator
 from czsc.utils.cache import home_path
-from czsc.utils import sorted_freqs, import_by_name
-from czsc.traders.sig_parse import get_signals_freqs
+from czsc.utils.profiler import Profiler
+from czsc.utils import sorted_freqs
+from czsc.traders.sig_parse import get_signals_freqs, compile_signals_config
 
 
 class CzscSignals:
@@ -39,6 +40,12 @@ class CzscSignals:
         self.cache = OrderedDict()
         self.kwargs = kwargs
         self.signals_config = kwargs.get("signals_config", [])
+        # profiler 用于统计信号函数、CZSC.update、Position.update 的耗时，可以传入 Profiler 对象在多个对象之间共享；
+        # 传入 True 或者 signals_timing=True 时创建新的 Profiler；默认 None，不统计
+        profiler = kwargs.get("profiler", None)
+        self.profiler = Profiler() if profiler is True else (profiler if isinstance(profiler, Profiler) else None)
+        self.signals_timing = self.profiler is not None or kwargs.get("signals_timing", False)
+        self.__signals_plan_src, self.__signals_plan_len = None, 0
 
         if bg:
             self.bg = bg
@@ -50,9 +57,7 @@ class CzscSignals:
 
             last_bar = self.kas[self.base_freq].bars_raw[-1]
             self.end_dt, self.bid, self.latest_price = last_bar.dt, last_bar.id, last_bar.close
-            self.s = OrderedDict()
-            self.s.update(self.get_signals_by_conf())
-            self.s.update(last_bar.__dict__)
+            self.__update_s()
         else:
             self.bg = None
             self.symbol = None
@@ -84,24 +89,77 @@ class CzscSignals:
                 {'name': 'czsc.signals.tas_double_ma_V221203', 'freq': '日线', 'di': 5, 'ma_seq': (5, 20), 'th': 100},
             ]
 
+        信号参数配置在第一次调用时编译成执行计划（参见 czsc.traders.sig_parse.compile_signals_config）：
+        信号函数只导入一次，完全相同的配置只计算一次，同一周期的信号函数连续执行；合并信号的顺序与 signals_config 一致。
+
         :return: 信号字典
         """
         s = OrderedDict()
         if not self.signals_config:
             return s
 
-        for param in self.signals_config:
-            param = dict(param)
-            sig_name = param.pop('name')
-            sig_func = import_by_name(sig_name) if isinstance(sig_name, str) else sig_name
-
-            freq = param.pop('freq', None)
-            if freq in self.kas:    # 如果指定了 freq，那么就使用 CZSC 对象作为输入
-                s.update(sig_func(self.kas[freq], **param))
-            else:                   # 否则使用 CAT 作为输入
-                s.update(sig_func(self, **param))
+        groups, order = self.__get_signals_plan()
+        profiler = self.profiler
+        keys = self.__signals_keys
+        results = [None] * len(keys)
+        for freq, entries in groups:
+            obj = self.kas[freq] if freq else self    # 指定了 freq 使用 CZSC 对象作为输入，否则使用 CAT 作为输入
+            for uid, _, sig_func, param in entries:
+                if profiler is None:
+                    results[uid] = sig_func(obj, **param)
+                else:
+                    start = profiler.start()
+                    results[uid] = sig_func(obj, **param)
+                    profiler.stop(keys[uid], start)
+
+        for uid in order:
+            s.update(results[uid])
         return s
 
+    def __get_signals_plan(self):
+        """获取 signals_config 的执行计划，signals_config 被替换或增删配置时重新编译"""
+        config = self.signals_config
+        if self.__signals_plan_src is not config or self.__signals_plan_len != len(config):
+            self.__signals_plan = compile_signals_config(config, freqs=self.kas.keys())
+            self.__signals_plan_src, self.__signals_plan_len = config, len(config)
+
+            # 执行计划中每个信号函数配置在 Profiler 中的统计 key
+            keys = [None] * len(set(self.__signals_plan[1]))
+            for freq, entries in self.__signals_plan[0]:
+                for uid, name, _, param in entries:
+                    keys[uid] = ("signal", name, freq, str(param))
+            self.__signals_keys = keys
+        return self.__signals_plan
+
+    @property
+    def signals_timing(self) -> bool:
+        """是否统计耗时，设置为 True 时创建 Profiler，设置为 False 时关闭统计"""
+        return self.profiler is not None
+
+    @signals_timing.setter
+    def signals_timing(self, value: bool):
+        if not value:
+            self.profiler = None
+        elif self.profiler is None:
+            self.profiler = Profiler()
+
+    def get_signals_timing(self) -> pd.DataFrame:
+        """获取当前 signals_config 中各信号函数配置的累计耗时，需要开启耗时统计
+
+        :return: 按累计耗时降序排列的 DataFrame，列为 name, freq, params, count, total, mean_ms, p99_ms, ratio
+        """
+        columns = ["name", "freq", "params", "count", "total", "mean_ms", "p99_ms"]
+        keys = set()
+        if self.signals_config:
+            self.__get_signals_plan()
+            keys = {(name, freq, params) for _, name, freq, params in self.__signals_keys}
+
+        df = self.profiler.to_dataframe(kind="signal") if self.profiler else pd.DataFrame(columns=columns)
+        mask = np.array([x in keys for x in zip(df['name'], df['freq'], df['params'])], dtype=bool)
+        df = df.loc[mask, columns].reset_index(drop=True)
+        df['ratio'] = df['total'] / df['total'].sum() if df['total'].sum() > 0 else 0.0
+        return df
+
     def take_snapshot(self, file_html=None, width: str = "1400px", height: str = "580px"):
         """获取快照
 
@@ -177,16 +235,79 @@ class CzscSignals:
         :param bar: 基础周期已完成K线
         :return: None
         """
+        self.__update_bars(bar)
+        self.__update_s()
+
+    def __update_bars(self, bar: RawBar):
+        """输入基础周期已完成K线，更新各周期K线和 CZSC 对象，不计算信号"""
         self.bg.update(bar)
+        self.__update_kas(bar)
+
+    def __update_kas(self, bar: RawBar):
+        """使用 self.bg 中各周期的最后一根K线更新 CZSC 对象"""
+        profiler = self.profiler
         for freq, b in self.bg.bars.items():
-            self.kas[freq].update(b[-1])
+            if profiler is None:
+                self.kas[freq].update(b[-1])
+            else:
+                start = profiler.start()
+                self.kas[freq].update(b[-1])
+                profiler.stop(("czsc", "CZSC.update", freq, ""), start)
 
         self.symbol = bar.symbol
         last_bar = self.kas[self.base_freq].bars_raw[-1]
         self.end_dt, self.bid, self.latest_price = last_bar.dt, last_bar.id, last_bar.close
+
+    def __update_s(self):
+        """根据当前的 CZSC 对象计算信号"""
         self.s = OrderedDict()
         self.s.update(self.get_signals_by_conf())
-        self.s.update(last_bar.__dict__)
+        self.s.update(self.kas[self.base_freq].bars_raw[-1].__dict__)
+
+    def update_tick(self, tick) -> Optional[RawBar]:
+        """输入逐笔行情，通过 self.bg.update_tick 合成基础周期K线；基础周期K线完成时，更新各周期K线、CZSC 对象和信号
+
+        信号只在基础周期K线完成时计算，结果与逐根输入已完成K线调用 update_signals 一致。
+
+        :param tick: 逐笔行情，参见 BarGenerator.update_tick
+        :return: 这笔行情完成的基础周期K线，没有时返回 None
+        """
+        return self.bg.update_tick(tick, on_bar=self.__on_tick_bar)
+
+    def flush_tick(self) -> Optional[RawBar]:
+        """结束 update_tick 合成中的基础周期K线，更新 CZSC 对象和信号，如收盘后不再有新的行情时调用
+
+        :return: 完成的基础周期K线，没有合成中的K线时返回 None
+        """
+        return self.bg.flush_tick(on_bar=self.__on_tick_bar)
+
+    def __on_tick_bar(self, bar: RawBar):
+        self.__update_kas(bar)
+        self.__update_s()
+
+    def warm_up(self, bars: List[RawBar], sdt: Union[AnyStr, datetime, None] = None):
+        """预热：输入一串基础周期已完成K线，跳过历史K线上的信号计算
+
+        默认只在最后一根K线上计算一次信号，结果与逐根调用 update_signals 后的 self.s 一致（不依赖逐K线状态的信号函数）；
+        选股等只需要最新信号的场景，可以节省 N-1 次信号计算。
+
+        :param bars: 基础周期已完成K线
+        :param sdt: 信号计算开始时间，默认 None；指定 sdt 时，dt >= sdt 的K线逐根调用 update_signals，
+            可以给依赖 self.cache 等逐K线状态的信号函数预留预热区间
+        :return: None
+        """
+        if not bars:
+            return
+
+        sdt = pd.to_datetime(sdt) if sdt is not None else bars[-1].dt
+        for bar in bars:
+            if bar.dt >= sdt:
+                self.update_signals(bar)
+            else:
+                self.__update_bars(bar)
+
+        if bars[-1].dt < sdt:
+            self.__update_s()
 
 
 def generate_czsc_signals(bars: List[RawBar], signals_config: List[dict],
@@ -200,7 +321,8 @@ def generate_czsc_signals(bars: List[RawBar], signals_config: List[dict],
     3. 如果bars_right为空，即没有开始时间之后的K线数据，函数会发出一个警告，并返回一个空的DataFrame或空列表。
     4. 函数创建一个BarGenerator对象bg，并使用bars_left中的K线数据来初始化它。
     5. 函数创建一个CzscSignals对象cs，并将bg和信号配置signals_config作为参数传入。
-    6. 函数遍历bars_right中的每一根K线，对于每一根K线，函数调用cs.update_signals(bar)来更新信号，并将更新后的信号添加到_sigs列表中。
+    6. 函数遍历bars_right中的每一根K线，对于每一根K线，函数调用cs.update_signals(bar)来更新信号，并将更新后的信号添加到_sigs列表中；
+       以上步骤由 iter_czsc_signals 分块执行。
     7. 最后，如果df参数为True，函数将_sigs转换为DataFrame并返回；否则，直接返回_sigs。
 
     :param bars: 基础周期 K 线序列
@@ -214,8 +336,22 @@ def generate_czsc_signals(bars: List[RawBar], signals_config: List[dict],
     :param sdt: 信号计算开始时间
     :param init_n: 用于 BarGenerator 初始化的基础周期K线数量
     :param df: 是否返回 df 格式的信号计算结果，默认 False
+    :param kwargs: 其他参数，传递给 CzscSignals；如传入 profiler=Profiler() 统计信号函数和 CZSC.update 的耗时
     :return: 信号计算结果
     """
+    _sigs = [x for chunk in iter_czsc_signals(bars, signals_config, sdt, init_n, **kwargs) for x in chunk]
+    if df:
+        return pd.DataFrame(_sigs)
+    else:
+        return _sigs
+
+
+def create_czsc_signals(bars: List[RawBar], signals_config: List[dict], sdt: Union[AnyStr, datetime] = "20170101",
+                        init_n: int = 500, **kwargs) -> Tuple[Optional[CzscSignals], List[RawBar]]:
+    """使用 sdt 之前的K线创建 CzscSignals 对象，参数含义与 generate_czsc_signals 一致
+
+    :return: CzscSignals 对象，以及需要逐根调用 update_signals 的K线；sdt 之后没有K线时返回 (None, [])
+    """
     freqs = get_signals_freqs(signals_config)
     freqs = [freq for freq in freqs if freq != bars[0].freq.value]
     sdt = pd.to_datetime(sdt)                       # type: ignore
@@ -227,28 +363,44 @@ def generate_czsc_signals(bars: List[RawBar], signals_config: List[dict],
         bars_right = [x for x in bars if x.dt >= sdt]   # type: ignore
 
     if len(bars_right) == 0:
-        logger.warning("右侧K线为空，无法进行信号生成", category=RuntimeWarning)
-        if df:
-            return pd.DataFrame()
-        else:
-            return []
+        return None, []
 
     base_freq = str(bars[0].freq.value)
     bg = BarGenerator(base_freq=base_freq, freqs=freqs, max_count=kwargs.get("bg_max_count", 5000))
     for bar in bars_left:
         bg.update(bar)
 
-    _sigs = []
     cs = CzscSignals(bg, signals_config=signals_config, **kwargs)
     cs.cache.update({'gsc_kwargs': kwargs})
-    for bar in tqdm(bars_right, desc=f'generate signals of {bg.symbol}'):
+    return cs, bars_right
+
+
+def iter_czsc_signals(bars: List[RawBar], signals_config: List[dict], sdt: Union[AnyStr, datetime] = "20170101",
+                      init_n: int = 500, chunk_size: int = 10000, verbose: bool = True,
+                      **kwargs) -> Iterator[List[dict]]:
+    """使用 CzscSignals 生成信号，每 chunk_size 根K线返回一次信号列表，用于分块写入文件，避免全部信号保存在内存中
+
+    参数含义与 generate_czsc_signals 一致，所有块拼接后与 generate_czsc_signals 的结果相同
+
+    :param chunk_size: 每块包含的K线数量
+    :param verbose: 是否显示进度条
+    :return: 信号列表的迭代器
+    """
+    cs, bars_right = create_czsc_signals(bars, signals_config, sdt, init_n, **kwargs)
+    if len(bars_right) == 0:
+        logger.warning("右侧K线为空，无法进行信号生成", category=RuntimeWarning)
+        return
+
+    _sigs = []
+    for bar in tqdm(bars_right, desc=f'generate signals of {cs.symbol}', disable=not verbose):
         cs.update_signals(bar)
         _sigs.append(dict(cs.s))
+        if len(_sigs) >= chunk_size:
+            yield _sigs
+            _sigs = []
 
-    if df:
-        return pd.DataFrame(_sigs)
-    else:
-        return _sigs
+    if _sigs:
+        yield _sigs
 
 
 def check_signals_acc(bars: List[RawBar], signals_config: List[dict], delta_days: int = 5, **kwargs) -> None:
@@ -270,6 +422,8 @@ def check_signals_acc(bars: List[RawBar], signals_config: List[dict], delta_days
     :param bars: 原始K线
     :param signals_config: 需要验证的信号列表
     :param delta_days: 两次相同信号之间的间隔天数
+    :param kwargs: 其他参数，传递给 generate_czsc_signals；传入 profiler=True 或 Profiler 对象时，
+        统计信号生成过程中各信号函数的耗时，并打印耗时最多的 20 个信号函数配置
     :return: None
     """
     base_freq = str(bars[-1].freq.value)
@@ -277,7 +431,13 @@ def check_signals_acc(bars: List[RawBar], signals_config: List[dict], delta_days
     if len(bars) < 600:
         return
 
-    df = generate_czsc_signals(bars, signals_config=signals_config, df=True, **kwargs)
+    profiler = kwargs.pop("profiler", None)
+    profiler = Profiler() if profiler is True else profiler
+    df = generate_czsc_signals(bars, signals_config=signals_config, df=True, profiler=profiler, **kwargs)
+    if isinstance(profiler, Profiler):
+        print(f"signals timing: {'+' * 100}")
+        print(profiler.to_dataframe(kind="signal").head(20).to_string())
+
     s_cols = [x for x in df.columns if len(x.split("_")) == 3]
     signals = []
     for col in s_cols:
@@ -394,9 +554,7 @@ class CzscTrader(CzscSignals):
         :return: None
         """
         self.update_signals(bar)
-        if self.positions:
-            for position in self.positions:
-                position.update(self.s)
+        self.__update_positions(bar)
 
     def on_sig(self, sig: dict) -> None:
         """通过信号字典直接交易，用于快速回测场景
@@ -414,9 +572,7 @@ class CzscTrader(CzscSignals):
         self.s = sig
         self.symbol, self.end_dt = self.s['symbol'], self.s['dt']
         self.bid, self.latest_price = self.s['id'], self.s['close']
-        if self.positions:
-            for position in self.positions:
-                position.update(self.s)
+        self.__update_positions(sig)
 
     def on_bar(self, bar: RawBar) -> None:
         """输入基础周期已完成K线，更新信号，更新仓位
@@ -426,6 +582,41 @@ class CzscTrader(CzscSignals):
         """
         self.update(bar)
 
+    def update_tick(self, tick) -> Optional[RawBar]:
+        """输入逐笔行情，基础周期K线完成时，更新信号，更新仓位
+
+        :param tick: 逐笔行情，参见 BarGenerator.update_tick
+        :return: 这笔行情完成的基础周期K线，没有时返回 None
+        """
+        return self.__update_positions(super().update_tick(tick))
+
+    def flush_tick(self) -> Optional[RawBar]:
+        """结束 update_tick 合成中的基础周期K线，更新信号，更新仓位"""
+        return self.__update_positions(super().flush_tick())
+
+    def __update_positions(self, bar):
+        """使用 self.s 更新所有仓位，bar 为 None 时不更新；开启耗时统计时，记录每个 Position.update 的耗时"""
+        if bar is None or not self.positions:
+            return bar
+
+        profiler = self.profiler
+        for position in self.positions:
+            if profiler is None:
+                position.update(self.s)
+            else:
+                start = profiler.start()
+                position.update(self.s)
+                profiler.stop(("position", position.name, "", ""), start)
+        return bar
+
+    def on_tick(self, tick) -> Optional[RawBar]:
+        """输入逐笔行情，基础周期K线完成时，更新信号，更新仓位
+
+        :param tick: 逐笔行情，参见 BarGenerator.update_tick
+        :return: 这笔行情完成的基础周期K线，没有时返回 None
+        """
+        return self.update_tick(tick)
+
     @property
     def pos_changed(self) -> bool:
         """判断仓位是否发生变化
@@ -88,7 +88,7 @@ class DummyBacktest:
                 pairs = pd.DataFrame(pos.pairs)
                 pairs.to_parquet(file_pairs)
 
-                dfh = pd.DataFrame(pos.holds)
+                dfh = pos.holds.copy()
                 dfh['n1b'] = (dfh['price'].shift(-1) / dfh['price'] - 1) * 10000
                 dfh.fillna(0, inplace=True)
                 dfh['symbol'] = pos.symbol
@@ -8,7 +8,7 @@ describe:
 import re
 from loguru import logger
 from parse import parse
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from czsc.objects import Signal
 from czsc.utils import import_by_name, sorted_freqs
 
@@ -203,3 +203,37 @@ def get_signals_freqs(signals_seq: List) -> List[str]:
         if _freqs:
             freqs.extend(_freqs)
     return [x for x in sorted_freqs if x in freqs]
+
+
+def compile_signals_config(signals_config: List[Dict], freqs=None) -> Tuple[List[Tuple], List[int]]:
+    """把信号函数配置编译成执行计划，供 CzscSignals 逐K线计算信号时使用
+
+    函数执行逻辑：
+
+    1. 对于 signals_config 中的每个配置，一次性完成 import_by_name 和参数拷贝；
+    2. 信号函数、freq、参数完全相同的配置只计算一次；
+    3. 按 freq 分组，同一周期的信号函数连续执行；freq 不在 freqs 中的配置归入 None 组，使用 CzscSignals 对象作为输入。
+
+    :param signals_config: 信号函数配置
+    :param freqs: 可用的K线周期列表，一般是 CzscSignals.kas 的 key
+    :return: (groups, order)
+
+        - groups: [(freq, [(uid, name, sig_func, params), ...]), ...]，freq 为 None 的组使用 CzscSignals 对象作为输入
+        - order: 与 signals_config 一一对应的 uid 列表，按原始顺序合并信号，保证结果与逐个执行配置一致
+    """
+    freqs = set(freqs or [])
+    uid_map, groups, order = {}, {}, []
+    for param in signals_config:
+        param = dict(param)
+        sig_name = param.pop('name')
+        sig_func = import_by_name(sig_name) if isinstance(sig_name, str) else sig_name
+        freq = param.pop('freq', None)
+        freq = freq if freq in freqs else None
+
+        key = (sig_func, freq, repr(sorted(param.items())))
+        if key not in uid_map:
+            uid_map[key] = len(uid_map)
+            name = sig_name if isinstance(sig_name, str) else getattr(sig_func, '__name__', str(sig_func))
+            groups.setdefault(freq, []).append((uid_map[key], name, sig_func, param))
+        order.append(uid_map[key])
+    return list(groups.items()), order
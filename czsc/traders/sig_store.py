@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 信号数据的持久化存储
+
+1. generate_signals_dataset：多进程生成多个标的的信号，按标的分块写入 Parquet 文件，支持断点续跑；
+2. SignalsStore：按 (标的, 信号配置) 保存信号和最后一根K线处的 CzscSignals 状态，每次只计算新K线的信号并追加保存。
+
+数据集目录结构：
+
+    path/
+        _meta.json              # 信号配置的哈希值、K线时间范围、信号列、K线时区；所有标的文件的列结构相同
+        000001.SH.parquet       # 每个标的一个文件，每 chunk_size 根K线写入一个 row group
+        .000002.SH.parquet.tmp  # 正在写入的文件，写入完成后才重命名为正式文件名
+
+使用示例：
+
+    from czsc.traders.sig_store import generate_signals_dataset, read_signals_dataset
+
+    status = generate_signals_dataset(symbols, read_bars, signals_config, path,
+                                      sdt='20200101', edt='20240101', n_jobs=8)
+    df = read_signals_dataset(path, symbols=['000001.SH'], sdt='20230101')
+
+    store = SignalsStore(path, signals_config, sdt='20200101')
+    store.update('000001.SH', bars)         # 第一次全量计算，之后只计算 store.get_end_dt('000001.SH') 之后的新K线
+    df = store.read('000001.SH', sdt='20230101')
+"""
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+from tqdm import tqdm
+from loguru import logger
+from datetime import datetime
+from typing import Callable, List, AnyStr, Union, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from czsc.objects import RawBar
+from czsc.traders.base import iter_czsc_signals, create_czsc_signals, CzscSignals
+from czsc.traders.sig_parse import get_signals_freqs
+from czsc.utils.io import read_json, save_json, dill_dump, dill_load
+
+
+# 信号数据集中K线字段的列名和类型，排在信号列之前；信号列按名称排序，类型均为字符串
+# K线带时区时，dt 列的类型为 pa.timestamp("ns", tz=K线时区)，参见 signals_schema
+SIGNALS_BAR_FIELDS = [("symbol", pa.string()), ("dt", pa.timestamp("ns")), ("id", pa.int64()),
+                      ("open", pa.float64()), ("close", pa.float64()), ("high", pa.float64()),
+                      ("low", pa.float64()), ("vol", pa.float64()), ("amount", pa.float64())]
+
+# CzscSignals.s 中不写入数据集的字段
+_SKIP_KEYS = {"freq", "cache"}
+
+
+def signals_config_hash(signals_config: List[dict]) -> str:
+    """信号配置的哈希值，同一个配置中参数的先后顺序不影响结果"""
+    text = json.dumps(signals_config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def signals_schema(columns: List[str], tz: Optional[str] = None) -> pa.Schema:
+    """信号数据集的列结构
+
+    :param columns: 信号列
+    :param tz: K线时间的时区，如 Asia/Shanghai、+08:00；默认 None 表示K线时间不带时区
+    :return: K线字段 + 信号列
+    """
+    fields = [(name, pa.timestamp("ns", tz=tz) if name == "dt" else type_) for name, type_ in SIGNALS_BAR_FIELDS]
+    return pa.schema(fields + [(col, pa.string()) for col in columns])
+
+
+def _get_dt_tz(sig: dict) -> Optional[str]:
+    """信号中K线时间的时区，使用 pyarrow 的时区表示，不带时区时返回 None"""
+    return pa.array([sig["dt"]]).type.tz
+
+
+def _dt_scalar(dt, tz: Optional[str]) -> pa.Scalar:
+    """读取时的时间过滤条件；K线带时区时，不带时区的 dt 按K线时区的当地时间处理"""
+    dt = pd.Timestamp(pd.to_datetime(dt))
+    if tz is not None:
+        dt = dt.tz_localize(tz) if dt.tz is None else dt.tz_convert(tz)
+    elif dt.tz is not None:
+        dt = dt.tz_localize(None)
+    return pa.scalar(dt, type=pa.timestamp("ns", tz=tz))
+
+
+def _get_signal_columns(sig: dict) -> List[str]:
+    bar_keys = {name for name, _ in SIGNALS_BAR_FIELDS} | _SKIP_KEYS
+    return sorted(k for k in sig if k not in bar_keys)
+
+
+def _sigs_to_table(sigs: List[dict], schema: pa.Schema) -> pa.Table:
+    """按 schema 把信号列表转换为 pyarrow.Table，缺少的列为空值，多余的列丢弃"""
+    arrays = [pa.array([x.get(field.name) for x in sigs], type=field.type) for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _symbol_signals_to_parquet(symbol: str, read_bars: Callable, signals_config: List[dict], path: str,
+                               columns: Optional[List[str]], chunk_size: int, base_freq: str, bar_sdt, sdt, edt,
+                               read_bars_kwargs: dict, gsc_kwargs: dict, tz: Optional[str] = None) -> dict:
+    """生成单个标的的信号，分块写入 path/{symbol}.parquet
+
+    :param columns: 信号列，为 None 时使用第一块信号中的信号列和K线时区
+    :param tz: K线时间的时区，columns 为 None 时忽略
+    :return: 执行结果，status 取值 done - 完成, empty - 没有信号, failed - 失败
+    """
+    start_time = time.time()
+    file_sigs = os.path.join(path, f"{symbol}.parquet")
+    file_tmp = os.path.join(path, f".{symbol}.parquet.tmp")
+    res = {"symbol": symbol, "status": "done", "rows": 0, "seconds": 0.0, "columns": columns, "tz": tz}
+    writer = None
+    try:
+        bars = read_bars(symbol, freq=base_freq, sdt=bar_sdt, edt=edt, **read_bars_kwargs)
+        chunks = iter_czsc_signals(bars, signals_config, sdt=sdt, chunk_size=chunk_size, verbose=False, **gsc_kwargs)
+        for chunk in chunks:
+            if columns is None:
+                columns = res["columns"] = _get_signal_columns(chunk[0])
+                tz = res["tz"] = _get_dt_tz(chunk[0])
+            schema = signals_schema(columns, tz)
+
+            extra = set(_get_signal_columns(chunk[0])) - set(columns)
+            if extra:
+                logger.warning(f"{symbol} 的信号列 {sorted(extra)} 不在数据集的列结构中，已丢弃")
+
+            if writer is None:
+                writer = pq.ParquetWriter(file_tmp, schema)
+            writer.write_table(_sigs_to_table(chunk, schema), row_group_size=len(chunk))
+            res["rows"] += len(chunk)
+
+        if writer is None:
+            res["status"] = "empty"
+            if columns is not None:
+                # 写入空文件，断点续跑时跳过
+                pq.write_table(signals_schema(columns, tz).empty_table(), file_tmp)
+                os.replace(file_tmp, file_sigs)
+        else:
+            writer.close()
+            os.replace(file_tmp, file_sigs)
+
+    except Exception as e:
+        logger.exception(f"{symbol} 信号生成失败：{e}")
+        res["status"] = "failed"
+        if writer is not None:
+            writer.close()
+        if os.path.exists(file_tmp):
+            os.remove(file_tmp)
+
+    res["seconds"] = time.time() - start_time
+    return res
+
+
+def generate_signals_dataset(symbols: List[str], read_bars: Callable, signals_config: List[dict], path: str,
+                             sdt: Union[AnyStr, datetime] = "20170101", edt: Union[AnyStr, datetime, None] = None,
+                             bar_sdt: Union[AnyStr, datetime, None] = None, n_jobs: int = 1, chunk_size: int = 10000,
+                             **kwargs) -> pd.DataFrame:
+    """多进程生成多个标的的信号，每个标的的信号分块写入一个 Parquet 文件，内存占用只与 chunk_size 有关
+
+    1. 第一个有信号的标的确定数据集的信号列，保存在 path/_meta.json 中，所有标的文件的列结构相同；
+    2. 每个标的先写入临时文件，完成后重命名为 path/{symbol}.parquet；
+    3. 中断后使用相同的参数重新执行，跳过已经完成的标的，使用不同的信号配置或时间范围时抛出 ValueError；
+       没有指定 edt 时沿用上次保存的 edt，隔天续跑不会因为默认的结束时间变化而报错。
+
+    :param symbols: 标的列表
+    :param read_bars: 读取K线数据的函数，多进程执行时必须是可以 pickle 的模块级函数，函数签名如下：
+        read_bars(symbol, freq, sdt, edt, **read_bars_kwargs) -> List[RawBar]
+    :param signals_config: 信号函数配置
+    :param path: 数据集目录
+    :param sdt: 信号计算开始时间
+    :param edt: 信号计算结束时间，默认为当天；断点续跑时默认沿用数据集中保存的结束时间
+    :param bar_sdt: K线数据开始时间，默认为 sdt 之前三年
+    :param n_jobs: 进程数量，默认为 1，在当前进程中执行
+    :param chunk_size: 每个 row group 包含的K线数量
+    :param kwargs: 其他参数
+
+        - base_freq: 基础周期，默认为 signals_config 中最小的周期
+        - read_bars_kwargs: 传给 read_bars 的其他参数，如 {'fq': '后复权'}
+        - 其余参数传给 iter_czsc_signals，如 init_n, bg_max_count
+
+    :return: 各标的的执行结果，列为 symbol, status, rows, seconds；
+        status 取值 done - 本次完成, skipped - 已有结果, empty - 没有信号, failed - 失败
+    """
+    os.makedirs(path, exist_ok=True)
+    read_bars_kwargs = kwargs.pop("read_bars_kwargs", {})
+    base_freq = kwargs.pop("base_freq", None) or get_signals_freqs(signals_config)[0]
+    sdt = pd.to_datetime(sdt)
+    bar_sdt = pd.to_datetime(bar_sdt) if bar_sdt else sdt - pd.Timedelta(days=365 * 3)
+
+    # 没有指定 edt 时，断点续跑沿用数据集中保存的 edt，不受重新执行的日期影响
+    file_meta = os.path.join(path, "_meta.json")
+    old_meta = read_json(file_meta) if os.path.exists(file_meta) else None
+    if edt:
+        edt = pd.to_datetime(edt)
+    elif old_meta is not None:
+        edt = pd.to_datetime(old_meta["edt"])
+    else:
+        edt = pd.Timestamp.now().normalize()
+
+    meta = {"signals_config_hash": signals_config_hash(signals_config), "base_freq": base_freq,
+            "bar_sdt": str(bar_sdt), "sdt": str(sdt), "edt": str(edt), "columns": None, "tz": None}
+    if old_meta is not None:
+        if any(old_meta[k] != v for k, v in meta.items() if k not in ("columns", "tz")):
+            raise ValueError(f"{path} 中的数据集由其他信号配置或时间范围生成，请更换 path 或删除后重新生成")
+        meta["columns"], meta["tz"] = old_meta["columns"], old_meta.get("tz")
+    save_json(meta, file_meta)
+
+    done = set()
+    for file in os.listdir(path):
+        if file.startswith(".") and file.endswith(".parquet.tmp"):
+            os.remove(os.path.join(path, file))     # 上次中断时没有写完的文件
+        elif file.endswith(".parquet"):
+            done.add(file[:-len(".parquet")])
+
+    rows = [{"symbol": symbol, "status": "skipped", "rows": None, "seconds": 0.0}
+            for symbol in symbols if symbol in done]
+    todo = [symbol for symbol in symbols if symbol not in done]
+    logger.info(f"生成信号数据集，共 {len(symbols)} 个标的，已完成 {len(rows)} 个，使用 {n_jobs} 个进程；结果保存在 {path}")
+
+    task = dict(read_bars=read_bars, signals_config=signals_config, path=path, chunk_size=chunk_size,
+                base_freq=base_freq, bar_sdt=bar_sdt, sdt=sdt, edt=edt,
+                read_bars_kwargs=read_bars_kwargs, gsc_kwargs=kwargs)
+
+    # 数据集还没有信号列时，在当前进程中逐个执行，直到得到第一个有信号的标的
+    empty = []
+    while meta["columns"] is None and todo:
+        res = _symbol_signals_to_parquet(todo.pop(0), columns=None, **task)
+        if res["status"] == "empty":
+            empty.append(res["symbol"])
+            continue
+        if res["columns"] is not None:
+            meta["columns"], meta["tz"] = res["columns"], res["tz"]
+            save_json(meta, file_meta)
+        rows.append(res)
+
+    if meta["columns"] is None:
+        rows.extend({"symbol": symbol, "status": "empty", "rows": 0, "seconds": 0.0} for symbol in empty)
+        todo = []
+    else:
+        todo = empty + todo
+
+    if n_jobs <= 1:
+        for symbol in tqdm(todo, desc="generate signals dataset"):
+            rows.append(_symbol_signals_to_parquet(symbol, columns=meta["columns"], tz=meta["tz"], **task))
+    else:
+        with ProcessPoolExecutor(n_jobs) as pool:
+            futures = [pool.submit(_symbol_signals_to_parquet, symbol, columns=meta["columns"], tz=meta["tz"], **task)
+                       for symbol in todo]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="generate signals dataset"):
+                rows.append(future.result())
+
+    df = pd.DataFrame(rows, columns=["symbol", "status", "rows", "seconds"])
+    logger.info(f"信号数据集生成完成：{df['status'].value_counts().to_dict()}")
+    return df
+
+
+def read_signals_dataset(path: str, symbols: Optional[List[str]] = None, columns: Optional[List[str]] = None,
+                         sdt: Union[AnyStr, datetime, None] = None,
+                         edt: Union[AnyStr, datetime, None] = None) -> pd.DataFrame:
+    """读取 generate_signals_dataset 生成的信号数据集，只读取需要的标的、列和时间范围
+
+    :param path: 数据集目录
+    :param symbols: 标的列表，默认读取全部标的
+    :param columns: 列名列表，默认读取全部列
+    :param sdt: 开始时间（包含），K线带时区时，不带时区的时间按K线时区的当地时间处理
+    :param edt: 结束时间（包含），同 sdt
+    :return: 信号数据
+    """
+    meta = read_json(os.path.join(path, "_meta.json"))
+    schema = signals_schema(meta["columns"] or [], meta.get("tz"))
+    if symbols is not None:
+        files = [os.path.join(path, f"{symbol}.parquet") for symbol in symbols]
+        files = [file for file in files if os.path.exists(file)]
+    else:
+        files = path
+    return _read_parquet(files, schema, columns, sdt, edt)
+
+
+def _read_parquet(files, schema: pa.Schema, columns=None, sdt=None, edt=None) -> pd.DataFrame:
+    """按 schema 读取 Parquet 文件列表或目录，只读取需要的列和时间范围"""
+    if not files:
+        return schema.empty_table().select(columns or schema.names).to_pandas()
+
+    dataset = ds.dataset(files, format="parquet", schema=schema)
+    tz = schema.field("dt").type.tz
+    expr = None
+    if sdt is not None:
+        expr = ds.field("dt") >= _dt_scalar(sdt, tz)
+    if edt is not None:
+        cond = ds.field("dt") <= _dt_scalar(edt, tz)
+        expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+class SignalsStore:
+    """按 (标的, 信号配置) 持久化的信号库
+
+    目录结构：
+
+        path/{signals_config_hash}/
+            signals_config.json
+            {symbol}/
+                state.pkl               # 最后一根K线处的 CzscSignals 对象，最后一根输入K线的时间，已提交的信号文件列表、信号列
+                meta.json               # state.pkl 中除 CzscSignals 对象以外的信息，读取信号时不需要加载 state.pkl
+                part-00000.parquet      # 每次 update 追加一个信号文件，compact 时合并
+
+    先写入信号文件，再替换 state.pkl；state.pkl 是提交点，中断后没有提交的信号文件在下次 update 时删除。
+    """
+
+    def __init__(self, path: str, signals_config: List[dict], sdt: Union[AnyStr, datetime] = "20170101", **kwargs):
+        """
+
+        :param path: 信号库目录
+        :param signals_config: 信号函数配置
+        :param sdt: 信号计算开始时间，只在标的第一次 update 时使用
+        :param kwargs: 第一次 update 时传给 create_czsc_signals 的参数，如 init_n, bg_max_count
+        """
+        self.signals_config = signals_config
+        self.hash = signals_config_hash(signals_config)
+        self.path = os.path.join(path, self.hash)
+        self.sdt = sdt
+        self.kwargs = kwargs
+        os.makedirs(self.path, exist_ok=True)
+        file_config = os.path.join(self.path, "signals_config.json")
+        if not os.path.exists(file_config):
+            save_json(json.loads(json.dumps(signals_config, ensure_ascii=False, default=str)), file_config)
+
+    def __repr__(self):
+        return f"<SignalsStore~{self.hash}>"
+
+    @property
+    def symbols(self) -> List[str]:
+        """已经保存信号的标的列表"""
+        return sorted(x for x in os.listdir(self.path) if os.path.exists(os.path.join(self.path, x, "state.pkl")))
+
+    def _load_state(self, symbol: str) -> Optional[dict]:
+        file_state = os.path.join(self.path, symbol, "state.pkl")
+        return dill_load(file_state) if os.path.exists(file_state) else None
+
+    def _get_meta(self, symbol: str) -> Optional[dict]:
+        file_meta = os.path.join(self.path, symbol, "meta.json")
+        return read_json(file_meta) if os.path.exists(file_meta) else None
+
+    def _commit(self, symbol: str, state: dict):
+        """替换 state.pkl 提交本次更新"""
+        symbol_path = os.path.join(self.path, symbol)
+        dill_dump(state, os.path.join(symbol_path, ".state.pkl.tmp"))
+        os.replace(os.path.join(symbol_path, ".state.pkl.tmp"), os.path.join(symbol_path, "state.pkl"))
+        self._sync(symbol, state)
+
+    def _sync(self, symbol: str, state: dict):
+        """使 meta.json 与 state.pkl 一致，删除不在 state["parts"] 中的信号文件；提交后中断时，下次 update 恢复一致"""
+        symbol_path = os.path.join(self.path, symbol)
+        meta = {"parts": state["parts"], "columns": state["columns"], "tz": state.get("tz"),
+                "end_dt": str(state["end_dt"])}
+        if meta != self._get_meta(symbol):
+            save_json(meta, os.path.join(symbol_path, ".meta.json.tmp"))
+            os.replace(os.path.join(symbol_path, ".meta.json.tmp"), os.path.join(symbol_path, "meta.json"))
+
+        for file in os.listdir(symbol_path):
+            if file.startswith("part-") and file not in state["parts"]:
+                os.remove(os.path.join(symbol_path, file))
+
+    def _write_part(self, symbol: str, state: dict, table: pa.Table):
+        """写入一个新的信号文件，文件名按 state["seq"] 递增，提交前不会被读取"""
+        file = f"part-{state['seq']:05d}.parquet"
+        pq.write_table(table, os.path.join(self.path, symbol, file))
+        state["seq"] += 1
+        return file
+
+    def get_state(self, symbol: str) -> Optional[CzscSignals]:
+        """获取标的最后一根K线处的 CzscSignals 对象，没有保存时返回 None"""
+        state = self._load_state(symbol)
+        return state["cs"] if state else None
+
+    def get_end_dt(self, symbol: str) -> Optional[pd.Timestamp]:
+        """获取标的最后一根已计算信号的K线时间，没有保存时返回 None；增量更新时，只需要读取这个时间之后的K线"""
+        meta = self._get_meta(symbol)
+        return pd.to_datetime(meta["end_dt"]) if meta else None
+
+    def update(self, symbol: str, bars: List[RawBar]) -> pd.DataFrame:
+        """输入标的的基础周期K线，计算上次保存的最后一根K线之后的新K线的信号，并追加保存
+
+        第一次 update 时，按 sdt 全量计算信号；之后只使用 dt 大于上次最后一根K线的K线，bars 可以只包含新K线，
+        耗时只与新K线的数量有关
+
+        :param symbol: 标的代码
+        :param bars: 基础周期已完成K线
+        :return: 本次新增的信号，列结构与 read 一致
+        """
+        os.makedirs(os.path.join(self.path, symbol), exist_ok=True)
+        state = self._load_state(symbol)
+
+        if state is None:
+            cs, bars_right = None, []
+            if bars:
+                cs, bars_right = create_czsc_signals(bars, self.signals_config, sdt=self.sdt, **self.kwargs)
+            if cs is None:
+                logger.warning(f"{symbol} 在 {self.sdt} 之后没有K线，无法进行信号生成")
+                return pd.DataFrame()
+            state = {"cs": cs, "parts": [], "seq": 0, "columns": None, "tz": None, "end_dt": None}
+        else:
+            self._sync(symbol, state)
+            cs = state["cs"]
+            bars_right = [x for x in bars if x.dt > state["end_dt"]]
+
+        if not bars_right:
+            return pd.DataFrame()
+
+        sigs = []
+        for bar in bars_right:
+            cs.update_signals(bar)
+            sigs.append(dict(cs.s))
+        state["end_dt"] = bars_right[-1].dt
+
+        if state["columns"] is None:
+            state["columns"] = _get_signal_columns(sigs[0])
+            state["tz"] = _get_dt_tz(sigs[0])
+        extra = set(_get_signal_columns(sigs[0])) - set(state["columns"])
+        if extra:
+            logger.warning(f"{symbol} 的信号列 {sorted(extra)} 不在信号库的列结构中，已丢弃")
+
+        table = _sigs_to_table(sigs, signals_schema(state["columns"], state.get("tz")))
+        state["parts"].append(self._write_part(symbol, state, table))
+        self._commit(symbol, state)
+        return table.to_pandas()
+
+    def read(self, symbol: str, sdt: Union[AnyStr, datetime, None] = None, edt: Union[AnyStr, datetime, None] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取标的已保存的信号
+
+        :param symbol: 标的代码
+        :param sdt: 开始时间（包含），K线带时区时，不带时区的时间按K线时区的当地时间处理
+        :param edt: 结束时间（包含），同 sdt
+        :param columns: 列名列表，默认读取全部列
+        :return: 信号数据
+        """
+        meta = self._get_meta(symbol)
+        if meta is None:
+            return pd.DataFrame()
+        files = [os.path.join(self.path, symbol, file) for file in meta["parts"]]
+        return _read_parquet(files, signals_schema(meta["columns"], meta.get("tz")), columns, sdt, edt)
+
+    def compact(self, symbol: str):
+        """把标的的多个信号文件合并为一个；每天追加更新后，可以定期执行，减少小文件的数量"""
+        state = self._load_state(symbol)
+        if state is None or len(state["parts"]) <= 1:
+            return
+
+        files = [os.path.join(self.path, symbol, file) for file in state["parts"]]
+        table = ds.dataset(files, format="parquet", schema=signals_schema(state["columns"], state.get("tz"))).to_table()
+        state["parts"] = [self._write_part(symbol, state, table)]
+        self._commit(symbol, state)
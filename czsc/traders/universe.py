@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 多标的常驻 CZSC 引擎：按标的把 CZSC / CzscSignals 对象分片保存在常驻工作进程中，增量更新信号
+
+使用示例：
+
+    from czsc.traders.universe import CzscUniverse
+
+    with CzscUniverse(get_signals=my_get_signals, max_workers=4) as u:
+        u.init({symbol: bars for symbol, bars in history.items()})      # 只需要初始化一次
+        ...
+        sigs = u.update({symbol: new_bars for symbol, new_bars in today.items()})   # 收盘后只推送新K线
+        res = u.apply(trend_reverse_bi, fx_dt_limit=5)                  # 在各工作进程中对 CZSC 对象执行选股函数
+"""
+import zlib
+import multiprocessing
+from loguru import logger
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Iterable, Any
+from czsc.analyze import CZSC
+from czsc.objects import RawBar
+from czsc.utils.bar_generator import BarGenerator
+from czsc.traders.base import CzscSignals
+from czsc.traders.sig_parse import get_signals_freqs
+
+
+class _UniverseShard:
+    """一个分片内的全部标的状态，在工作进程中常驻；max_workers=0 时直接在主进程中使用"""
+
+    def __init__(self, get_signals: Optional[Callable] = None, signals_config: Optional[List[dict]] = None, **kwargs):
+        """
+
+        :param get_signals: CZSC 模式下的信号计算函数，必须是可以 pickle 的模块级函数
+        :param signals_config: CzscSignals 模式下的信号配置，指定后每个标的保存一个 CzscSignals 对象
+        :param kwargs: 其他参数
+
+            - max_bi_num: CZSC 对象保留的最大笔数量
+            - init_n: CzscSignals 模式下用于 BarGenerator 初始化的基础周期K线数量，默认 500
+            - bg_max_count: CzscSignals 模式下 BarGenerator 各周期保留的最大K线数量，默认 5000
+        """
+        self.get_signals = get_signals
+        self.signals_config = signals_config
+        self.kwargs = kwargs
+        self.objs: Dict[str, Any] = {}
+
+    def __create(self, bars: List[RawBar]):
+        """使用历史K线创建标的状态，历史K线上不计算信号，只在最后一根K线上计算一次"""
+        if not self.signals_config:
+            kw = {"max_bi_num": self.kwargs["max_bi_num"]} if "max_bi_num" in self.kwargs else {}
+            return CZSC(bars, get_signals=self.get_signals, warmup=True, **kw)
+
+        init_n = self.kwargs.get("init_n", 500)
+        base_freq = str(bars[0].freq.value)
+        freqs = [x for x in get_signals_freqs(self.signals_config) if x != base_freq]
+        bg = BarGenerator(base_freq=base_freq, freqs=freqs, max_count=self.kwargs.get("bg_max_count", 5000))
+        for bar in bars[:init_n]:
+            bg.update(bar)
+        cs = CzscSignals(bg, signals_config=self.signals_config)
+        cs.warm_up(bars[init_n:])
+        return cs
+
+    @staticmethod
+    def __latest(obj) -> OrderedDict:
+        return obj.s if isinstance(obj, CzscSignals) else obj.signals
+
+    def init(self, symbol_bars: Dict[str, List[RawBar]]) -> Dict[str, OrderedDict]:
+        """使用历史K线创建（或替换）标的状态，返回各标的最新信号"""
+        res = {}
+        for symbol, bars in symbol_bars.items():
+            if not bars:
+                continue
+            try:
+                self.objs[symbol] = self.__create(bars)
+                res[symbol] = self.__latest(self.objs[symbol])
+            except Exception as e:
+                logger.exception(f"{symbol} 初始化失败：{e}")
+        return res
+
+    def update(self, symbol_bars: Dict[str, List[RawBar]]) -> Dict[str, OrderedDict]:
+        """输入各标的的新K线，增量更新，返回各标的最新信号
+
+        1. 已经处理过的K线会被跳过；CZSC 模式下与最后一根K线时间相同的K线视为对它的更新；
+        2. 一批新K线中只有最后一根计算信号；
+        3. 没有历史状态的标的，直接使用输入的K线创建。
+        """
+        res = {}
+        for symbol, bars in symbol_bars.items():
+            obj = self.objs.get(symbol)
+            if obj is None:
+                res.update(self.init({symbol: bars}))
+                continue
+
+            try:
+                if isinstance(obj, CzscSignals):
+                    bars = [x for x in bars if x.dt > obj.end_dt]
+                    obj.warm_up(bars)
+                else:
+                    bars = [x for x in bars if x.dt >= obj.bars_raw[-1].dt]
+                    get_signals, obj.get_signals = obj.get_signals, None
+                    try:
+                        for bar in bars[:-1]:
+                            obj.update(bar)
+                    finally:
+                        obj.get_signals = get_signals
+                    if bars:
+                        obj.update(bars[-1])
+                res[symbol] = self.__latest(obj)
+            except Exception as e:
+                logger.exception(f"{symbol} 更新失败：{e}")
+        return res
+
+    def signals(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, OrderedDict]:
+        """获取各标的最新信号"""
+        symbols = self.objs.keys() if symbols is None else [x for x in symbols if x in self.objs]
+        return {symbol: self.__latest(self.objs[symbol]) for symbol in symbols}
+
+    def apply(self, func: Callable, symbols: Optional[Iterable[str]] = None, **kwargs) -> Dict[str, Any]:
+        """对各标的的 CZSC / CzscSignals 对象执行 func(obj, **kwargs)，返回各标的的执行结果"""
+        symbols = list(self.objs.keys()) if symbols is None else [x for x in symbols if x in self.objs]
+        res = {}
+        for symbol in symbols:
+            try:
+                res[symbol] = func(self.objs[symbol], **kwargs)
+            except Exception as e:
+                logger.exception(f"{symbol} 执行 {func} 失败：{e}")
+        return res
+
+    def drop(self, symbols: Iterable[str]) -> List[str]:
+        """移除标的状态，返回实际移除的标的"""
+        return [x for x in symbols if self.objs.pop(x, None) is not None]
+
+    def symbols(self) -> List[str]:
+        return list(self.objs.keys())
+
+
+def _shard_worker(conn, shard_kwargs: dict):
+    """工作进程主循环：持有一个 _UniverseShard，按主进程发送的指令执行并返回结果"""
+    shard = _UniverseShard(**shard_kwargs)
+    while True:
+        method, args, kwargs = conn.recv()
+        if method == "close":
+            break
+        try:
+            conn.send((True, getattr(shard, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class CzscUniverse:
+    """多标的常驻 CZSC 引擎
+
+    按标的代码把 CZSC（或 CzscSignals）对象分片到 max_workers 个常驻工作进程中，每个标的始终由同一个进程处理；
+    初始化之后只需要推送新K线，更新成本只与新K线数量有关，不需要重新读取和计算历史K线。
+
+    信号函数、apply 的执行函数都会发送到工作进程中执行，必须是可以 pickle 的模块级函数。
+    """
+
+    def __init__(self, get_signals: Optional[Callable] = None, signals_config: Optional[List[dict]] = None,
+                 max_workers: int = 4, **kwargs):
+        """
+
+        :param get_signals: CZSC 模式下的信号计算函数，输入 CZSC 对象，返回信号字典
+        :param signals_config: CzscSignals 模式下的信号配置，参考 czsc.traders.base.CzscSignals
+        :param max_workers: 工作进程数量；为 0 时不创建子进程，所有标的在主进程中计算，便于调试
+        :param kwargs: 其他参数，参考 _UniverseShard
+        """
+        self.max_workers = max_workers
+        shard_kwargs = dict(get_signals=get_signals, signals_config=signals_config, **kwargs)
+        self.__conns = []
+        self.__procs = []
+        if max_workers <= 0:
+            self.__local = _UniverseShard(**shard_kwargs)
+            return
+
+        self.__local = None
+        for _ in range(max_workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            p = multiprocessing.Process(target=_shard_worker, args=(child_conn, shard_kwargs), daemon=True)
+            p.start()
+            child_conn.close()
+            self.__conns.append(parent_conn)
+            self.__procs.append(p)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __shard_index(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode("utf-8")) % self.max_workers
+
+    def __call(self, method: str, payloads: Optional[List[tuple]] = None, *args, **kwargs):
+        """在所有分片上执行 method，payloads 为各分片的位置参数；返回各分片结果的列表"""
+        if self.__local is not None:
+            return [getattr(self.__local, method)(*(payloads[0] if payloads else args), **kwargs)]
+
+        if not self.__conns:
+            raise RuntimeError("CzscUniverse 已关闭")
+        for i, conn in enumerate(self.__conns):
+            conn.send((method, payloads[i] if payloads else args, kwargs))
+
+        results, errors = [], []
+        for conn in self.__conns:
+            ok, value = conn.recv()
+            (results if ok else errors).append(value)
+        if errors:
+            raise errors[0]
+        return results
+
+    def __split(self, symbol_bars: Dict[str, List[RawBar]]) -> List[tuple]:
+        """按标的代码把输入拆分到各个分片"""
+        if self.__local is not None:
+            return [(symbol_bars,)]
+        shards = [{} for _ in range(self.max_workers)]
+        for symbol, bars in symbol_bars.items():
+            shards[self.__shard_index(symbol)][symbol] = bars
+        return [(x,) for x in shards]
+
+    @staticmethod
+    def __merge(results: List[dict]) -> dict:
+        res = {}
+        for x in results:
+            res.update(x)
+        return res
+
+    def init(self, symbol_bars: Dict[str, List[RawBar]]) -> Dict[str, OrderedDict]:
+        """使用历史K线创建（或替换）各标的的 CZSC 对象，历史K线上不计算信号
+
+        :param symbol_bars: {标的代码: 历史K线列表}
+        :return: {标的代码: 最新信号}
+        """
+        return self.__merge(self.__call("init", self.__split(symbol_bars)))
+
+    def update(self, symbol_bars: Dict[str, List[RawBar]]) -> Dict[str, OrderedDict]:
+        """推送各标的的新K线，增量更新并返回最新信号
+
+        :param symbol_bars: {标的代码: 新K线列表}，已经处理过的K线会被跳过，未初始化的标的直接用这些K线创建
+        :return: {标的代码: 最新信号}，只包含本次推送的标的
+        """
+        return self.__merge(self.__call("update", self.__split(symbol_bars)))
+
+    def signals(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, OrderedDict]:
+        """获取最新信号，默认返回全部标的"""
+        symbols = list(symbols) if symbols is not None else None
+        return self.__merge(self.__call("signals", None, symbols))
+
+    def apply(self, func: Callable, symbols: Optional[Iterable[str]] = None, **kwargs) -> Dict[str, Any]:
+        """在各工作进程中对 CZSC / CzscSignals 对象执行 func(obj, **kwargs)，只返回执行结果，不传输对象本身
+
+        :param func: 可以 pickle 的模块级函数
+        :param symbols: 指定标的，默认全部标的
+        :return: {标的代码: 执行结果}
+        """
+        symbols = list(symbols) if symbols is not None else None
+        return self.__merge(self.__call("apply", None, func, symbols, **kwargs))
+
+    def drop(self, symbols: Iterable[str]) -> List[str]:
+        """移除标的状态，返回实际移除的标的"""
+        symbols = list(symbols)
+        return sum(self.__call("drop", None, symbols), [])
+
+    @property
+    def symbols(self) -> List[str]:
+        return sum(self.__call("symbols"), [])
+
+    def close(self):
+        """关闭全部工作进程"""
+        for conn, p in zip(self.__conns, self.__procs):
+            try:
+                conn.send(("close", (), {}))
+                conn.close()
+            except (OSError, BrokenPipeError):
+                pass
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.__conns, self.__procs = [], []
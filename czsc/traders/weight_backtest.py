@@ -11,6 +11,7 @@ import plotly.express as px
 from tqdm import tqdm
 from loguru import logger
 from pathlib import Path
+from collections import deque
 from deprecated import deprecated
 from typing import Union, AnyStr, Callable
 from multiprocessing import cpu_count
@@ -267,6 +268,7 @@ class WeightBacktest:
 
             - fee_rate: float，单边交易成本，包括手续费与冲击成本, 默认为 0.0002
             - n_jobs: int, 并行计算的进程数，默认为 min(cpu_count() // 2, len(self.symbols))
+            - pairs_match: str, 开平交易的配对方式，可选值 ['LIFO', 'FIFO']，默认为 LIFO，即后开先平
 
         """
         self.kwargs = kwargs
@@ -342,110 +344,78 @@ class WeightBacktest:
 
         函数计算逻辑：
 
-        1. 从实例变量self.dfw中筛选出交易标的为symbol的数据，并复制到新的DataFrame dfs。
-        2. 将权重乘以10的self.digits次方，并转换为整数类型，作为volume列的值。
-        3. 生成bar_id列，从1开始递增，与行数对应。
-        4. 创建一个空列表operates，用于存储开平仓交易记录。
-        5. 定义内部函数__add_operate，用于向operates列表中添加开平仓交易记录。
-           函数接受日期dt、bar_id、交易量volume、价格price和操作类型operate作为参数。
-           函数根据交易量的绝对值循环添加交易记录到operates列表中。
-        6. 将dfs转换为字典列表rows。
-        7. 处理第一个行记录。
-           - 如果volume大于0，则调用__add_operate函数添加"开多"操作的交易记录。
-           - 如果volume小于0，则调用__add_operate函数添加"开空"操作的交易记录。
-        8. 处理后续的行记录。
-           - 使用zip函数遍历rows[:-1]和rows[1:]，同时获取当前行row1和下一行row2。
-           - 根据volume的正负和变化情况，调用__add_operate函数添加对应的开平仓交易记录。
-        9. 创建空列表pairs和opens，用于存储交易对和开仓记录。
-        10. 遍历operates列表中的交易记录。
-            - 如果操作类型为"开多"或"开空"，将交易记录添加到opens列表中，并继续下一次循环。
-            - 如果操作类型为"平多"或"平空"，将对应的开仓记录从opens列表中弹出。
-              根据开仓和平仓的价格计算盈亏比例，并创建一个交易对字典，将其添加到pairs列表中。
-        11. 将pairs列表转换为DataFrame，并返回包含交易标的的开平仓交易记录的DataFrame。
+        1. 从实例变量self.dfw中筛选出交易标的为symbol的数据，将权重乘以10的self.digits次方，并转换为整数类型，作为持仓数量volume。
+        2. 只遍历volume发生变化的K线，按变化量更新开仓批次列表lots，每个批次记录开仓K线的位置和剩余数量：
+           - 同方向加仓，新增一个开仓批次；
+           - 同方向减仓，按配对方式从开仓批次中扣减数量，每个被扣减的批次生成一条开平交易；
+           - 多空转换，先平掉所有开仓批次，再按新的持仓数量开仓。
+        3. 配对方式由 kwargs 中的 pairs_match 参数决定，默认 LIFO，后开先平；可选 FIFO，先开先平。
+        4. 同一个开仓批次在同一根K线上平掉的数量合并为一条开平交易，持仓数量列记录合并的数量；
+           evaluate_pairs 按持仓数量加权统计，结果与逐个单位配对一致。
+        5. 根据开平仓的价格计算盈亏比例，返回包含交易标的的开平仓交易记录的DataFrame。
 
         """
-        dfs = self.dfw[self.dfw["symbol"] == symbol].copy()
-        dfs["volume"] = (dfs["weight"] * pow(10, self.digits)).astype(int)
-        dfs["bar_id"] = list(range(1, len(dfs) + 1))
-
-        # 根据权重变化生成开平仓记录
-        operates = []
-
-        def __add_operate(dt, bar_id, volume, price, operate):
-            for _ in range(abs(volume)):
-                _op = {"bar_id": bar_id, "dt": dt, "price": price, "operate": operate}
-                operates.append(_op)
-
-        rows = dfs.to_dict(orient="records")
-
-        # 处理第一个 row
-        if rows[0]["volume"] > 0:
-            __add_operate(rows[0]["dt"], rows[0]["bar_id"], rows[0]["volume"], rows[0]["price"], operate="开多")
-        elif rows[0]["volume"] < 0:
-            __add_operate(rows[0]["dt"], rows[0]["bar_id"], rows[0]["volume"], rows[0]["price"], operate="开空")
-
-        # 处理后续 rows
-        for row1, row2 in zip(rows[:-1], rows[1:]):
-            if row1["volume"] >= 0 and row2["volume"] >= 0:
-                # 多头仓位变化对应的操作
-                if row2["volume"] > row1["volume"]:
-                    __add_operate(
-                        row2["dt"], row2["bar_id"], row2["volume"] - row1["volume"], row2["price"], operate="开多"
-                    )
-                elif row2["volume"] < row1["volume"]:
-                    __add_operate(
-                        row2["dt"], row2["bar_id"], row1["volume"] - row2["volume"], row2["price"], operate="平多"
-                    )
-
-            elif row1["volume"] <= 0 and row2["volume"] <= 0:
-                # 空头仓位变化对应的操作
-                if row2["volume"] > row1["volume"]:
-                    __add_operate(
-                        row2["dt"], row2["bar_id"], row1["volume"] - row2["volume"], row2["price"], operate="平空"
-                    )
-                elif row2["volume"] < row1["volume"]:
-                    __add_operate(
-                        row2["dt"], row2["bar_id"], row2["volume"] - row1["volume"], row2["price"], operate="开空"
-                    )
-
-            elif row1["volume"] >= 0 >= row2["volume"]:
-                # 多头转换成空头对应的操作
-                __add_operate(row2["dt"], row2["bar_id"], row1["volume"], row2["price"], operate="平多")
-                __add_operate(row2["dt"], row2["bar_id"], row2["volume"], row2["price"], operate="开空")
-
-            elif row1["volume"] <= 0 <= row2["volume"]:
-                # 空头转换成多头对应的操作
-                __add_operate(row2["dt"], row2["bar_id"], row1["volume"], row2["price"], operate="平空")
-                __add_operate(row2["dt"], row2["bar_id"], row2["volume"], row2["price"], operate="开多")
-
-        pairs, opens = [], []
-        for op in operates:
-            if op["operate"] in ["开多", "开空"]:
-                opens.append(op)
-                continue
-
-            assert op["operate"] in ["平多", "平空"]
-            open_op = opens.pop()
-            if open_op["operate"] == "开多":
-                p_ret = round((op["price"] - open_op["price"]) / open_op["price"] * 10000, 2)
-                p_dir = "多头"
+        dfs = self.dfw[self.dfw["symbol"] == symbol]
+        volume = (dfs["weight"] * pow(10, self.digits)).astype(int).to_numpy()
+        pairs_match = self.kwargs.get("pairs_match", "LIFO")
+        assert pairs_match in ["LIFO", "FIFO"], "pairs_match 参数错误，可选值 ['LIFO', 'FIFO']"
+        lifo = pairs_match == "LIFO"
+
+        lots = deque()  # 开仓批次，[开仓K线位置, 剩余数量]
+        opens, closes, nums, sides = [], [], [], []
+
+        def __close(i, n, side):
+            while n > 0:
+                lot = lots[-1] if lifo else lots[0]
+                m = min(n, lot[1])
+                opens.append(lot[0])
+                closes.append(i)
+                nums.append(m)
+                sides.append(side)
+                lot[1] -= m
+                n -= m
+                if lot[1] == 0 and lifo:
+                    lots.pop()
+                elif lot[1] == 0:
+                    lots.popleft()
+
+        last = 0
+        changed = np.flatnonzero(np.diff(volume, prepend=0))
+        for i, vol in zip(changed.tolist(), volume[changed].tolist()):
+            if last * vol < 0:
+                # 多空转换，先平掉所有开仓批次
+                __close(i, abs(last), last > 0)
+                last = 0
+
+            if abs(vol) > abs(last):
+                lots.append([i, abs(vol) - abs(last)])
             else:
-                p_ret = round((open_op["price"] - op["price"]) / open_op["price"] * 10000, 2)
-                p_dir = "空头"
-            pair = {
-                "标的代码": symbol,
-                "交易方向": p_dir,
-                "开仓时间": open_op["dt"],
-                "平仓时间": op["dt"],
-                "开仓价格": open_op["price"],
-                "平仓价格": op["price"],
-                "持仓K线数": op["bar_id"] - open_op["bar_id"] + 1,
-                "事件序列": f"{open_op['operate']} -> {op['operate']}",
-                "持仓天数": (op["dt"] - open_op["dt"]).days,
-                "盈亏比例": p_ret,
-            }
-            pairs.append(pair)
-        df_pairs = pd.DataFrame(pairs)
+                __close(i, abs(last) - abs(vol), last > 0)
+            last = vol
+
+        columns = ["标的代码", "交易方向", "开仓时间", "平仓时间", "开仓价格", "平仓价格",
+                   "持仓K线数", "事件序列", "持仓天数", "盈亏比例", "持仓数量"]
+        if not opens:
+            return pd.DataFrame(columns=columns)
+
+        opens, closes, is_long = np.array(opens), np.array(closes), np.array(sides)
+        dts, prices = dfs["dt"].reset_index(drop=True), dfs["price"].to_numpy()
+        p1, p2 = prices[opens], prices[closes]
+        p_ret = np.where(is_long, (p2 - p1) / p1 * 10000, (p1 - p2) / p1 * 10000)
+        dt1, dt2 = dts.iloc[opens].reset_index(drop=True), dts.iloc[closes].reset_index(drop=True)
+        df_pairs = pd.DataFrame({
+            "标的代码": symbol,
+            "交易方向": np.where(is_long, "多头", "空头"),
+            "开仓时间": dt1,
+            "平仓时间": dt2,
+            "开仓价格": p1,
+            "平仓价格": p2,
+            "持仓K线数": closes - opens + 1,
+            "事件序列": np.where(is_long, "开多 -> 平多", "开空 -> 平空"),
+            "持仓天数": (dt2 - dt1).dt.days,
+            "盈亏比例": [round(x, 2) for x in p_ret.tolist()],
+            "持仓数量": nums,
+        })
         return df_pairs
 
     def process_symbol(self, symbol):
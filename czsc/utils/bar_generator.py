@@ -5,9 +5,12 @@ email: zeng_bin8888@163.com
 create_dt: 2021/11/14 12:39
 describe: 从任意周期K线开始合成更高周期K线的工具类
 """
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, date
-from typing import List, Union, AnyStr, Optional
+from typing import List, Union, AnyStr, Optional, Callable
+from itertools import islice
+from collections import deque
 from czsc.objects import RawBar, Freq
 from pathlib import Path
 from loguru import logger
@@ -173,6 +176,134 @@ def freq_end_time(dt: datetime, freq: Union[Freq, AnyStr], market="A股") -> dat
     return freq_end_date(dt.date(), freq)
 
 
+_MINUTE_NS, _DAY_NS = 60 * 10 ** 9, 24 * 3600 * 10 ** 9
+_edt_minutes_map = {}
+
+
+def _edt_minutes(key):
+    """freq_edt_map[key] 转换为按当日分钟数索引的数组，值为结束时间的当日分钟数，-1 表示没有对应的结束时间"""
+    if key not in _edt_minutes_map:
+        arr = np.full(1440, -1, dtype=np.int64)
+        for k, v in freq_edt_map[key].items():
+            h, m = map(int, k.split(":"))
+            h_, m_ = map(int, v.split(":"))
+            arr[h * 60 + m] = h_ * 60 + m_
+        _edt_minutes_map[key] = arr
+    return _edt_minutes_map[key]
+
+
+def __freq_end_time_array(dts: pd.Series, freq: Freq, market="A股"):
+    """freq_end_time 的向量化实现，一次计算整列时间对应的K线周期结束时间，结果与逐个调用 freq_end_time 一致
+
+    :param dts: 时间序列，非 datetime64[ns] 类型（如带时区）时逐个调用 freq_end_time
+    :param freq: 目标周期
+    :param market: 市场名称，可选值：A股、期货、默认
+    :return: datetime64[ns] 类型的 np.ndarray
+    """
+    assert market in ['A股', '期货', '默认'], "market 参数必须为 A股 或 期货 或 默认"
+    if dts.dtype != "datetime64[ns]" or dts.isna().any():
+        return dts.apply(lambda x: freq_end_time(x, freq, market)).values
+
+    ns = dts.values.view(np.int64)
+    # 秒或微秒不为 0 时进位到下一分钟，纳秒部分与 datetime.replace 一样保持不变
+    rem = ns % _MINUTE_NS
+    nano = ns % 1000
+    ns = ns - rem + nano + np.where(rem >= 1000, _MINUTE_NS, 0)
+    day_ns = ns - ns % _DAY_NS
+
+    if freq.value.endswith("分钟"):
+        minutes = (ns % _DAY_NS - nano) // _MINUTE_NS
+        edt_minutes = _edt_minutes(f"{freq.value}_{market}")[minutes]
+        if (edt_minutes < 0).any():
+            m = int(minutes[np.argmax(edt_minutes < 0)])
+            raise KeyError(f"{m // 60:02d}:{m % 60:02d}")
+
+        edt = day_ns + edt_minutes * _MINUTE_NS + nano
+        if freq != Freq.F1:
+            edt += np.where((edt_minutes == 0) & (minutes != 0), _DAY_NS, 0)
+        return edt.view("datetime64[ns]")
+
+    days = day_ns.view("datetime64[ns]").astype("datetime64[D]")
+    if freq == Freq.W:
+        # 1970-01-01 是星期四，周一到周日对应 0 - 6
+        weekday = (days.view(np.int64) + 3) % 7
+        days = days + (4 - weekday)
+    elif freq == Freq.M:
+        days = (days.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+    elif freq == Freq.S:
+        months = days.astype("datetime64[M]").view(np.int64)
+        days = (months - months % 3 + 3).view("datetime64[M]").astype("datetime64[D]") - 1
+    elif freq == Freq.Y:
+        days = (days.astype("datetime64[Y]") + 1).astype("datetime64[D]") - 1
+    elif freq != Freq.D:
+        logger.warning(f'error: {dts.iloc[-1]} - {freq}')
+    return days.astype("datetime64[ns]")
+
+
+def __resample_agg(df: pd.DataFrame):
+    """按 freq_edt 分段聚合，结果与 df.groupby('freq_edt').agg(...) 一致；数据类型不支持时返回 None
+
+    freq_edt 升序时直接按相邻相同的值分段，否则先稳定排序；浮点数求和使用 pandas 分组求和，
+    以保证与 groupby 的补偿求和结果逐位相同。
+    """
+    keys = df['freq_edt'].values
+    n = len(keys)
+    if n == 0 or keys.dtype != "datetime64[ns]" or np.isnat(keys).any():
+        return None
+    for col in ['open', 'close', 'high', 'low', 'vol', 'amount']:
+        if df[col].dtype.kind not in "if":
+            return None
+
+    keys = keys.view(np.int64)
+    order = None if (keys[1:] >= keys[:-1]).all() else np.argsort(keys, kind="stable")
+    if order is not None:
+        keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], n]
+    pos = np.arange(n)
+
+    def _values(col):
+        x = df[col].values
+        return x if order is None else x[order]
+
+    def _first_last(col, last=False):
+        # 与 groupby 的 first / last 一致，跳过缺失值，整段缺失时为缺失值
+        x = _values(col)
+        na = pd.isna(x)
+        if not na.any():
+            return x[ends - 1] if last else x[starts]
+        if last:
+            idx = np.maximum.reduceat(np.where(na, -1, pos), starts)
+            miss = idx < starts
+        else:
+            idx = np.minimum.reduceat(np.where(na, n, pos), starts)
+            miss = idx >= ends
+        res = x[np.where(miss, 0, idx)]
+        if miss.any():
+            res = res.astype(object) if res.dtype.kind not in "fO" else res.copy()
+            res[miss] = np.nan if res.dtype.kind == "f" else None
+        return res
+
+    def _sum(col):
+        x = _values(col)
+        if x.dtype.kind == "i":
+            return np.add.reduceat(x, starts)
+        return pd.Series(x).groupby(np.repeat(np.arange(len(starts)), ends - starts)).sum().values
+
+    high, low = _values('high'), _values('low')
+    data = {
+        'symbol': _first_last('symbol'),
+        'dt': keys[starts].view("datetime64[ns]"),
+        'open': _first_last('open'),
+        'close': _first_last('close', last=True),
+        'high': (np.fmax if high.dtype.kind == "f" else np.maximum).reduceat(high, starts),
+        'low': (np.fmin if low.dtype.kind == "f" else np.minimum).reduceat(low, starts),
+        'vol': _sum('vol'),
+        'amount': _sum('amount'),
+    }
+    return pd.DataFrame(data)
+
+
 def resample_bars(df: pd.DataFrame, target_freq: Union[Freq, AnyStr], raw_bars=True, **kwargs):
     """将给定的K线数据重新采样为目标周期的K线数据
 
@@ -212,24 +343,26 @@ def resample_bars(df: pd.DataFrame, target_freq: Union[Freq, AnyStr], raw_bars=T
 
     base_freq = kwargs.get('base_freq', None)
     if target_freq.value.endswith("分钟"):
-        uni_times = sorted(df['dt'].tail(2000).apply(lambda x: x.strftime("%H:%M")).unique().tolist())
+        uni_times = sorted(pd.to_datetime(df['dt'].tail(2000)).dt.strftime("%H:%M").unique().tolist())
         _, market = check_freq_and_market(uni_times, freq=base_freq)
     else:
         market = "默认"
 
-    df['freq_edt'] = df['dt'].apply(lambda x: freq_end_time(x, target_freq, market))
-    dfk1 = df.groupby('freq_edt').agg(
-        {'symbol': 'first', 'dt': 'last', 'open': 'first', 'close': 'last', 'high': 'max',
-         'low': 'min', 'vol': 'sum', 'amount': 'sum', 'freq_edt': 'last'})
-    dfk1.reset_index(drop=True, inplace=True)
-    dfk1['dt'] = dfk1['freq_edt']
-    dfk1 = dfk1[['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount']]
+    df['freq_edt'] = __freq_end_time_array(df['dt'], target_freq, market)
+    dfk1 = __resample_agg(df)
+    if dfk1 is None:
+        dfk1 = df.groupby('freq_edt').agg(
+            {'symbol': 'first', 'dt': 'last', 'open': 'first', 'close': 'last', 'high': 'max',
+             'low': 'min', 'vol': 'sum', 'amount': 'sum', 'freq_edt': 'last'})
+        dfk1.reset_index(drop=True, inplace=True)
+        dfk1['dt'] = dfk1['freq_edt']
+        dfk1 = dfk1[['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount']]
 
     if raw_bars:
-        _bars = []
-        for i, row in enumerate(dfk1.to_dict("records"), 1):
-            row.update({'id': i, 'freq': target_freq})
-            _bars.append(RawBar(**row))
+        cols = [dfk1[x].tolist() for x in ['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount']]
+        _bars = [RawBar(symbol=symbol, id=i, dt=dt, freq=target_freq, open=open_, close=close, high=high,
+                        low=low, vol=vol, amount=amount)
+                 for i, (symbol, dt, open_, close, high, low, vol, amount) in enumerate(zip(*cols), 1)]
 
         if kwargs.get('drop_unfinished', True):
             # 清除最后一根未完成的K线
@@ -240,6 +373,29 @@ def resample_bars(df: pd.DataFrame, target_freq: Union[Freq, AnyStr], raw_bars=T
         return dfk1
 
 
+_deque_getitem = deque.__getitem__     # 跳过 BarDeque.__getitem__ 的切片判断，用于逐笔更新中读取最后一根K线
+
+
+class BarDeque(deque):
+    """BarGenerator 中保存K线序列的双端队列，超过 maxlen 时自动移除最早的K线；支持切片读取，返回列表"""
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            n = len(self)
+            start, stop, step = i.indices(n)
+            if step != 1:
+                return list(self)[i]
+            if stop <= start:
+                return []
+            # 只遍历需要的K线，靠近尾部的切片（如 bars[-100:]）从右侧开始遍历
+            if start >= n - stop:
+                res = list(islice(reversed(self), n - stop, n - start))
+                res.reverse()
+                return res
+            return list(islice(self, start, stop))
+        return super().__getitem__(i)
+
+
 class BarGenerator:
 
     version = 'V231008'
@@ -251,10 +407,12 @@ class BarGenerator:
         self.base_freq = base_freq
         self.max_count = max_count
         self.freqs = freqs
-        self.bars = {v: [] for v in self.freqs}
-        self.bars.update({base_freq: []})
+        self.bars = {v: BarDeque(maxlen=max_count) for v in self.freqs}
+        self.bars.update({base_freq: BarDeque(maxlen=max_count)})
         self.freq_map = {f.value: f for _, f in Freq.__members__.items()}
         self.__validate_freqs()
+        self.__edt_memo = {}
+        self.__tick_bar = None          # update_tick 合成中的基础周期K线，完成前不写入 self.bars
 
     def __validate_freqs(self):
         from czsc.utils import sorted_freqs
@@ -282,47 +440,100 @@ class BarGenerator:
         """
         assert freq in self.bars.keys()
         assert not self.bars[freq], f"self.bars['{freq}'] 不为空，不允许执行初始化"
-        self.bars[freq] = bars
+        self.bars[freq] = BarDeque(bars, maxlen=self.max_count)
         self.symbol = bars[-1].symbol
 
     def __repr__(self):
         return f"<BarGenerator for {self.symbol} @ {self.end_dt}>"
 
+    def __setstate__(self, state):
+        # 兼容旧版本序列化的对象：K线序列保存为列表，没有结束时间缓存
+        self.__dict__.update(state)
+        self.bars = {k: v if isinstance(v, BarDeque) else BarDeque(v, maxlen=self.max_count) for k, v in self.bars.items()}
+        self.__dict__.setdefault("_BarGenerator__edt_memo", {})
+        self.__dict__.pop("_BarGenerator__tick_pending", None)
+        self.__dict__.setdefault("_BarGenerator__tick_bar", None)
+
+    def __freq_end_time(self, dt: datetime, freq: Freq) -> datetime:
+        """与 freq_end_time(dt, freq, self.market) 的结果一致
+
+        分钟周期使用预先计算的当日分钟数 -> 结束时间查找表，日线及以上周期只依赖日期；
+        与上一次计算的日期和结束时间相同时，直接复用上一次的结果，不再创建新的时间对象。
+        """
+        memo = self.__edt_memo.get(freq)
+        if memo is None:
+            table = _edt_minutes(f"{freq.value}_{self.market}").tolist() if freq.value.endswith("分钟") else None
+            memo = self.__edt_memo[freq] = [table, freq == Freq.F1, None, None, None]
+
+        # 秒或微秒不为 0 时归入下一分钟；跨天和带纳秒的时间很少出现，直接调用 freq_end_time
+        minute = dt.hour * 60 + dt.minute + (1 if dt.second or dt.microsecond else 0)
+        if minute == 1440 or getattr(dt, "nanosecond", 0):
+            return freq_end_time(dt, freq, self.market)
+
+        table, is_f1, day, edt_key, edt = memo
+        d = dt.date()
+        if table is None:
+            if d != day:
+                memo[2], memo[4] = d, freq_end_date(d, freq)
+            return memo[4]
+
+        m = table[minute]
+        if m < 0:
+            return freq_end_time(dt, freq, self.market)
+
+        # 结束时间为 00:00 的非零点K线属于下一天，用 m + 1440 区分
+        key = m + 1440 if m == 0 and minute != 0 and not is_f1 else m
+        if d != day or key != edt_key:
+            edt = dt.replace(hour=m // 60, minute=m % 60, second=0, microsecond=0)
+            if key >= 1440:
+                edt += timedelta(days=1)
+            memo[2], memo[3], memo[4] = d, key, edt
+        return edt
+
     def _update_freq(self, bar: RawBar, freq: Freq) -> None:
         """更新指定周期K线
 
         函数计算逻辑：
 
         1. 计算目标频率的结束时间`freq_edt`。
-        2. 检查`self.bars`中是否已经有目标频率的K线。如果没有，创建一个新的`RawBar`对象，并将其添加到`self.bars`中，然后返回。
-        3. 如果已经有目标频率的K线，获取最后一根K线`last`。
-        4. 检查`freq_edt`是否不等于最后一根K线的日期时间。如果不等于，创建一个新的`RawBar`对象，并将其添加到`self.bars`中。
-        5. 如果`freq_edt`等于最后一根K线的日期时间，创建一个新的`RawBar`对象，其开盘价为最后一根K线的开盘价，
-            收盘价为当前K线的收盘价，最高价为最后一根K线和当前K线的最高价中的最大值，最低价为最后一根K线和当前K线的最低价中的最小值，
-            成交量和成交金额为最后一根K线和当前K线的成交量和成交金额的和。然后用这个新的`RawBar`对象替换`self.bars`中的最后一根K线。
+        2. 如果目标频率没有K线，或者`freq_edt`不等于最后一根K线的日期时间，创建一个新的`RawBar`对象，并将其添加到`self.bars`中。
+        3. 如果`freq_edt`等于最后一根K线的日期时间，原地更新最后一根K线：收盘价为当前K线的收盘价，最高价、最低价取两者的最大值、最小值，
+            成交量和成交金额累加；同时清空它的 cache，与替换为一根新K线的效果相同。
+
+        注意：最后一根K线是原地更新的，需要保存某个时刻的K线快照时，请复制一份，如 RawBar(**bar.__dict__)。
 
         :param bar: 基础周期已完成K线
         :param freq: 目标周期
         """
-        freq_edt = freq_end_time(bar.dt, freq, self.market)
+        self.__merge(freq, self.bars[freq.value], bar.symbol, bar.dt, bar.open, bar.close,
+                     bar.high, bar.low, bar.vol, bar.amount)
 
-        if not self.bars[freq.value]:
-            bar_ = RawBar(symbol=bar.symbol, freq=freq, dt=freq_edt, id=0, open=bar.open,
-                          close=bar.close, high=bar.high, low=bar.low, vol=bar.vol, amount=bar.amount)
-            self.bars[freq.value].append(bar_)
+    def __merge(self, freq: Freq, bars: BarDeque, symbol, dt, open_, close, high, low, vol, amount) -> None:
+        """把一段行情合并到指定周期的K线序列 bars 中，_update_freq 与 update 共用"""
+        freq_edt = self.__freq_end_time(dt, freq)
+
+        if not bars:
+            bars.append(RawBar(symbol=symbol, freq=freq, dt=freq_edt, id=0, open=open_,
+                               close=close, high=high, low=low, vol=vol, amount=amount))
             return
 
-        last: RawBar = self.bars[freq.value][-1]
-        if freq_edt != self.bars[freq.value][-1].dt:
-            bar_ = RawBar(symbol=bar.symbol, freq=freq, dt=freq_edt, id=last.id + 1, open=bar.open,
-                          close=bar.close, high=bar.high, low=bar.low, vol=bar.vol, amount=bar.amount)
-            self.bars[freq.value].append(bar_)
+        last: RawBar = _deque_getitem(bars, -1)
+        if freq_edt != last.dt:
+            bars.append(RawBar(symbol=symbol, freq=freq, dt=freq_edt, id=last.id + 1, open=open_,
+                               close=close, high=high, low=low, vol=vol, amount=amount))
+            return
 
-        else:
-            bar_ = RawBar(symbol=bar.symbol, freq=freq, dt=freq_edt, id=last.id,
-                          open=last.open, close=bar.close, high=max(last.high, bar.high),
-                          low=min(last.low, bar.low), vol=last.vol + bar.vol, amount=last.amount + bar.amount)
-            self.bars[freq.value][-1] = bar_
+        last.symbol = symbol
+        last.freq = freq
+        last.dt = freq_edt
+        last.close = close
+        if high > last.high:
+            last.high = high
+        if low < last.low:
+            last.low = low
+        last.vol = last.vol + vol
+        last.amount = last.amount + amount
+        last._cache = None
 
     def update(self, bar: RawBar) -> None:
         """更新各周期K线
@@ -334,7 +545,7 @@ class BarGenerator:
         3. 接下来，它检查是否已经有一个与`bar`日期时间相同的K线存在于`self.bars[base_freq]`中。
             如果存在，它会记录一个警告并返回，不进行任何更新。
         4. 如果不存在重复的K线，它会遍历`self.bars`的所有键（即所有的频率），并对每个频率调用`self._update_freq`方法来更新该频率的K线。
-        5. 最后，它会限制在内存中的K线数量，确保每个频率的K线数量不超过`self.max_count`。
+        5. 每个频率的K线保存在 maxlen 为`self.max_count`的 BarDeque 中，超出数量时自动移除最早的K线。
 
         :param bar: 必须是已经结束的Bar
         :return: None
@@ -349,10 +560,74 @@ class BarGenerator:
             logger.warning(f"BarGenerator.update: 输入重复K线，基准周期为{base_freq}; \n\n输入K线为{bar};\n\n 上一根K线为{self.bars[base_freq][-1]}")
             return
 
-        for freq in self.bars.keys():
-            self._update_freq(bar, self.freq_map[freq])
+        freq_map = self.freq_map
+        symbol, dt, open_, close, high, low, vol, amount = \
+            bar.symbol, bar.dt, bar.open, bar.close, bar.high, bar.low, bar.vol, bar.amount
+        for freq, bars in self.bars.items():
+            self.__merge(freq_map[freq], bars, symbol, dt, open_, close, high, low, vol, amount)
+
+    @property
+    def tick_bar(self) -> Optional[RawBar]:
+        """update_tick 合成中、尚未完成的基础周期K线，没有时为 None"""
+        return self.__tick_bar
+
+    def update_tick(self, tick, on_bar: Optional[Callable[[RawBar], None]] = None) -> Optional[RawBar]:
+        """输入逐笔行情，合成基础周期K线；基础周期K线完成时，使用 update 更新各周期K线
+
+        函数计算逻辑：
 
-        # 限制存在内存中的K限制数量
-        for f, b in self.bars.items():
-            if len(b) > self.max_count:
-                self.bars[f] = b[-self.max_count:]
+        1. 按 tick.dt 计算基础周期K线的结束时间，规则与 freq_end_time 相同，带秒数的时间归入下一分钟；
+        2. 同一根基础周期K线内的行情，只合并到单独的合成中K线 self.tick_bar 上，不修改 self.bars 中的任何K线，
+            因此 CZSC 等对象持有的K线不会在它们更新之前被改动；
+        3. 行情进入新的基础周期K线时，上一根基础周期K线完成，调用 update 更新各周期K线，结果与逐根 update 已完成K线一致，
+            然后调用 on_bar(bar)，再用这笔行情开始新的合成中K线；
+        4. 早于当前基础周期K线的行情，以及已经完成的基础周期K线内的行情，直接忽略。
+
+        注意：update_tick 与 update 不要混用；最后一根基础周期K线在下一笔行情到来（或调用 flush_tick）时才完成。
+
+        :param tick: 逐笔行情，如 czsc.objects.Tick，需要有 symbol, dt, price 属性；vol, amount 是这笔行情的成交增量，可以没有
+        :param on_bar: 基础周期K线完成时的回调函数，输入完成的基础周期K线，如 CzscTrader.on_bar
+        :return: 这笔行情完成的基础周期K线，没有时返回 None
+        """
+        base_bars = self.bars[self.base_freq]
+        edt = self.__freq_end_time(tick.dt, self.freq_map[self.base_freq])
+        bar = self.__tick_bar
+        last_dt = bar.dt if bar is not None else (base_bars[-1].dt if base_bars else None)
+        if last_dt is not None and (edt < last_dt or (edt == last_dt and bar is None)):
+            logger.debug(f"BarGenerator.update_tick: 忽略过期行情 {tick}，最后一根K线时间为 {last_dt}")
+            return None
+
+        price = tick.price
+        vol = getattr(tick, "vol", 0) or 0
+        amount = getattr(tick, "amount", 0) or 0
+        if bar is not None and edt == bar.dt:
+            bar.close = price
+            if price > bar.high:
+                bar.high = price
+            if price < bar.low:
+                bar.low = price
+            bar.vol = bar.vol + vol
+            bar.amount = bar.amount + amount
+            return None
+
+        finished = self.flush_tick(on_bar)
+        bar_id = base_bars[-1].id + 1 if base_bars else 0
+        self.__tick_bar = RawBar(symbol=tick.symbol, id=bar_id, dt=edt, freq=self.freq_map[self.base_freq],
+                                 open=price, close=price, high=price, low=price, vol=vol, amount=amount)
+        return finished
+
+    def flush_tick(self, on_bar: Optional[Callable[[RawBar], None]] = None) -> Optional[RawBar]:
+        """结束 update_tick 合成中的基础周期K线，如收盘后不再有新的行情时调用
+
+        :param on_bar: 基础周期K线完成时的回调函数
+        :return: 完成的基础周期K线，没有合成中的K线时返回 None
+        """
+        if self.__tick_bar is None:
+            return None
+
+        self.update(self.__tick_bar)
+        self.__tick_bar = None
+        bar = self.bars[self.base_freq][-1]
+        if on_bar is not None:
+            on_bar(bar)
+        return bar
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 列式存储的原始K线序列，信号函数可以直接按列读取 NumPy 数组
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Union
+from czsc.objects import RawBar, Freq
+from czsc.utils.ind_store import IndicatorCache
+
+
+class RawBarView:
+    """BarStore 中单根K线的轻量视图
+
+    视图本身只保存 BarStore 引用和行号，所有字段都从列数组中实时读取；
+    除 cache 外的字段都是只读的，cache 的修改会写回 BarStore。
+
+    视图与 RawBar 拥有相同的字段和属性，dataclasses.fields / asdict 以及 pd.DataFrame 都可以直接使用。
+    """
+
+    __slots__ = ("_store", "_row")
+    __dataclass_fields__ = RawBar.__dataclass_fields__
+    __repr__ = RawBar.__repr__
+    __eq__ = RawBar.__eq__
+    __hash__ = None
+    upper = RawBar.upper
+    lower = RawBar.lower
+    solid = RawBar.solid
+
+    def __init__(self, store: "BarStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __reduce__(self):
+        return RawBarView, (self._store, self._row)
+
+    def _i(self):
+        i = self._row - self._store._offset
+        if i < 0:
+            raise IndexError(f"第 {self._row} 行K线已从 BarStore 中移除")
+        return i
+
+    @property
+    def symbol(self):
+        return self._store.symbol
+
+    @property
+    def freq(self):
+        return self._store.freq
+
+    @property
+    def id(self):
+        return int(self._store._id[self._i()])
+
+    @property
+    def dt(self):
+        return pd.Timestamp(int(self._store._dt[self._i()]), tz=self._store._tz)
+
+    @property
+    def open(self):
+        return float(self._store._open[self._i()])
+
+    @property
+    def close(self):
+        return float(self._store._close[self._i()])
+
+    @property
+    def high(self):
+        return float(self._store._high[self._i()])
+
+    @property
+    def low(self):
+        return float(self._store._low[self._i()])
+
+    @property
+    def vol(self):
+        return float(self._store._vol[self._i()])
+
+    @property
+    def amount(self):
+        return float(self._store._amount[self._i()])
+
+    @property
+    def cache(self):
+        caches = self._store._caches
+        cache = caches.get(self._row, None)
+        if cache is None:
+            cache = caches[self._row] = {}
+        return cache
+
+    @cache.setter
+    def cache(self, value):
+        old = self._store._caches.get(self._row, None)
+        if isinstance(old, IndicatorCache) and not isinstance(value, IndicatorCache):
+            value = old.rebind(value)
+        self._store._caches[self._row] = value
+
+    @property
+    def __dict__(self):
+        return {
+            "symbol": self.symbol,
+            "id": self.id,
+            "dt": self.dt,
+            "freq": self.freq,
+            "open": self.open,
+            "close": self.close,
+            "high": self.high,
+            "low": self.low,
+            "vol": self.vol,
+            "amount": self.amount,
+            "cache": dict(self.cache) if isinstance(self.cache, IndicatorCache) else self.cache,
+        }
+
+
+class BarStore:
+    """列式存储的原始K线序列
+
+    OHLCV、dt、id 分别保存在连续的 NumPy 数组中，容量不足时按倍数扩展；
+    通过下标访问时返回 RawBarView 视图，使用方式与 List[RawBar] 基本一致。
+    信号函数可以直接读取 close / high 等列的切片，不需要先构造 Python 列表。
+
+    注意：BarStore 只压缩了 bars_raw 自身，CZSC 中的 NewBar / FX / BI 仍然持有 Python 对象，
+    加上 NewBar.elements 引用的视图和预留的数组容量，CZSC 对象整体的内存占用反而会略有增加，
+    不要把它作为降低内存占用的手段，详见 examples/develop/bar_store_memory.py
+    """
+
+    _float_cols = ("open", "close", "high", "low", "vol", "amount")
+    _tz = None  # 写入K线 dt 的时区；dt 列统一保存为 int64 纳秒，有时区时为 UTC 时间
+
+    def __init__(self, symbol: str, freq: Freq, capacity: int = 256):
+        """
+
+        :param symbol: 标的代码
+        :param freq: K线周期
+        :param capacity: 初始容量
+        """
+        self.symbol = symbol
+        self.freq = freq
+        self._min_capacity = capacity
+        self._dt = np.empty(capacity, dtype=np.int64)
+        self._id = np.empty(capacity, dtype=np.int64)
+        for col in self._float_cols:
+            setattr(self, f"_{col}", np.empty(capacity, dtype=np.float64))
+
+        self._caches = {}   # 行号 -> cache 字典，只为实际用到 cache 的K线创建
+        self._offset = 0    # 物理位置 0 对应的行号
+        self._start = 0     # 有效数据的开始位置（物理位置）
+        self._end = 0       # 有效数据的结束位置（物理位置）
+
+    def __repr__(self):
+        return f"<BarStore~{self.symbol}~{self.freq.value}~{len(self)}>"
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __iter__(self):
+        for i in range(self._start + self._offset, self._end + self._offset):
+            yield RawBarView(self, i)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[RawBarView, List[RawBarView]]:
+        n = len(self)
+        if isinstance(item, slice):
+            start = self._start + self._offset
+            return [RawBarView(self, start + i) for i in range(*item.indices(n))]
+
+        if item < 0:
+            item += n
+        if not 0 <= item < n:
+            raise IndexError("BarStore index out of range")
+        return RawBarView(self, self._start + self._offset + item)
+
+    def __setitem__(self, item: int, bar: RawBar):
+        if item not in (-1, len(self) - 1):
+            raise IndexError("BarStore 只支持替换最后一根K线")
+        self._write(self._end - 1, bar)
+
+    @property
+    def capacity(self):
+        return len(self._dt)
+
+    @property
+    def nbytes(self):
+        """列数组占用的字节数"""
+        return sum(getattr(self, f"_{col}").nbytes for col in ("dt", "id") + self._float_cols)
+
+    def _write(self, i: int, bar: RawBar):
+        dt = pd.Timestamp(bar.dt)
+        self._tz = dt.tz
+        self._dt[i] = dt.value
+        self._id[i] = bar.id
+        self._open[i] = bar.open
+        self._close[i] = bar.close
+        self._high[i] = bar.high
+        self._low[i] = bar.low
+        self._vol[i] = bar.vol
+        self._amount[i] = bar.amount
+        cache = getattr(bar, "_cache", None) if isinstance(bar, RawBar) else bar.cache
+        if cache:
+            self._caches[i + self._offset] = cache
+        else:
+            self._caches.pop(i + self._offset, None)
+
+    def _reserve(self):
+        """保证至少还能追加一根K线：回收已移除的空间，并把容量调整为有效K线数量的两倍"""
+        if self._end < self.capacity:
+            return
+
+        n = len(self)
+        capacity = max(2 * n, self._min_capacity)
+        for col in ("dt", "id") + self._float_cols:
+            old = getattr(self, f"_{col}")
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[self._start: self._end]
+            setattr(self, f"_{col}", new)
+        self._offset += self._start
+        self._start, self._end = 0, n
+        for row in [x for x in self._caches if x < self._offset]:
+            self._caches.pop(row)
+
+    def append(self, bar: RawBar):
+        """追加一根K线"""
+        self._reserve()
+        self._write(self._end, bar)
+        self._end += 1
+
+    def drop_before(self, dt) -> int:
+        """移除 dt 之前的K线，返回移除的数量
+
+        与 List[RawBar] 的处理方式一致：如果所有K线都在 dt 之前，不做任何移除
+        """
+        value = pd.Timestamp(dt).value
+        n = int(np.searchsorted(self._dt[self._start: self._end], value, side="left"))
+        if n >= len(self):
+            return 0
+        self._start += n
+        return n
+
+    def _column(self, col: str) -> np.ndarray:
+        return getattr(self, f"_{col}")[self._start: self._end]
+
+    @property
+    def dt(self):
+        """K线时间列，datetime64[ns]；K线带时区时返回对应时区的 DatetimeIndex"""
+        dt = self._column("dt").view("datetime64[ns]")
+        if self._tz is not None:
+            dt = pd.DatetimeIndex(dt).tz_localize("UTC").tz_convert(self._tz)
+        return dt
+
+    @property
+    def id(self) -> np.ndarray:
+        return self._column("id")
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._column("open")
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._column("close")
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._column("high")
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._column("low")
+
+    @property
+    def vol(self) -> np.ndarray:
+        return self._column("vol")
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self._column("amount")
+
+    def to_frame(self) -> pd.DataFrame:
+        """转换为 DataFrame"""
+        df = pd.DataFrame({col: getattr(self, col) for col in ("dt", "id") + self._float_cols})
+        df.insert(0, "symbol", self.symbol)
+        df["freq"] = self.freq
+        return df
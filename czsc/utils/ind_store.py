@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 与 CZSC.bars_raw 按行对齐的技术指标列存储
+
+1. 每个指标（cache_key）保存为一组 NumPy 列，多值指标（如 MACD 的 dif / dea / macd）每个字段一列，
+   不再为每根K线创建嵌套的缓存字典；
+2. 行号是原始K线在 CZSC 中的绝对位置，bars_raw 头部K线被移除后，剩余K线的行号保持不变；
+3. 信号函数通过 CZSC.ind 读取与 bars_raw 对齐的零拷贝切片，如 c.ind("MACD12#26#9", "macd")[-n:]；
+4. IndicatorCache 是 bar.cache 的兼容层，已有信号函数中的 bar.cache[cache_key] 仍然可以读取列存储中的指标值。
+"""
+import numpy as np
+from collections.abc import MutableMapping
+
+
+class IndicatorStore:
+    """技术指标列存储
+
+    列数组的容量不足时按有效行数的两倍重新分配，同时回收已经移除的行；尚未计算的行为 nan。
+    """
+
+    def __init__(self, capacity: int = 256):
+        """
+
+        :param capacity: 初始容量
+        """
+        self._min_capacity = capacity
+        self._capacity = capacity
+        self._offset = 0    # 物理位置 0 对应的行号
+        self._cols = {}     # cache_key -> {字段: 列}，单值指标的字段为 None
+        self._ends = {}     # cache_key -> 已计算的行号上界（不含）
+
+    def __repr__(self):
+        return f"<IndicatorStore~{list(self._cols)}>"
+
+    def __len__(self):
+        return len(self._cols)
+
+    def __contains__(self, key):
+        return key in self._cols
+
+    def keys(self):
+        return self._cols.keys()
+
+    def fields(self, key: str) -> list:
+        """指标 key 的字段列表，单值指标返回 [None]"""
+        return list(self._cols[key])
+
+    def end(self, key: str) -> int:
+        """指标 key 已计算的行号上界（不含），没有计算过时返回 0"""
+        return self._ends.get(key, 0)
+
+    def _reserve(self, start: int, end: int):
+        """保证 [start, end) 行都有存储空间；空间不足时回收 start 之前的行，并把容量调整为有效行数的两倍"""
+        if end - self._offset <= self._capacity:
+            return
+
+        n = end - start
+        capacity = max(2 * n, self._min_capacity)
+        lo = start - self._offset
+        for cols in self._cols.values():
+            for name, old in cols.items():
+                new = np.full(capacity, np.nan)
+                keep = old[lo: lo + n]
+                new[:len(keep)] = keep
+                cols[name] = new
+        self._offset, self._capacity = start, capacity
+
+    def write(self, key: str, row: int, values, start: int, end: int):
+        """写入指标 key 从行号 row 开始的值
+
+        :param key: 指标的缓存键，如 MACD12#26#9
+        :param row: 第一个值对应的行号
+        :param values: 单值指标为一维数组；多值指标为 {字段: 一维数组}，各字段长度相同
+        :param start: 当前有效行号的开始位置，即 bars_raw[0] 的行号
+        :param end: 当前有效行号的结束位置（不含）
+        """
+        if not isinstance(values, dict):
+            values = {None: values}
+        self._reserve(start, end)
+
+        cols = self._cols.setdefault(key, {})
+        i = row - self._offset
+        n = 0
+        for name, value in values.items():
+            col = cols.get(name)
+            if col is None:
+                col = cols[name] = np.full(self._capacity, np.nan)
+            value = np.asarray(value, dtype=np.float64)
+            col[i: i + len(value)] = value
+            n = len(value)
+        self._ends[key] = max(self._ends.get(key, 0), row + n)
+
+    def truncate(self, row: int):
+        """行号 row 及之后的指标值全部失效，用于最后一根K线被同一时间的新K线替换的情况"""
+        i = max(row - self._offset, 0)
+        for key, end in self._ends.items():
+            if end > row:
+                for col in self._cols[key].values():
+                    col[i: end - self._offset] = np.nan
+                self._ends[key] = row
+
+    def column(self, key: str, field: str, start: int, end: int) -> np.ndarray:
+        """读取指标 key 的字段 field 在 [start, end) 行的只读视图"""
+        cols = self._cols.get(key)
+        if cols is None:
+            raise KeyError(f"指标 {key} 尚未计算，请先调用对应的 update_*_cache 函数")
+        if field not in cols:
+            raise KeyError(f"指标 {key} 没有字段 {field}，可选字段：{list(cols)}")
+
+        self._reserve(start, end)
+        res = cols[field][start - self._offset: end - self._offset]
+        res.flags.writeable = False
+        return res
+
+    def has(self, key: str, row: int) -> bool:
+        """指标 key 在行号 row 上是否已经计算"""
+        return self._offset <= row < self._ends.get(key, 0)
+
+    def get(self, key: str, row: int):
+        """读取单行的指标值：单值指标返回数值，多值指标返回 {字段: 数值}；该行没有计算过时返回 None"""
+        if not self._offset <= row < self._ends.get(key, 0):
+            return None
+        i = row - self._offset
+        cols = self._cols[key]
+        if None in cols:
+            return cols[None][i]
+        return {name: col[i] for name, col in cols.items()}
+
+
+class IndicatorCache(MutableMapping):
+    """bar.cache 的兼容层
+
+    指标值从 IndicatorStore 中按行读取，其他缓存数据保存在普通字典中；同名的键以列存储中的指标值为准。
+    对列存储中已计算的指标赋值时，新值直接写入列存储；
+    序列化时保存列存储引用、行号和非指标的缓存数据，列存储随 CZSC 一起序列化，反序列化后仍然与列存储关联。
+    """
+
+    __slots__ = ("store", "row", "data")
+
+    def __init__(self, store: IndicatorStore, row: int, data: dict = None):
+        self.store = store
+        self.row = row
+        self.data = data    # 非指标的缓存数据，第一次写入时创建
+
+    def __reduce__(self):
+        store, row = self.store, self.row
+        data = {k: v for k, v in self.data.items() if not store.has(k, row)} if self.data else None
+        return IndicatorCache, (store, row, data or None)
+
+    def __getitem__(self, key):
+        # 与 IndicatorStore.get 的逻辑相同，内联以降低逐K线读取的开销
+        store, row = self.store, self.row
+        if store._offset <= row < store._ends.get(key, 0):
+            i = row - store._offset
+            cols = store._cols[key]
+            if None in cols:
+                return cols[None][i]
+            return {name: col[i] for name, col in cols.items()}
+        if self.data is None:
+            raise KeyError(key)
+        return self.data[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        store, row = self.store, self.row
+        return store._offset <= row < store._ends.get(key, 0) or (self.data is not None and key in self.data)
+
+    def __setitem__(self, key, value):
+        store, row = self.store, self.row
+        if store.has(key, row):
+            # 列存储中的指标以列存储为准，赋值写入对应的行，多值指标需要给出全部字段
+            cols = store._cols[key]
+            if None in cols:
+                values = {None: value}
+            elif isinstance(value, dict) and set(value) == set(cols):
+                values = value
+            else:
+                raise ValueError(f"指标 {key} 的字段为 {list(cols)}，赋值需要是包含全部字段的字典")
+            for name, v in values.items():
+                cols[name][row - store._offset] = v
+            return
+
+        if self.data is None:
+            self.data = {}
+        self.data[key] = value
+
+    def __delitem__(self, key):
+        if self.data is None:
+            raise KeyError(key)
+        del self.data[key]
+
+    def __iter__(self):
+        keys = [key for key in self.store.keys() if self.store.has(key, self.row)]
+        yield from keys
+        if self.data:
+            yield from (key for key in self.data if key not in keys)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def rebind(self, value: dict) -> "IndicatorCache":
+        """整体替换 bar.cache 时保留与列存储的关联，value 中列存储已有的指标以列存储为准"""
+        data = {k: v for k, v in (value or {}).items() if not self.store.has(k, self.row)}
+        return IndicatorCache(self.store, self.row, data)
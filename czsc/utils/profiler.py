@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 信号计算与交易执行热点路径的耗时统计
+
+1. Profiler 按 (kind, name, freq, params) 统计调用次数、累计耗时、最大耗时，以及最近 window 次调用的耗时分位数；
+2. kind 区分统计对象：signal - 信号函数配置，czsc - CZSC.update，position - Position.update；
+3. memory=True 时使用 tracemalloc 统计每次调用的内存净增量和峰值增量，tracemalloc 本身会明显降低运行速度，只建议排查问题时开启；
+4. 统计结果可以导出为 DataFrame，或者 Prometheus 文本格式，方便接入监控系统。
+
+>>> profiler = Profiler()
+>>> dfs = generate_czsc_signals(bars, signals_config, df=True, profiler=profiler)
+>>> print(profiler.to_dataframe().head(20))
+"""
+import tracemalloc
+import numpy as np
+import pandas as pd
+from time import perf_counter
+from collections import deque
+
+
+class Profiler:
+    """热点路径耗时统计，可以在多个 CzscSignals / CzscTrader 对象之间共享"""
+
+    def __init__(self, window: int = 10000, memory: bool = False):
+        """
+
+        :param window: 计算耗时分位数使用的最近调用次数
+        :param memory: 是否统计内存分配，开启后会启动 tracemalloc
+        """
+        self.window = window
+        self.memory = memory
+        self.stats = {}     # (kind, name, freq, params) -> [count, total, max, alloc, peak, deque(耗时)]
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __repr__(self):
+        return f"<Profiler~{len(self.stats)} keys>"
+
+    def start(self):
+        """开始一次调用的统计，返回值传给 stop"""
+        if self.memory:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            return perf_counter(), tracemalloc.get_traced_memory()[0]
+        return perf_counter(), 0
+
+    def stop(self, key: tuple, start: tuple):
+        """结束一次调用的统计
+
+        :param key: (kind, name, freq, params)
+        :param start: start 的返回值
+        """
+        seconds = perf_counter() - start[0]
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = [0, 0.0, 0.0, 0, 0, deque(maxlen=self.window)]
+        st[0] += 1
+        st[1] += seconds
+        if seconds > st[2]:
+            st[2] = seconds
+        st[5].append(seconds)
+
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            st[3] += current - start[1]
+            st[4] = max(st[4], peak - start[1])
+
+    def reset(self):
+        """清空统计结果"""
+        self.stats = {}
+
+    def merge(self, other: "Profiler"):
+        """合并其他 Profiler 的统计结果，如多进程分别统计后汇总"""
+        for key, (count, total, max_, alloc, peak, samples) in other.stats.items():
+            st = self.stats.get(key)
+            if st is None:
+                st = self.stats[key] = [0, 0.0, 0.0, 0, 0, deque(maxlen=self.window)]
+            st[0] += count
+            st[1] += total
+            st[2] = max(st[2], max_)
+            st[3] += alloc
+            st[4] = max(st[4], peak)
+            st[5].extend(samples)
+        return self
+
+    def to_dataframe(self, kind: str = None) -> pd.DataFrame:
+        """导出统计结果
+
+        :param kind: 只导出指定类型的统计结果，如 signal / czsc / position；默认全部导出
+        :return: 按累计耗时降序排列的 DataFrame，耗时单位：total 为秒，其余为毫秒；内存单位为字节
+        """
+        rows = []
+        for (kind_, name, freq, params), (count, total, max_, alloc, peak, samples) in self.stats.items():
+            if kind and kind_ != kind:
+                continue
+            q50, q99 = np.percentile(samples, [50, 99]) if samples else (0.0, 0.0)
+            rows.append({"kind": kind_, "name": name, "freq": freq, "params": params, "count": count,
+                         "total": total, "mean_ms": total / count * 1000 if count else 0.0,
+                         "p50_ms": q50 * 1000, "p99_ms": q99 * 1000, "max_ms": max_ * 1000,
+                         "alloc_bytes": alloc, "peak_bytes": peak})
+
+        columns = ["kind", "name", "freq", "params", "count", "total", "mean_ms", "p50_ms", "p99_ms", "max_ms",
+                   "alloc_bytes", "peak_bytes"]
+        df = pd.DataFrame(rows, columns=columns)
+        df['ratio'] = df['total'] / df['total'].sum() if df['total'].sum() > 0 else 0.0
+        return df.sort_values("total", ascending=False, ignore_index=True)
+
+    def to_prometheus(self, prefix: str = "czsc") -> str:
+        """导出 Prometheus 文本格式的统计结果
+
+        - {prefix}_call_seconds：summary 类型，包含 0.5 / 0.99 分位数，以及 _sum、_count
+        - {prefix}_call_alloc_bytes：gauge 类型，内存净增量累计值，memory=True 时导出
+
+        :param prefix: 指标名前缀
+        :return: 文本
+        """
+        def _labels(key, **extra):
+            kind, name, freq, params = key
+            items = [("kind", kind), ("name", name), ("freq", freq), ("params", params), *extra.items()]
+            text = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                            for k, v in items if v)
+            return "{" + text + "}"
+
+        lines = [f"# HELP {prefix}_call_seconds 热点路径单次调用耗时（秒）", f"# TYPE {prefix}_call_seconds summary"]
+        for key, (count, total, _, _, _, samples) in self.stats.items():
+            q50, q99 = np.percentile(samples, [50, 99]) if samples else (0.0, 0.0)
+            lines.append(f"{prefix}_call_seconds{_labels(key, quantile='0.5')} {q50:.9f}")
+            lines.append(f"{prefix}_call_seconds{_labels(key, quantile='0.99')} {q99:.9f}")
+            lines.append(f"{prefix}_call_seconds_sum{_labels(key)} {total:.9f}")
+            lines.append(f"{prefix}_call_seconds_count{_labels(key)} {count}")
+
+        if self.memory:
+            lines.append(f"# HELP {prefix}_call_alloc_bytes 热点路径调用的内存净增量累计值（字节）")
+            lines.append(f"# TYPE {prefix}_call_alloc_bytes gauge")
+            for key, (_, _, _, alloc, _, _) in self.stats.items():
+                lines.append(f"{prefix}_call_alloc_bytes{_labels(key)} {alloc}")
+        return "\n".join(lines) + "\n"
@@ -15,11 +15,16 @@ from czsc.objects import BI, RawBar, ZS, Signal
 
 def create_single_signal(**kwargs) -> OrderedDict:
     """创建单个信号"""
-    s = OrderedDict()
     k1, k2, k3 = kwargs.get("k1", "任意"), kwargs.get("k2", "任意"), kwargs.get("k3", "任意")
     v1, v2, v3 = kwargs.get("v1", "任意"), kwargs.get("v2", "任意"), kwargs.get("v3", "任意")
-    v = Signal(k1=k1, k2=k2, k3=k3, v1=v1, v2=v2, v3=v3, score=kwargs.get("score", 0))
-    s[v.key] = v.value
+    score = kwargs.get("score", 0)
+    if score > 100 or score < 0:
+        raise ValueError("score 必须在0~100之间")
+
+    # 与 Signal(...).key / Signal(...).value 的结果一致，每根K线调用次数很多，不创建 Signal 对象
+    key = "_".join([k for k in (k1, k2, k3) if k != "任意"]).strip("_")
+    s = OrderedDict()
+    s[key] = f"{v1}_{v2}_{v3}_{score}"
     return s
 
 
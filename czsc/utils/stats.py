@@ -376,25 +376,29 @@ def evaluate_pairs(pairs: pd.DataFrame, trade_dir: str = "多空") -> dict:
         if len(pairs) == 0:
             return p
 
+    # 持仓数量 表示一条记录合并了多少笔相同的开平交易，如 WeightBacktest 的交易对，统计时按数量加权
     pairs = pairs.to_dict(orient="records")
-    p["交易次数"] = len(pairs)
-    p["盈亏平衡点"] = round(cal_break_even_point([x["盈亏比例"] for x in pairs]), 4)
-    p["累计收益"] = round(sum([x["盈亏比例"] for x in pairs]), 2)
+    for x in pairs:
+        x["持仓数量"] = int(x.get("持仓数量", 1))
+
+    p["交易次数"] = sum([x["持仓数量"] for x in pairs])
+    p["盈亏平衡点"] = round(cal_break_even_point([x["盈亏比例"] for x in pairs], [x["持仓数量"] for x in pairs]), 4)
+    p["累计收益"] = round(sum([x["盈亏比例"] * x["持仓数量"] for x in pairs]), 2)
     p["单笔收益"] = round(p["累计收益"] / p["交易次数"], 2)
-    p["持仓天数"] = round(sum([x["持仓天数"] for x in pairs]) / len(pairs), 2)
-    p["持仓K线数"] = round(sum([x["持仓K线数"] for x in pairs]) / len(pairs), 2)
+    p["持仓天数"] = round(sum([x["持仓天数"] * x["持仓数量"] for x in pairs]) / p["交易次数"], 2)
+    p["持仓K线数"] = round(sum([x["持仓K线数"] * x["持仓数量"] for x in pairs]) / p["交易次数"], 2)
 
     win_ = [x for x in pairs if x["盈亏比例"] >= 0]
     if len(win_) > 0:
-        p["盈利次数"] = len(win_)
-        p["累计盈利"] = sum([x["盈亏比例"] for x in win_])
+        p["盈利次数"] = sum([x["持仓数量"] for x in win_])
+        p["累计盈利"] = sum([x["盈亏比例"] * x["持仓数量"] for x in win_])
         p["单笔盈利"] = round(p["累计盈利"] / p["盈利次数"], 4)
         p["交易胜率"] = round(p["盈利次数"] / p["交易次数"], 4)
 
     loss_ = [x for x in pairs if x["盈亏比例"] < 0]
     if len(loss_) > 0:
-        p["亏损次数"] = len(loss_)
-        p["累计亏损"] = sum([x["盈亏比例"] for x in loss_])
+        p["亏损次数"] = sum([x["持仓数量"] for x in loss_])
+        p["累计亏损"] = sum([x["盈亏比例"] * x["持仓数量"] for x in loss_])
         p["单笔亏损"] = round(p["累计亏损"] / p["亏损次数"], 4)
 
         p["累计盈亏比"] = round(p["累计盈利"] / abs(p["累计亏损"]), 4)
@@ -6,6 +6,43 @@ create_dt: 2022/1/24 15:01
 describe: 常用技术分析指标
 """
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _ema_loop(x, res, timeperiod):
+    """EMA 递推，res[0] 为初始值"""
+    for i in range(1, len(x)):
+        res[i] = (2 * x[i] + res[i - 1] * (timeperiod - 1)) / (timeperiod + 1)
+    return res
+
+
+def _kdj_loop(rsv, k, d, n):
+    """KDJ 的 K、D 递推，前 n 个值直接使用 rsv"""
+    for i in range(len(rsv)):
+        if i < n:
+            k[i] = rsv[i]
+            d[i] = k[i]
+        else:
+            k[i] = (2 / 3) * k[i - 1] + (1 / 3) * rsv[i]
+            d[i] = (2 / 3) * d[i - 1] + (1 / 3) * k[i]
+    return k, d
+
+
+def _run_loop(loop, *args):
+    """执行递推：安装了 numba 时编译执行，否则转换为 Python float 列表执行，两种方式的计算结果逐位相同"""
+    if njit is not None:
+        return loop(*[np.array(x, dtype=np.double) if isinstance(x, (list, np.ndarray)) else x for x in args])
+    return loop(*[np.asarray(x, dtype=np.double).tolist() if isinstance(x, (list, np.ndarray)) else x for x in args])
+
+
+if njit is not None:
+    _ema_loop = njit(cache=True)(_ema_loop)
+    _kdj_loop = njit(cache=True)(_kdj_loop)
 
 
 def SMA(close: np.array, timeperiod=5):
@@ -16,17 +53,17 @@ def SMA(close: np.array, timeperiod=5):
     :param close: np.array
         收盘价序列
     :param timeperiod: int
-        均线参数
+        均线参数，前 timeperiod - 1 个值使用全部已有数据的均值
     :return: np.array
     """
-    res = []
-    for i in range(len(close)):
-        if i < timeperiod:
-            seq = close[0: i + 1]
-        else:
-            seq = close[i - timeperiod + 1: i + 1]
-        res.append(seq.mean())
-    return np.array(res, dtype=np.double).round(4)
+    close = np.asarray(close, dtype=np.double)
+    res = np.empty(len(close), dtype=np.double)
+    for i in range(min(timeperiod - 1, len(close))):
+        res[i] = close[: i + 1].mean()
+    if len(close) >= timeperiod:
+        # 逐窗口求均值，与 close[i - timeperiod + 1: i + 1].mean() 的累加顺序相同
+        res[timeperiod - 1:] = sliding_window_view(close, timeperiod).mean(axis=1)
+    return res.round(4)
 
 
 def EMA(close: np.array, timeperiod=5):
@@ -39,13 +76,9 @@ def EMA(close: np.array, timeperiod=5):
         均线参数
     :return: np.array
     """
-    res = []
-    for i in range(len(close)):
-        if i < 1:
-            res.append(close[i])
-        else:
-            ema = (2 * close[i] + res[i - 1] * (timeperiod - 1)) / (timeperiod + 1)
-            res.append(ema)
+    if len(close) == 0:
+        return np.array([], dtype=np.double)
+    res = _run_loop(_ema_loop, close, close, timeperiod)
     return np.array(res, dtype=np.double).round(4)
 
 
@@ -81,40 +114,26 @@ def KDJ(close: np.array, high: np.array, low: np.array):
     :return:
     """
     n = 9
-    hv = []
-    lv = []
-    for i in range(len(close)):
-        if i < n:
-            h_ = high[0: i + 1]
-            l_ = low[0: i + 1]
-        else:
-            h_ = high[i - n + 1: i + 1]
-            l_ = low[i - n + 1: i + 1]
-        hv.append(max(h_))
-        lv.append(min(l_))
+    close = np.asarray(close, dtype=np.double)
+    high = np.asarray(high, dtype=np.double)
+    low = np.asarray(low, dtype=np.double)
+
+    # 前 n 根K线使用全部已有数据，之后使用最近 n 根K线的最高价、最低价
+    hv = np.maximum.accumulate(high[:n])
+    lv = np.minimum.accumulate(low[:n])
+    if len(close) > n:
+        hv = np.concatenate([hv, sliding_window_view(high, n)[1:].max(axis=1)])
+        lv = np.concatenate([lv, sliding_window_view(low, n)[1:].min(axis=1)])
 
     hv = np.around(hv, decimals=2)
     lv = np.around(lv, decimals=2)
-    rsv = np.where(hv == lv, 0, (close - lv) / (hv - lv) * 100)
-
-    k = []
-    d = []
-    j = []
-    for i in range(len(rsv)):
-        if i < n:
-            k_ = rsv[i]
-            d_ = k_
-        else:
-            k_ = (2 / 3) * k[i - 1] + (1 / 3) * rsv[i]
-            d_ = (2 / 3) * d[i - 1] + (1 / 3) * k_
-
-        k.append(k_)
-        d.append(d_)
-        j.append(3 * k_ - 2 * d_)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(hv == lv, 0, (close - lv) / (hv - lv) * 100)
 
+    k, d = _run_loop(_kdj_loop, rsv, rsv, rsv, n)
     k = np.array(k, dtype=np.double)
     d = np.array(d, dtype=np.double)
-    j = np.array(j, dtype=np.double)
+    j = 3 * k - 2 * d
     return k.round(4), d.round(4), j.round(4)
 
 
@@ -124,22 +143,23 @@ def RSQ(close: [np.array, list]) -> float:
     :param close: 收盘价序列
     :return:
     """
-    x = list(range(len(close)))
-    y = np.array(close)
-    x_squred_sum = sum([x1 * x1 for x1 in x])
-    xy_product_sum = sum([x[i] * y[i] for i in range(len(x))])
-    num = len(x)
-    x_sum = sum(x)
-    y_sum = sum(y)
+    y = np.asarray(close, dtype=np.double)
+    num = len(y)
+    # x = 0, 1, ..., num - 1，x 的求和与平方和直接用公式计算
+    x_sum = num * (num - 1) / 2
+    x_squred_sum = (num - 1) * num * (2 * num - 1) / 6
     delta = float(num * x_squred_sum - x_sum * x_sum)
     if delta == 0:
         return 0
+    x = np.arange(num, dtype=np.double)
+    y_sum = y.sum()
+    xy_product_sum = x.dot(y)
     y_intercept = (1 / delta) * (x_squred_sum * y_sum - x_sum * xy_product_sum)
     slope = (1 / delta) * (num * xy_product_sum - x_sum * y_sum)
 
-    y_mean = np.mean(y)
-    ss_tot = sum([(y1 - y_mean) * (y1 - y_mean) for y1 in y]) + 0.00001
-    ss_err = sum([(y[i] - slope * x[i] - y_intercept) * (y[i] - slope * x[i] - y_intercept) for i in range(len(x))])
+    y_mean = y_sum / num
+    ss_tot = np.square(y - y_mean).sum() + 0.00001
+    ss_err = np.square(y - slope * x - y_intercept).sum()
     rsq = 1 - ss_err / ss_tot
 
-    return round(rsq, 4)
+    return round(float(rsq), 4)
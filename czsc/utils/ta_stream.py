@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 流式技术指标，每根K线的更新成本为 O(1)，计算结果与批量计算一致
+
+1. SMA / EMA / BBANDS / STOCH 按 ta-lib 对应函数的公式和累加顺序计算，与 ta-lib 的差异只在浮点误差范围内
+   （不同版本、不同编译选项的 ta-lib 之间本身就存在末位差异，如是否使用 FMA 指令）；
+2. MACD 与 czsc.utils.ta.MACD 的计算过程（包括每一步的四舍五入）保持一致，结果逐位相同；
+3. 最后一根K线可能被同一时间的新K线替换（如 BarGenerator 合成中的高级别K线），
+   因此最后一根K线只参与计算、不计入状态，等到下一根K线到来时才计入状态。
+
+使用示例：
+
+    sma = StreamSMA(5)
+    for bar in bars:
+        value = sma.update(bar.dt, bar.close)
+"""
+import math
+import numpy as np
+from collections import deque
+
+nan = float("nan")
+
+
+class StreamIndicator:
+    """流式指标基类
+
+    子类实现 _push（把一根K线计入状态）和 _peek（在当前状态上计算一根K线的指标值，不修改状态）。
+    """
+
+    __slots__ = ("dt", "pending")
+
+    def __init__(self):
+        self.dt = None          # 最后一根K线的时间
+        self.pending = None     # 最后一根K线的输入，尚未计入状态
+
+    def update(self, dt, *values):
+        """输入一根K线，返回这根K线的指标值
+
+        :param dt: K线时间，与上一根K线时间相同时，视为对上一根K线的替换
+        :param values: 指标计算需要的K线数据，如 close 或 high, low, close
+        :return: 指标值
+        """
+        if self.dt is not None:
+            if dt < self.dt:
+                raise ValueError(f"{type(self).__name__} 输入的K线时间 {dt} 早于上一根K线时间 {self.dt}")
+            if dt > self.dt:
+                self._push(*self.pending)
+        self.dt, self.pending = dt, values
+        return self._peek(*values)
+
+    def _push(self, *values):
+        raise NotImplementedError
+
+    def _peek(self, *values):
+        raise NotImplementedError
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for cls in type(self).__mro__ for name in getattr(cls, "__slots__", ())}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class StreamSMA(StreamIndicator):
+    """简单移动平均，与 ta.SMA / ta.MA(matype=SMA) 一致，前 period - 1 根K线为 nan"""
+
+    __slots__ = ("period", "total", "window")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.total = 0.0
+        self.window = deque()     # 计入 total 的最近 period - 1 个值
+
+    def _push(self, value):
+        # ta-lib：先加入最新值得到当期合计，再减去窗口最早的值
+        self.total += value
+        self.window.append(value)
+        if len(self.window) == self.period:
+            self.total -= self.window.popleft()
+
+    def _peek(self, value):
+        if len(self.window) < self.period - 1:
+            return nan
+        return (self.total + value) / self.period
+
+
+class StreamEMA(StreamIndicator):
+    """指数移动平均，与 ta.EMA / ta.MA(matype=EMA) 一致：以前 period 个值的简单平均作为初始值，前 period - 1 根K线为 nan"""
+
+    __slots__ = ("period", "k", "n", "seed", "prev")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.n = 0
+        self.seed = 0.0
+        self.prev = nan
+
+    def _push(self, value):
+        self.prev = self._peek(value)
+        if self.n < self.period:
+            self.seed += value
+        self.n += 1
+
+    def _peek(self, value):
+        if self.n < self.period - 1:
+            return nan
+        if self.n == self.period - 1:
+            return (self.seed + value) / self.period
+        return ((value - self.prev) * self.k) + self.prev
+
+
+class StreamBBANDS(StreamIndicator):
+    """布林线，与 ta.BBANDS(matype=0) 一致，返回 (上轨, 中线, 下轨)；nbdev 可以是一个数或多个数组成的元组
+
+    nbdev 为元组时，返回 (上轨列表, 中线, 下轨列表)，用于一次计算多组标准差倍数的布林线
+    """
+
+    __slots__ = ("period", "nbdev", "sma", "total2", "window2")
+
+    def __init__(self, period: int = 20, nbdev=2.0):
+        super().__init__()
+        self.period = period
+        self.nbdev = nbdev
+        self.sma = StreamSMA(period)
+        self.total2 = 0.0
+        self.window2 = deque()
+
+    def _push(self, value):
+        self.sma._push(value)
+        value2 = value * value
+        self.total2 += value2
+        self.window2.append(value2)
+        if len(self.window2) == self.period:
+            self.total2 -= self.window2.popleft()
+
+    def _peek(self, value):
+        middle = self.sma._peek(value)
+        if middle != middle:
+            std = nan
+        else:
+            variance = (self.total2 + value * value) / self.period - middle * middle
+            std = math.sqrt(variance) if not variance < 0.00000001 else 0.0
+
+        if isinstance(self.nbdev, (tuple, list)):
+            return [middle + std * x for x in self.nbdev], middle, [middle - std * x for x in self.nbdev]
+        return middle + std * self.nbdev, middle, middle - std * self.nbdev
+
+
+class StreamSTOCH(StreamIndicator):
+    """KD 指标，与 ta.STOCH(slowk_matype=0, slowd_matype=0) 一致，输入 high, low, close，返回 (k, d)"""
+
+    __slots__ = ("fastk_period", "n", "highs", "lows", "slowk", "slowd")
+
+    def __init__(self, fastk_period: int = 9, slowk_period: int = 3, slowd_period: int = 3):
+        super().__init__()
+        self.fastk_period = fastk_period
+        self.n = 0                  # 已计入状态的K线数量
+        self.highs = deque()        # 单调递减的 (位置, high)，队首为窗口最高价
+        self.lows = deque()         # 单调递增的 (位置, low)，队首为窗口最低价
+        self.slowk = StreamSMA(slowk_period)
+        self.slowd = StreamSMA(slowd_period)
+
+    def __extreme(self, q, value, is_high):
+        """当前窗口（包含输入值）的最高价或最低价，不修改状态"""
+        start = self.n - self.fastk_period + 1
+        for i, x in q:
+            if i >= start:
+                return max(x, value) if is_high else min(x, value)
+        return value
+
+    def __fastk(self, high, low, close):
+        if self.n < self.fastk_period - 1:
+            return nan
+        highest = self.__extreme(self.highs, high, True)
+        lowest = self.__extreme(self.lows, low, False)
+        diff = highest - lowest
+        return (close - lowest) / diff * 100.0 if diff != 0.0 else 0.0
+
+    def _push(self, high, low, close):
+        fastk = self.__fastk(high, low, close)
+        if fastk == fastk:
+            k = self.slowk._peek(fastk)
+            self.slowk._push(fastk)
+            if k == k:
+                self.slowd._push(k)
+
+        n = self.n
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((n, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((n, low))
+        start = n - self.fastk_period + 2
+        while self.highs[0][0] < start:
+            self.highs.popleft()
+        while self.lows[0][0] < start:
+            self.lows.popleft()
+        self.n += 1
+
+    def _peek(self, high, low, close):
+        fastk = self.__fastk(high, low, close)
+        if fastk != fastk:
+            return nan, nan
+        k = self.slowk._peek(fastk)
+        d = self.slowd._peek(k) if k == k else nan
+        # 与 ta-lib 一致，k 和 d 从同一根K线开始输出
+        return (k, d) if d == d else (nan, nan)
+
+
+def _round4(x):
+    """与 np.round(x, 4) 逐位相同（先乘 10000 再按银行家舍入取整），避免 numpy 标量运算的开销"""
+    return round(x * 10000.0) / 10000.0 if x == x else x
+
+
+class StreamMACD(StreamIndicator):
+    """MACD，与 czsc.utils.ta.MACD 一致，返回 (diff, dea, macd)"""
+
+    __slots__ = ("fastperiod", "slowperiod", "signalperiod", "ema_fast", "ema_slow", "ema_dea", "peeked")
+
+    def __init__(self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+        super().__init__()
+        self.fastperiod = fastperiod
+        self.slowperiod = slowperiod
+        self.signalperiod = signalperiod
+        self.ema_fast = self.ema_slow = self.ema_dea = None
+        self.peeked = None      # 最近一次 _peek 的输入和计算得到的状态，_push 时直接复用
+
+    @staticmethod
+    def __ema(value, prev, timeperiod):
+        # 与 czsc.utils.ta.EMA 的递推公式保持一致
+        return value if prev is None else (2 * value + prev * (timeperiod - 1)) / (timeperiod + 1)
+
+    def __calc(self, close):
+        ema_fast = self.__ema(close, self.ema_fast, self.fastperiod)
+        ema_slow = self.__ema(close, self.ema_slow, self.slowperiod)
+        diff = _round4(ema_fast) - _round4(ema_slow)
+        ema_dea = self.__ema(diff, self.ema_dea, self.signalperiod)
+        dea = _round4(ema_dea)
+        macd = (diff - dea) * 2
+        self.peeked = (close, (ema_fast, ema_slow, ema_dea))
+        return _round4(diff), _round4(dea), _round4(macd)
+
+    def _push(self, close):
+        if self.peeked is None or self.peeked[0] != close:
+            self.__calc(close)
+        self.ema_fast, self.ema_slow, self.ema_dea = self.peeked[1]
+        self.peeked = None
+
+    def _peek(self, close):
+        return self.__calc(close)
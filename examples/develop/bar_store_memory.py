@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 对比 CZSC 使用 List[RawBar] 与 BarStore 列式存储时的内存占用
+
+使用方法：在项目根目录下执行 python examples/develop/bar_store_memory.py
+
+参考结果（20 万根 1 分钟K线）：BarStore 使 bars_raw 自身的占用降低约 3 倍，
+但 CZSC 对象整体的占用从 360 KB 增加到 446 KB（max_bi_num=50）、从 4154 KB 增加到 4656 KB（max_bi_num=500）。
+原因是 NewBar / FX / BI 仍然持有 Python 对象，NewBar.elements 引用的 RawBarView 视图和预留的数组容量也需要额外的内存，
+所以 columnar=True 只适合需要按列读取K线的场景，不能用来降低内存占用。
+"""
+import sys
+import gc
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, ".")
+from czsc.analyze import CZSC
+from czsc.objects import RawBar
+from test.test_analyze import read_1min
+
+
+def rows_to_bars(rows):
+    """逐根生成 RawBar，保证 CZSC 之外不持有任何 K 线对象"""
+    for row in rows:
+        yield RawBar(**row)
+
+
+def bars_raw_bytes(c: CZSC):
+    """估算 bars_raw 自身占用的字节数"""
+    if c.columnar:
+        return c.bars_raw.nbytes + sys.getsizeof(c.bars_raw._caches)
+
+    res = sys.getsizeof(c.bars_raw)
+    for bar in c.bars_raw:
+        res += sys.getsizeof(bar) + (sys.getsizeof(bar._cache) if bar._cache is not None else 0)
+        res += sum(sys.getsizeof(getattr(bar, x)) for x in ["dt", "open", "close", "high", "low", "vol", "amount"])
+    return res
+
+
+def czsc_memory(rows, max_bi_num, columnar):
+    gc.collect()
+    tracemalloc.start()
+    bars = rows_to_bars(rows)
+    c = CZSC([next(bars)], max_bi_num=max_bi_num, columnar=columnar)
+    for bar in bars:
+        c.update(bar)
+    gc.collect()
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "columnar": columnar,
+        "max_bi_num": max_bi_num,
+        "bars_raw数量": len(c.bars_raw),
+        "bars_raw占用(KB)": round(bars_raw_bytes(c) / 1024, 1),
+        "CZSC对象占用(KB)": round(total / 1024, 1),
+    }
+
+
+def main():
+    df = pd.DataFrame([x.__dict__ for x in read_1min()[:200000]])
+    rows = df.drop(columns=["cache"]).to_dict("records")
+
+    res = []
+    for max_bi_num in [50, 500]:
+        for columnar in [False, True]:
+            res.append(czsc_memory(rows, max_bi_num, columnar))
+    dfr = pd.DataFrame(res)
+    print(dfr.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 对比逐K线 update 与 CZSC.from_dataframe 构建 CZSC 对象的耗时
+
+使用方法：在项目根目录下执行 python examples/develop/czsc_batch_benchmark.py --symbols 5000
+
+模拟 symbols 个标的、每个标的 10 年日线，分别使用以下方式构建 CZSC 对象：
+
+1. 逐K线：DataFrame -> List[RawBar] -> CZSC(bars)，即 TsDataCache.pro_bar(raw_bar=True) + CZSC 的常规用法
+2. from_dataframe：CZSC.from_dataframe(df)
+
+两种方式再分别加上 get_signals，对比信号计算只在最后一根K线上执行带来的差异。
+
+from_dataframe 内部就是 CZSC(bars, warmup=True)，不计算信号时的耗时差异只来自按列构造 RawBar（省去 to_dict），
+加上信号后的差异主要来自跳过历史K线上的信号计算。
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from czsc.analyze import CZSC
+from czsc.objects import RawBar
+from czsc.enum import Freq
+from czsc.signals.cxt import cxt_fx_power_V221107, cxt_bi_status_V230101
+from czsc.signals.tas import tas_ma_base_V221101
+
+
+def mock_daily(symbol, seed, sdt="2014-01-01", edt="2024-01-01"):
+    """生成单个标的的模拟日线"""
+    rng = np.random.default_rng(seed)
+    dt = pd.bdate_range(sdt, edt)
+    n = len(dt)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+    vol = rng.integers(10000, 1000000, n).astype(float)
+    return pd.DataFrame({"symbol": symbol, "dt": dt, "freq": Freq.D, "open": open_, "close": close,
+                         "high": high, "low": low, "vol": vol, "amount": vol * close})
+
+
+def get_signals(c: CZSC):
+    s = {}
+    if len(c.bi_list) < 3:
+        return s
+    s.update(cxt_fx_power_V221107(c, di=1))
+    s.update(cxt_bi_status_V230101(c, di=1))
+    s.update(tas_ma_base_V221101(c, di=1, ma_type="SMA", timeperiod=5))
+    return s
+
+
+def per_bar(df, get_signals=None):
+    bars = [RawBar(**row) for row in df.assign(id=range(len(df))).to_dict("records")]
+    return CZSC(bars, get_signals=get_signals)
+
+
+def from_dataframe(df, get_signals=None):
+    return CZSC.from_dataframe(df, get_signals=get_signals)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=5000, help="模拟的标的数量")
+    args = parser.parse_args()
+
+    dfs = [mock_daily(f"{i:06d}.SZ", seed=i) for i in range(args.symbols)]
+    res = []
+    for name, func, signals in [("逐K线", per_bar, None), ("from_dataframe", from_dataframe, None),
+                                ("逐K线+信号", per_bar, get_signals),
+                                ("from_dataframe+信号", from_dataframe, get_signals)]:
+        start = time.perf_counter()
+        bi_num = [len(func(df, signals).bi_list) for df in dfs]
+        seconds = time.perf_counter() - start
+        res.append({"方式": name, "标的数量": len(dfs), "K线数量": sum(len(df) for df in dfs),
+                    "笔数量": sum(bi_num), "总耗时(秒)": round(seconds, 2),
+                    "单标的耗时(毫秒)": round(seconds / len(dfs) * 1000, 2)})
+    print(pd.DataFrame(res).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+describe: czsc.utils.bar_generator.resample_bars 向量化前后的一致性与耗时对比
+
+使用方法：在项目根目录下执行 python examples/develop/resample_bars_benchmark.py --days 250,1000
+
+A股 使用 test/data 中的 1 分钟数据（按 --days 截取交易日），期货、默认 两个市场按交易时间生成模拟的 1 分钟数据；
+一致性要求 RawBar 的所有属性逐位相同，输出表格中的“一致”列为 False 时说明向量化实现存在问题。
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from czsc.objects import Freq, RawBar
+from czsc.utils.bar_generator import resample_bars, freq_end_time, check_freq_and_market, freq_market_times
+
+
+def old_resample_bars(df: pd.DataFrame, target_freq, raw_bars=True, **kwargs):
+    """向量化之前的 resample_bars"""
+    if not isinstance(target_freq, Freq):
+        target_freq = Freq(target_freq)
+
+    base_freq = kwargs.get('base_freq', None)
+    if target_freq.value.endswith("分钟"):
+        uni_times = sorted(df['dt'].tail(2000).apply(lambda x: x.strftime("%H:%M")).unique().tolist())
+        _, market = check_freq_and_market(uni_times, freq=base_freq)
+    else:
+        market = "默认"
+
+    df['freq_edt'] = df['dt'].apply(lambda x: freq_end_time(x, target_freq, market))
+    dfk1 = df.groupby('freq_edt').agg(
+        {'symbol': 'first', 'dt': 'last', 'open': 'first', 'close': 'last', 'high': 'max',
+         'low': 'min', 'vol': 'sum', 'amount': 'sum', 'freq_edt': 'last'})
+    dfk1.reset_index(drop=True, inplace=True)
+    dfk1['dt'] = dfk1['freq_edt']
+    dfk1 = dfk1[['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount']]
+
+    if raw_bars:
+        _bars = []
+        for i, row in enumerate(dfk1.to_dict("records"), 1):
+            row.update({'id': i, 'freq': target_freq})
+            _bars.append(RawBar(**row))
+
+        if kwargs.get('drop_unfinished', True):
+            if df['dt'].iloc[-1] < _bars[-1].dt:
+                _bars.pop()
+        return _bars
+    else:
+        return dfk1
+
+
+def mock_1min(market, days, seed=42):
+    """按 market 的交易时间生成 days 个交易日的 1 分钟K线"""
+    rng = np.random.default_rng(seed)
+    times = pd.to_timedelta([f"{x}:00" for x in freq_market_times[f"1分钟_{market}"]])
+    dates = pd.bdate_range("2020-01-01", periods=days)
+    dts = (dates.values[:, None] + times.values[None, :]).ravel()
+    n = len(dts)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    return pd.DataFrame({"symbol": f"MOCK_{market}", "dt": dts, "open": close * (1 + rng.normal(0, 0.0005, n)),
+                         "close": close, "high": close * (1 + np.abs(rng.normal(0, 0.0005, n))),
+                         "low": close * (1 - np.abs(rng.normal(0, 0.0005, n))),
+                         "vol": rng.integers(100, 100000, n), "amount": rng.random(n) * 1e8})
+
+
+def read_a_1min(days):
+    from test.test_analyze import read_1min
+    df = pd.DataFrame(read_1min())[['symbol', 'dt', 'open', 'close', 'high', 'low', 'vol', 'amount']]
+    dates = df['dt'].dt.date
+    return df[dates.isin(sorted(dates.unique())[:days])].reset_index(drop=True)
+
+
+def is_same(a, b):
+    return len(a) == len(b) and all(x.__dict__ == y.__dict__ for x, y in zip(a, b))
+
+
+def timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=str, default="250,1000", help="交易日数量，逗号分隔")
+    parser.add_argument("--freqs", type=str, default="5分钟,30分钟,60分钟,日线,周线,月线", help="目标周期，逗号分隔")
+    args = parser.parse_args()
+
+    rows = []
+    for days in [int(x) for x in args.days.split(",")]:
+        data = {"A股": read_a_1min(days), "期货": mock_1min("期货", days), "默认": mock_1min("默认", days)}
+        for market, df in data.items():
+            for freq in args.freqs.split(","):
+                old_res, old_seconds = timeit(old_resample_bars, df.copy(), freq, base_freq="1分钟")
+                new_res, new_seconds = timeit(resample_bars, df.copy(), freq, base_freq="1分钟")
+                rows.append({"市场": market, "交易日": days, "1分钟K线数": len(df), "目标周期": freq,
+                             "一致": is_same(old_res, new_res), "原实现耗时(秒)": round(old_seconds, 4),
+                             "向量化耗时(秒)": round(new_seconds, 4),
+                             "加速倍数": round(old_seconds / max(new_seconds, 1e-9), 1)})
+                print(rows[-1])
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
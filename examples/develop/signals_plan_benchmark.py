@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+describe: CzscSignals.get_signals_by_conf 编译执行计划前后的一致性与耗时对比，并输出各信号函数的累计耗时
+
+使用方法：在项目根目录下执行 python examples/develop/signals_plan_benchmark.py --bars 3000
+
+信号配置由 5 个周期 × 3 个 di × 9 个信号函数组合得到（135 个配置，含 10% 的重复配置），
+一致性要求每根K线上的信号字典（包括 key 的顺序）完全相同。
+"""
+import sys
+import time
+import argparse
+from copy import deepcopy
+from collections import OrderedDict
+
+sys.path.insert(0, ".")
+from czsc.traders.base import CzscSignals
+from czsc.utils import import_by_name
+from czsc.utils.bar_generator import BarGenerator
+from test.test_analyze import read_1min
+
+freqs = ['5分钟', '15分钟', '30分钟', '60分钟', '日线']
+
+
+def get_signals_config():
+    conf = []
+    for freq in freqs:
+        for di in (1, 2, 3):
+            for tp in (5, 10, 20, 60):
+                conf.append({'name': 'czsc.signals.tas_ma_base_V221101', 'freq': freq, 'di': di,
+                             'ma_type': 'SMA', 'timeperiod': tp})
+            conf.append({'name': 'czsc.signals.tas_macd_base_V221028', 'freq': freq, 'di': di, 'key': 'macd'})
+            conf.append({'name': 'czsc.signals.tas_macd_base_V221028', 'freq': freq, 'di': di, 'key': 'dif'})
+            conf.append({'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': freq, 'di': di})
+            conf.append({'name': 'czsc.signals.bar_zdt_V230331', 'freq': freq, 'di': di})
+            conf.append({'name': 'czsc.signals.tas_double_ma_V221203', 'freq': freq, 'di': di,
+                         'ma_seq': (5, 20), 'th': 100})
+    return conf + deepcopy(conf[::10])
+
+
+class OldCzscSignals(CzscSignals):
+    """编译执行计划之前的 get_signals_by_conf"""
+
+    def get_signals_by_conf(self):
+        s = OrderedDict()
+        for param in self.signals_config:
+            param = dict(param)
+            sig_name = param.pop('name')
+            sig_func = import_by_name(sig_name) if isinstance(sig_name, str) else sig_name
+            freq = param.pop('freq', None)
+            if freq in self.kas:
+                s.update(sig_func(self.kas[freq], **param))
+            else:
+                s.update(sig_func(self, **param))
+        return s
+
+
+def run(cls, init_bars, bars, signals_config, **kwargs):
+    bg = BarGenerator('1分钟', freqs=freqs, market='A股')
+    for bar in init_bars:
+        bg.update(bar)
+    cs = cls(bg, signals_config=signals_config, **kwargs)
+
+    sigs = []
+    start = time.perf_counter()
+    for bar in bars:
+        cs.update_signals(bar)
+        sigs.append(list(cs.s.items()))
+    return cs, sigs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=3000, help="计算信号的1分钟K线数量")
+    args = parser.parse_args()
+
+    bars = read_1min()
+    init_bars, bars = bars[:20000], bars[20000: 20000 + args.bars]
+    signals_config = get_signals_config()
+
+    _, old_sigs, old_seconds = run(OldCzscSignals, init_bars, bars, signals_config)
+    _, new_sigs, new_seconds = run(CzscSignals, init_bars, bars, signals_config)
+    cs, _, timing_seconds = run(CzscSignals, init_bars, bars, signals_config, signals_timing=True)
+
+    print(f"信号配置数量：{len(signals_config)}，K线数量：{len(bars)}，结果一致：{old_sigs == new_sigs}")
+    print(f"原实现耗时：{old_seconds:.3f} 秒；执行计划耗时：{new_seconds:.3f} 秒，加速倍数：{old_seconds / new_seconds:.2f}；"
+          f"开启 signals_timing 耗时：{timing_seconds:.3f} 秒")
+    print(cs.get_signals_timing().head(20).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 对比 __slots__ 版本与 __dict__ 版本的 RawBar / NewBar / FX 在 100 万根K线上的内存占用和耗时
+
+使用方法：在项目根目录下执行 python examples/develop/slots_objects_memory.py
+"""
+import sys
+import gc
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import List
+
+sys.path.insert(0, ".")
+import czsc.analyze
+from czsc.analyze import CZSC
+from czsc.enum import Mark, Freq
+from czsc import objects
+
+
+@dataclass
+class DictRawBar:
+    """优化前的 RawBar：普通 dataclass，每个对象都有 __dict__ 和 cache 字典"""
+    symbol: str
+    id: int
+    dt: datetime
+    freq: Freq
+    open: float
+    close: float
+    high: float
+    low: float
+    vol: float
+    amount: float
+    cache: dict = field(default_factory=dict)
+
+
+@dataclass
+class DictNewBar:
+    """优化前的 NewBar"""
+    symbol: str
+    id: int
+    dt: datetime
+    freq: Freq
+    open: float
+    close: float
+    high: float
+    low: float
+    vol: float
+    amount: float
+    elements: List = field(default_factory=list)
+    cache: dict = field(default_factory=dict)
+
+
+@dataclass
+class DictFX:
+    """优化前的 FX"""
+    symbol: str
+    dt: datetime
+    mark: Mark
+    high: float
+    low: float
+    fx: float
+    elements: List = field(default_factory=list)
+    cache: dict = field(default_factory=dict)
+
+
+def copy_methods(target, source):
+    """把 source 上定义的属性和方法复制到 target，保证两个版本的行为完全一致"""
+    for name, value in vars(source).items():
+        if not name.startswith("__") and name not in target.__dict__ and isinstance(value, (property, type(copy_methods))):
+            setattr(target, name, value)
+
+
+copy_methods(DictRawBar, objects.RawBar)
+copy_methods(DictNewBar, objects.NewBar)
+copy_methods(DictFX, objects.FX)
+
+
+def mock_rows(n=1000000, seed=42):
+    """生成 n 根随机游走的1分钟K线"""
+    rng = np.random.default_rng(seed)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0005, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0005, n)))
+    vol = rng.integers(1000, 100000, n).astype(float)
+    df = pd.DataFrame({"symbol": "MOCK", "id": np.arange(n), "freq": Freq.F1,
+                       "dt": pd.date_range("2010-01-01", periods=n, freq="1min"),
+                       "open": open_, "close": close, "high": high, "low": low, "vol": vol, "amount": vol * close})
+    return df.to_dict("records")
+
+
+def run(rows, raw_cls, new_bar_cls, fx_cls, max_bi_num):
+    czsc.analyze.NewBar, czsc.analyze.FX = new_bar_cls, fx_cls
+    try:
+        gc.collect()
+        tracemalloc.start()
+        bars = [raw_cls(**row) for row in rows]
+        bars_mem = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        c = CZSC(bars[:1], max_bi_num=max_bi_num)
+        for bar in bars[1:]:
+            c.update(bar)
+        seconds = time.perf_counter() - start
+
+        del bars
+        gc.collect()
+        czsc_mem, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        czsc.analyze.NewBar, czsc.analyze.FX = objects.NewBar, objects.FX
+
+    return {
+        "对象类型": raw_cls.__name__,
+        "max_bi_num": max_bi_num,
+        "笔数量": len(c.bi_list),
+        "100万RawBar占用(MB)": round(bars_mem / 1024 ** 2, 1),
+        "CZSC对象占用(MB)": round(czsc_mem / 1024 ** 2, 1),
+        "峰值(MB)": round(peak / 1024 ** 2, 1),
+        "update耗时(秒)": round(seconds, 1),
+    }
+
+
+def main():
+    rows = mock_rows()
+    res = []
+    for max_bi_num in [50, 1000]:
+        res.append(run(rows, DictRawBar, DictNewBar, DictFX, max_bi_num))
+        res.append(run(rows, objects.RawBar, objects.NewBar, objects.FX, max_bi_num))
+    print(pd.DataFrame(res).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
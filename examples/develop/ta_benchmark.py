@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+describe: czsc.utils.ta 中 SMA / EMA / MACD / KDJ / RSQ 向量化前后的一致性与耗时对比
+
+使用方法：在项目根目录下执行 python examples/develop/ta_benchmark.py --lengths 1000,10000,100000,1000000
+
+一致性要求是逐位相同（均经过原有的 round(4)），输出表格中的“一致”列为 False 时说明向量化实现存在问题。
+安装 numba 时，EMA / KDJ 的递推部分会编译执行，否则使用 Python float 列表执行。
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from czsc.utils import ta
+
+
+def old_SMA(close: np.array, timeperiod=5):
+    """向量化之前的 SMA"""
+    res = []
+    for i in range(len(close)):
+        if i < timeperiod:
+            seq = close[0: i + 1]
+        else:
+            seq = close[i - timeperiod + 1: i + 1]
+        res.append(seq.mean())
+    return np.array(res, dtype=np.double).round(4)
+
+
+def old_EMA(close: np.array, timeperiod=5):
+    """向量化之前的 EMA"""
+    res = []
+    for i in range(len(close)):
+        if i < 1:
+            res.append(close[i])
+        else:
+            ema = (2 * close[i] + res[i - 1] * (timeperiod - 1)) / (timeperiod + 1)
+            res.append(ema)
+    return np.array(res, dtype=np.double).round(4)
+
+
+def old_MACD(close: np.array, fastperiod=12, slowperiod=26, signalperiod=9):
+    """向量化之前的 MACD"""
+    ema12 = old_EMA(close, timeperiod=fastperiod)
+    ema26 = old_EMA(close, timeperiod=slowperiod)
+    diff = ema12 - ema26
+    dea = old_EMA(diff, timeperiod=signalperiod)
+    macd = (diff - dea) * 2
+    return diff.round(4), dea.round(4), macd.round(4)
+
+
+def old_KDJ(close: np.array, high: np.array, low: np.array):
+    """向量化之前的 KDJ"""
+    n = 9
+    hv = []
+    lv = []
+    for i in range(len(close)):
+        if i < n:
+            h_ = high[0: i + 1]
+            l_ = low[0: i + 1]
+        else:
+            h_ = high[i - n + 1: i + 1]
+            l_ = low[i - n + 1: i + 1]
+        hv.append(max(h_))
+        lv.append(min(l_))
+
+    hv = np.around(hv, decimals=2)
+    lv = np.around(lv, decimals=2)
+    rsv = np.where(hv == lv, 0, (close - lv) / (hv - lv) * 100)
+
+    k = []
+    d = []
+    j = []
+    for i in range(len(rsv)):
+        if i < n:
+            k_ = rsv[i]
+            d_ = k_
+        else:
+            k_ = (2 / 3) * k[i - 1] + (1 / 3) * rsv[i]
+            d_ = (2 / 3) * d[i - 1] + (1 / 3) * k_
+
+        k.append(k_)
+        d.append(d_)
+        j.append(3 * k_ - 2 * d_)
+
+    k = np.array(k, dtype=np.double)
+    d = np.array(d, dtype=np.double)
+    j = np.array(j, dtype=np.double)
+    return k.round(4), d.round(4), j.round(4)
+
+
+def old_RSQ(close: [np.array, list]) -> float:
+    """向量化之前的 RSQ"""
+    x = list(range(len(close)))
+    y = np.array(close)
+    x_squred_sum = sum([x1 * x1 for x1 in x])
+    xy_product_sum = sum([x[i] * y[i] for i in range(len(x))])
+    num = len(x)
+    x_sum = sum(x)
+    y_sum = sum(y)
+    delta = float(num * x_squred_sum - x_sum * x_sum)
+    if delta == 0:
+        return 0
+    y_intercept = (1 / delta) * (x_squred_sum * y_sum - x_sum * xy_product_sum)
+    slope = (1 / delta) * (num * xy_product_sum - x_sum * y_sum)
+
+    y_mean = np.mean(y)
+    ss_tot = sum([(y1 - y_mean) * (y1 - y_mean) for y1 in y]) + 0.00001
+    ss_err = sum([(y[i] - slope * x[i] - y_intercept) * (y[i] - slope * x[i] - y_intercept) for i in range(len(x))])
+    rsq = 1 - ss_err / ss_tot
+
+    return round(rsq, 4)
+
+
+def mock_prices(n, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.0005, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.0005, n)))
+    return close, high, low
+
+
+def is_same(a, b):
+    if isinstance(a, tuple):
+        return all(is_same(x, y) for x, y in zip(a, b))
+    return bool(np.array_equal(a, b, equal_nan=True))
+
+
+def timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=str, default="1000,10000,100000,1000000", help="序列长度，逗号分隔")
+    args = parser.parse_args()
+
+    rows = []
+    for n in [int(x) for x in args.lengths.split(",")]:
+        close, high, low = mock_prices(n)
+        cases = [
+            ("SMA(20)", old_SMA, ta.SMA, (close, 20)),
+            ("EMA(26)", old_EMA, ta.EMA, (close, 26)),
+            ("MACD", old_MACD, ta.MACD, (close,)),
+            ("KDJ", old_KDJ, ta.KDJ, (close, high, low)),
+            ("RSQ", old_RSQ, ta.RSQ, (close,)),
+        ]
+        for name, old_func, new_func, params in cases:
+            old_res, old_seconds = timeit(old_func, *params)
+            new_res, new_seconds = timeit(new_func, *params)
+            rows.append({"指标": name, "序列长度": n, "一致": is_same(old_res, new_res),
+                         "原实现耗时(秒)": round(old_seconds, 4), "向量化耗时(秒)": round(new_seconds, 4),
+                         "加速倍数": round(old_seconds / max(new_seconds, 1e-9), 1)})
+            print(rows[-1])
+
+    print(f"\nnumba: {'已安装' if ta.njit is not None else '未安装'}")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
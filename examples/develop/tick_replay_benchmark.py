@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+describe: 逐笔行情回放测试，统计 BarGenerator.update_tick / CzscTrader.on_tick 单核每秒处理的行情笔数
+
+使用方法：在项目根目录下执行 python examples/develop/tick_replay_benchmark.py --bars 20000 --ticks_per_bar 20
+
+行情由 test/data 中的 1 分钟K线拆分得到：每根K线拆成 ticks_per_bar 笔，依次经过开盘价、最高价、最低价、收盘价，
+成交量平均分配；回放结束后检查各周期K线与逐根 update 1 分钟K线的结果是否一致。
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+sys.path.insert(0, ".")
+from czsc.objects import Tick
+from czsc.utils.bar_generator import BarGenerator
+from czsc.traders.base import CzscTrader
+from test.test_analyze import read_1min
+
+freqs = ['2分钟', '5分钟', '15分钟', '30分钟', '60分钟', '日线', '周线', '月线']
+signals_config = [
+    {'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '5分钟', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+    {'name': 'czsc.signals.tas_macd_base_V221028', 'freq': '15分钟', 'di': 1, 'key': 'macd'},
+    {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '30分钟', 'di': 1},
+    {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '日线', 'di': 1},
+]
+
+
+def split_ticks(bar, n):
+    """把一根1分钟K线拆成 n 笔行情，价格依次经过开盘价、最高价、最低价、收盘价"""
+    xs = np.linspace(0, 3, n)
+    xs[np.round(np.arange(4) * (n - 1) / 3).astype(int)] = np.arange(4)
+    prices = np.interp(xs, [0, 1, 2, 3], [bar.open, bar.high, bar.low, bar.close])
+    vol = bar.vol // n
+    return [Tick(symbol=bar.symbol, dt=bar.dt - timedelta(seconds=59 - 59 * i // n), price=float(p),
+                 vol=vol if i < n - 1 else bar.vol - vol * (n - 1)) for i, p in enumerate(prices)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=20000, help="回放的1分钟K线数量")
+    parser.add_argument("--ticks_per_bar", type=int, default=20, help="每根1分钟K线拆分的行情笔数")
+    args = parser.parse_args()
+
+    bars = read_1min()
+    init_bars, bars = bars[:1000], bars[1000: 1000 + args.bars]
+    ticks = [t for bar in bars for t in split_ticks(bar, args.ticks_per_bar)]
+
+    def new_bg():
+        bg = BarGenerator('1分钟', freqs=freqs, market='A股')
+        for bar in init_bars:
+            bg.update(bar)
+        return bg
+
+    rows = []
+
+    bg = new_bg()
+    start = time.perf_counter()
+    for tick in ticks:
+        bg.update_tick(tick)
+    bg.flush_tick()
+    seconds = time.perf_counter() - start
+
+    bg_ref = new_bg()
+    for bar in bars:
+        bg_ref.update(bar)
+    same = all([(x.dt, x.open, x.close, x.high, x.low, x.vol) for x in bg.bars[f]]
+               == [(x.dt, x.open, x.close, x.high, x.low, x.vol) for x in bg_ref.bars[f]] for f in bg.bars)
+    rows.append({"场景": f"BarGenerator.update_tick（{len(freqs) + 1}个周期）", "行情笔数": len(ticks),
+                 "耗时(秒)": round(seconds, 3), "每秒笔数": int(len(ticks) / seconds), "K线一致": same})
+
+    ct = CzscTrader(new_bg(), signals_config=signals_config)
+    start = time.perf_counter()
+    for tick in ticks:
+        ct.on_tick(tick)
+    ct.flush_tick()
+    seconds = time.perf_counter() - start
+    rows.append({"场景": f"CzscTrader.on_tick（{len(signals_config)}个信号）", "行情笔数": len(ticks),
+                 "耗时(秒)": round(seconds, 3), "每秒笔数": int(len(ticks) / seconds), "K线一致": None})
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
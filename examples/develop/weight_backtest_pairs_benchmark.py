@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+describe: WeightBacktest.get_symbol_pairs 按批次配对前后的一致性与耗时对比
+
+使用方法：在项目根目录下执行 python examples/develop/weight_backtest_pairs_benchmark.py --rows 1000000 --digits 2
+
+持仓权重为随机生成的 1 分钟序列：每根K线有 change_rate 的概率把权重调整为 [-1, 1] 之间的随机值。
+一致性要求：新实现的交易对按持仓数量展开后，与原实现逐单位生成的交易对完全相同，evaluate_pairs 的结果在浮点误差内相同。
+"""
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from czsc.traders.weight_backtest import WeightBacktest
+from czsc.utils.stats import evaluate_pairs
+
+
+class PairsOnlyBacktest(WeightBacktest):
+    """初始化时不执行完整回测，只用于对比 get_symbol_pairs"""
+
+    def backtest(self, n_jobs=1):
+        return {}
+
+
+class OldPairsBacktest(PairsOnlyBacktest):
+    """按批次配对之前的 get_symbol_pairs：每个单位的持仓变化生成一条操作记录，再用栈配对"""
+
+    def get_symbol_pairs(self, symbol):
+        dfs = self.dfw[self.dfw["symbol"] == symbol].copy()
+        dfs["volume"] = (dfs["weight"] * pow(10, self.digits)).astype(int)
+        dfs["bar_id"] = list(range(1, len(dfs) + 1))
+        operates = []
+
+        def __add_operate(dt, bar_id, volume, price, operate):
+            for _ in range(abs(volume)):
+                operates.append({"bar_id": bar_id, "dt": dt, "price": price, "operate": operate})
+
+        rows = dfs.to_dict(orient="records")
+        if rows[0]["volume"] > 0:
+            __add_operate(rows[0]["dt"], rows[0]["bar_id"], rows[0]["volume"], rows[0]["price"], operate="开多")
+        elif rows[0]["volume"] < 0:
+            __add_operate(rows[0]["dt"], rows[0]["bar_id"], rows[0]["volume"], rows[0]["price"], operate="开空")
+
+        for row1, row2 in zip(rows[:-1], rows[1:]):
+            v1, v2 = row1["volume"], row2["volume"]
+            args = (row2["dt"], row2["bar_id"])
+            if v1 >= 0 and v2 >= 0:
+                if v2 > v1:
+                    __add_operate(*args, v2 - v1, row2["price"], operate="开多")
+                elif v2 < v1:
+                    __add_operate(*args, v1 - v2, row2["price"], operate="平多")
+            elif v1 <= 0 and v2 <= 0:
+                if v2 > v1:
+                    __add_operate(*args, v1 - v2, row2["price"], operate="平空")
+                elif v2 < v1:
+                    __add_operate(*args, v2 - v1, row2["price"], operate="开空")
+            elif v1 >= 0 >= v2:
+                __add_operate(*args, v1, row2["price"], operate="平多")
+                __add_operate(*args, v2, row2["price"], operate="开空")
+            elif v1 <= 0 <= v2:
+                __add_operate(*args, v1, row2["price"], operate="平空")
+                __add_operate(*args, v2, row2["price"], operate="开多")
+
+        pairs, opens = [], []
+        for op in operates:
+            if op["operate"] in ["开多", "开空"]:
+                opens.append(op)
+                continue
+            open_op = opens.pop()
+            if open_op["operate"] == "开多":
+                p_ret = round((op["price"] - open_op["price"]) / open_op["price"] * 10000, 2)
+                p_dir = "多头"
+            else:
+                p_ret = round((open_op["price"] - op["price"]) / open_op["price"] * 10000, 2)
+                p_dir = "空头"
+            pairs.append({
+                "标的代码": symbol,
+                "交易方向": p_dir,
+                "开仓时间": open_op["dt"],
+                "平仓时间": op["dt"],
+                "开仓价格": open_op["price"],
+                "平仓价格": op["price"],
+                "持仓K线数": op["bar_id"] - open_op["bar_id"] + 1,
+                "事件序列": f"{open_op['operate']} -> {op['operate']}",
+                "持仓天数": (op["dt"] - open_op["dt"]).days,
+                "盈亏比例": p_ret,
+            })
+        return pd.DataFrame(pairs)
+
+
+def create_dfw(rows, change_rate=0.05, seed=42):
+    rng = np.random.default_rng(seed)
+    weight = np.where(rng.random(rows) < change_rate, rng.uniform(-1, 1, rows), np.nan)
+    weight[0] = 0
+    dfw = pd.DataFrame({
+        "dt": pd.date_range("2010-01-04 09:31", periods=rows, freq="min"),
+        "symbol": "BENCH",
+        "weight": pd.Series(weight).ffill().values,
+        "price": 1000 * np.exp(np.cumsum(rng.normal(0, 0.001, rows))),
+    })
+    return dfw
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000, help="持仓权重序列的长度")
+    parser.add_argument("--digits", type=int, default=2, help="权重保留的小数位数")
+    parser.add_argument("--change_rate", type=float, default=0.05, help="每根K线调整权重的概率")
+    args = parser.parse_args()
+
+    dfw = create_dfw(args.rows, args.change_rate)
+    new_wb = PairsOnlyBacktest(dfw, digits=args.digits, n_jobs=1)
+    old_wb = OldPairsBacktest(dfw, digits=args.digits, n_jobs=1)
+
+    start = time.perf_counter()
+    new_pairs = new_wb.get_symbol_pairs("BENCH")
+    new_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    old_pairs = old_wb.get_symbol_pairs("BENCH")
+    old_seconds = time.perf_counter() - start
+
+    cols = list(old_pairs.columns)
+    expanded = new_pairs.loc[new_pairs.index.repeat(new_pairs["持仓数量"]), cols]
+    same_pairs = (expanded.sort_values(cols).reset_index(drop=True)
+                  .equals(old_pairs.sort_values(cols).reset_index(drop=True)))
+    # 累计盈利、累计亏损没有四舍五入，按数量加权求和与逐个单位累加只有浮点误差
+    new_stats, old_stats = evaluate_pairs(new_pairs), evaluate_pairs(old_pairs)
+    same_stats = all(new_stats[k] == v or np.isclose(new_stats[k], v, rtol=1e-12) for k, v in old_stats.items())
+
+    print(f"持仓权重行数：{len(dfw)}，digits={args.digits}，交易对：原实现 {len(old_pairs)} 条，"
+          f"按批次配对 {len(new_pairs)} 条；交易对展开后一致：{same_pairs}，evaluate_pairs 一致：{same_stats}")
+    print(f"原实现耗时：{old_seconds:.3f} 秒；按批次配对耗时：{new_seconds:.3f} 秒，加速倍数：{old_seconds / new_seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -85,3 +85,334 @@ def test_czsc_update():
     file_html = "x.html"
     chart.render(file_html)
     os.remove(file_html)
+
+
+
+class _FullScanCZSC(CZSC):
+    """每根K线都对 bars_ubi 全量调用 check_fxs / check_bi 的参考实现"""
+
+    def _CZSC__update_bi(self):
+        from czsc import envs
+        from czsc.analyze import check_fxs, check_bi, BI, Mark
+
+        bars_ubi = self.bars_ubi
+        if len(bars_ubi) < 3:
+            return
+
+        if not self.bi_list:
+            fxs = check_fxs(bars_ubi)
+            if not fxs:
+                return
+            fx_a = fxs[0]
+            for fx in [x for x in fxs if x.mark == fx_a.mark]:
+                if (fx_a.mark == Mark.D and fx.low <= fx_a.low) or (fx_a.mark == Mark.G and fx.high >= fx_a.high):
+                    fx_a = fx
+            bi, self.bars_ubi = check_bi([x for x in bars_ubi if x.dt >= fx_a.elements[0].dt])
+            if isinstance(bi, BI):
+                self.bi_list.append(bi)
+            return
+
+        if envs.get_bi_change_th() > 0.5 and len(self.bi_list) >= 5:
+            price_seq = [x.power_price for x in self.bi_list[-5:]]
+            benchmark = min(self.bi_list[-1].power_price, sum(price_seq) / len(price_seq))
+        else:
+            benchmark = None
+
+        bi, self.bars_ubi = check_bi(bars_ubi, benchmark)
+        if isinstance(bi, BI):
+            self.bi_list.append(bi)
+
+        last_bi, bars_ubi = self.bi_list[-1], self.bars_ubi
+        if (last_bi.direction == Direction.Up and bars_ubi[-1].high > last_bi.high) \
+                or (last_bi.direction == Direction.Down and bars_ubi[-1].low < last_bi.low):
+            self.bars_ubi = last_bi.bars[:-2] + [x for x in bars_ubi if x.dt >= last_bi.bars[-2].dt]
+            self.bi_list.pop(-1)
+
+
+def test_czsc_incremental_bi():
+    """增量识别的分型、笔与全量重算的结果逐K线一致"""
+    from czsc.analyze import check_fxs
+
+    def _state(c):
+        bis = [(x.sdt, x.edt, x.fx_a.fx, x.fx_b.fx, len(x.bars), len(x.fxs)) for x in c.bi_list]
+        return bis, [x.dt for x in c.bars_ubi], len(c.bars_raw)
+
+    bars = read_daily()
+    c1 = CZSC(bars[:10])
+    c2 = _FullScanCZSC(bars[:10])
+    for bar in bars[10:]:
+        c1.update(bar)
+        c2.update(bar)
+        assert _state(c1) == _state(c2)
+        assert [(x.dt, x.mark) for x in c1.ubi_fxs] == [(x.dt, x.mark) for x in check_fxs(c1.bars_ubi)]
+
+    assert len(c1.bi_list) > 10
+
+
+def test_czsc_columnar():
+    """列式存储 BarStore 与 List[RawBar] 的分析结果一致"""
+    import pickle
+    import numpy as np
+    from czsc.utils.bar_store import BarStore, RawBarView
+
+    bars = read_1min()[:30000]
+    c1 = CZSC(bars, max_bi_num=20)
+    c2 = CZSC(bars, max_bi_num=20, columnar=True)
+    assert isinstance(c2.bars_raw, BarStore)
+    assert [(x.sdt, x.edt, x.length) for x in c1.bi_list] == [(x.sdt, x.edt, x.length) for x in c2.bi_list]
+    assert [x.dt for x in c1.bars_ubi] == [x.dt for x in c2.bars_ubi]
+    assert [x.__dict__ for x in c1.bars_raw] == [x.__dict__ for x in c2.bars_raw]
+    assert np.array_equal(c2.bars_raw.close, np.array([x.close for x in c1.bars_raw]))
+
+    # 笔和分型中引用的原始K线都是 BarStore 视图，并且仍然可以正常读取
+    raw_bars = [y for x in c2.bi_list for y in x.raw_bars]
+    assert all(isinstance(x, RawBarView) for x in raw_bars)
+    assert [x.dt for x in raw_bars] == [x.dt for x in c1.bi_list for x in x.raw_bars]
+
+    # cache 的读写会保存在 BarStore 中
+    c2.bars_raw[-1].cache["SMA#5"] = 1
+    c2.bars_raw[-2].cache = {"SMA#5": 2}
+    assert c2.bars_raw[-1].cache == {"SMA#5": 1} and c2.bars_raw[-2].cache == {"SMA#5": 2}
+
+    c3 = pickle.loads(pickle.dumps(c2))
+    assert c3.bars_raw[-1].cache == {"SMA#5": 1}
+    assert c3.bars_raw.to_frame().shape == (len(c2.bars_raw), 10)
+
+    # 带时区的K线：视图的 dt 保留时区，分析结果与 List[RawBar] 一致
+    tz_bars = [RawBar(**{**x.__dict__, "dt": pd.Timestamp(x.dt).tz_localize("Asia/Shanghai")}) for x in bars[:5000]]
+    c1 = CZSC(tz_bars, max_bi_num=20)
+    c2 = CZSC(tz_bars, max_bi_num=20, columnar=True)
+    assert [(x.sdt, x.edt, x.length) for x in c1.bi_list] == [(x.sdt, x.edt, x.length) for x in c2.bi_list]
+    assert [x.dt for x in c1.bars_raw] == [x.dt for x in c2.bars_raw] and c2.bars_raw[-1].dt.tz is not None
+    assert c2.bars_raw.dt[-1] == c2.bars_raw[-1].dt
+
+
+def test_czsc_from_dataframe():
+    """from_dataframe 构建与逐K线 update 的结果一致，并且可以继续增量更新"""
+    def _state(c):
+        bis = [(x.sdt, x.edt, x.fx_a.fx, x.fx_b.fx, [(y.dt, y.high, y.low) for y in x.bars], len(x.fxs))
+               for x in c.bi_list]
+        return bis, [(x.dt, x.high, x.low, len(x.elements)) for x in c.bars_ubi], [x.dt for x in c.bars_raw]
+
+    for bars, max_bi_num in [(read_daily(), 50), (read_1min()[:50000], 20)]:
+        df = pd.DataFrame([x.__dict__ for x in bars])
+        c1 = CZSC(bars[:-100], max_bi_num=max_bi_num)
+        c2 = CZSC.from_dataframe(df.iloc[:-100], max_bi_num=max_bi_num)
+        assert _state(c1) == _state(c2) and len(c1.bi_list) > 10
+        for bar in bars[-100:]:
+            c1.update(bar)
+            c2.update(bar)
+        assert _state(c1) == _state(c2)
+
+    c3 = CZSC.from_arrays(bars[0].symbol, Freq.F1, dt=df['dt'], open=df['open'], close=df['close'],
+                          high=df['high'], low=df['low'], vol=df['vol'], max_bi_num=20,
+                          get_signals=lambda c: OrderedDict({"bi_num": len(c.bi_list)}))
+    assert _state(c3) == _state(c1) and c3.signals == {"bi_num": len(c1.bi_list)}
+
+    # 带时区的 dt 列保留时区，与逐K线 update 带时区K线的结果一致
+    df = df.iloc[:5000].assign(dt=pd.to_datetime(df['dt'].iloc[:5000]).dt.tz_localize("Asia/Shanghai"))
+    bars = [RawBar(**row) for row in df.to_dict("records")]
+    c4 = CZSC.from_dataframe(df, max_bi_num=20)
+    assert c4.bars_raw[-1].dt == df['dt'].iloc[-1] and str(c4.bars_raw[0].dt.tz) == "Asia/Shanghai"
+    assert _state(c4) == _state(CZSC(bars, max_bi_num=20))
+
+
+def test_czsc_warmup():
+    """预热模式只在最后一根K线（或 sdt 之后的K线）上计算信号"""
+    bars = read_daily()
+    calls = []
+
+    def get_signals(c):
+        calls.append(c.bars_raw[-1].dt)
+        return OrderedDict({"bi_num": len(c.bi_list), "ubi": len(c.bars_ubi)})
+
+    c1 = CZSC(bars, get_signals=get_signals)
+    assert len(calls) == len(bars)
+
+    calls.clear()
+    c2 = CZSC(bars, get_signals=get_signals, warmup=True)
+    assert calls == [bars[-1].dt] and c2.signals == c1.signals
+
+    calls.clear()
+    c3 = CZSC(bars, get_signals=get_signals, sdt=bars[-10].dt)
+    assert calls == [x.dt for x in bars[-10:]] and c3.signals == c1.signals
+
+    calls.clear()
+    df = pd.DataFrame([x.__dict__ for x in bars])
+    c4 = CZSC.from_dataframe(df, get_signals=get_signals, sdt=bars[-10].dt)
+    assert calls == [x.dt for x in bars[-10:]] and c4.signals == c1.signals
+
+
+def test_czsc_update_cost_flat(monkeypatch):
+    """bars_raw / bi_list 的数量控制只在确实需要移除时才复制序列，单根K线的均摊成本与历史K线数量无关
+
+    统计数量控制过程中复制和删除的元素数量，不依赖耗时，结果是确定的
+    """
+    from czsc.objects import RawBarSeq
+
+    bars = read_1min()[:20000]
+    drop_before = RawBarSeq.drop_before
+    dropped = []
+
+    def _drop_before(self, i):
+        n = len(self.bars)
+        drop_before(self, i)
+        dropped.append(n - len(self.bars))
+
+    monkeypatch.setattr(RawBarSeq, "drop_before", _drop_before)
+
+    for max_bi_num in [100000, 20]:
+        dropped.clear()
+        c = CZSC(bars[:100], max_bi_num=max_bi_num)
+        copied, raw_len = 0, 0
+        for bar in bars[100:]:
+            bars_raw, bi_list = c.bars_raw, c.bi_list
+            c.update(bar)
+            copied += len(c.bars_raw) if c.bars_raw is not bars_raw else 0
+            copied += len(c.bi_list) if c.bi_list is not bi_list else 0
+            raw_len += len(c.bars_raw)
+
+        n = len(bars) - 100
+        assert sum(dropped) <= n
+        if max_bi_num == 100000:
+            # 不需要移除时，不复制任何序列
+            assert copied == 0 and len(c.bars_raw) > n and len(c.bi_list) > 1000
+        else:
+            # 每完成一笔才复制一次，远小于每根K线都复制整个 bars_raw 的成本
+            assert len(c.bi_list) == 20 and copied < 0.25 * raw_len
+
+
+def test_czsc_new_bar_elements():
+    """NewBar.elements 是原始K线序列的区间，长时间横盘时也能完整保留所有原始K线"""
+    import pickle
+    from czsc.objects import RawBarRange
+
+    bars = read_daily()[:500]
+    dt = pd.date_range(bars[-1].dt, periods=301, freq='D')[1:]
+    # 模拟长时间横盘：连续 300 根K线的价格区间完全相同，全部合并为一根无包含K线
+    kw = dict(symbol=bars[0].symbol, freq=Freq.D, vol=1, amount=1)
+    inside = [RawBar(id=500 + i, dt=x, open=3000, close=3001 + i % 2, high=3002, low=2999, **kw)
+              for i, x in enumerate(dt)]
+
+    c = CZSC(bars + inside, max_bi_num=5)
+    last = c.bars_ubi[-1]
+    assert isinstance(last.elements, RawBarRange) and len(last.elements) == 300
+    assert last.raw_bars == inside and last.elements[-1] is inside[-1] and last.elements[:2] == inside[:2]
+    assert len(c._raw_seq.bars) < 2 * len(c.bars_raw)
+
+    c2 = pickle.loads(pickle.dumps(c))
+    assert [x.dt for x in c2.bars_ubi[-1].raw_bars] == [x.dt for x in last.raw_bars]
+
+
+def test_czsc_memoized_properties(monkeypatch):
+    """fx_list / ubi_fxs / ubi / last_bi_extend 每次 update 后最多计算一次，check_fxs 每次 update 最多执行一次"""
+    import czsc.analyze
+    from czsc.analyze import check_fxs
+
+    counter = {"check_fxs": 0}
+
+    def _check_fxs(bars):
+        counter["check_fxs"] += 1
+        return check_fxs(bars)
+
+    monkeypatch.setattr(czsc.analyze, "check_fxs", _check_fxs)
+
+    def get_signals(c):
+        for _ in range(3):
+            _ = c.fx_list, c.ubi_fxs, c.ubi, c.last_bi_extend if c.bi_list else None
+        return OrderedDict()
+
+    bars = read_daily()
+    c = CZSC(bars[:100], get_signals=get_signals)
+    for bar in bars[100:]:
+        counter["check_fxs"] = 0
+        c.update(bar)
+        assert counter["check_fxs"] <= 1
+
+        # 缓存的结果与重新计算的结果一致
+        fxs = check_fxs(c.bars_ubi)
+        assert [(x.dt, x.mark, x.fx) for x in c.ubi_fxs] == [(x.dt, x.mark, x.fx) for x in fxs]
+        assert c.ubi_fxs is c.ubi_fxs and c.fx_list is c.fx_list
+        if c.ubi:
+            raw_bars = [y for x in c.bars_ubi for y in x.raw_bars]
+            assert c.ubi['high'] == max(x.high for x in raw_bars) and c.ubi['low'] == min(x.low for x in raw_bars)
+        if c.bi_list:
+            high, low = max(x.high for x in c.bars_ubi), min(x.low for x in c.bars_ubi)
+            assert c.last_bi_extend == (high > c.bi_list[-1].high if c.bi_list[-1].direction == Direction.Up
+                                        else low < c.bi_list[-1].low)
+
+
+def test_bi_stats():
+    """笔创建时计算的 BIStats 与按定义重新计算的结果一致，且不再依赖 RawBarSeq"""
+    import math
+    import pickle
+    from czsc.utils.corr import single_linear
+
+    c = CZSC(read_daily(), max_bi_num=50)
+    for bi in c.bi_list:
+        raw_bars = [y for x in bi.bars[1:-1] for y in x.raw_bars]
+        assert bi.raw_bars == raw_bars
+        assert bi.power_volume == sum([x.vol for x in bi.bars[1:-1]])
+        assert bi.rsq == round(single_linear([x.close for x in raw_bars])['r2'], 4)
+        assert bi.high == max(bi.fx_a.high, bi.fx_b.high) and bi.low == min(bi.fx_a.low, bi.fx_b.low)
+        assert bi.angle == round(math.asin(bi.power_price / bi.hypotenuse) * 180 / 3.14, 2)
+
+    # 笔从 bi_list 中移除、原始K线被清理后，统计特征依然可用
+    bi = c.bi_list[0]
+    c._raw_seq.drop_before(len(c._raw_seq))
+    assert bi.raw_bars and pickle.loads(pickle.dumps(bi)).rsq == bi.rsq
+
+
+def test_indicator_store():
+    """CZSC.ind 读取与 bars_raw 对齐的指标列，bar.cache 兼容层读取的是同一份数据"""
+    import pickle
+    import numpy as np
+    import pytest
+    from czsc.utils.ta import MACD
+    from czsc.signals.tas import update_macd_cache, update_ma_cache
+    from czsc.utils.ind_store import IndicatorCache
+
+    bars = read_1min()[:6000]
+    c = CZSC(bars[:1000], max_bi_num=20)
+    for i, bar in enumerate(bars[1000:]):
+        if i % 5 == 0:
+            # 同一时间的新K线替换最后一根K线，指标需要重新计算
+            c.update(RawBar(**{**bar.__dict__, "close": bar.close * 1.01, "cache": None}))
+            update_macd_cache(c)
+        c.update(bar)
+        key = update_macd_cache(c)
+        ma_key = update_ma_cache(c, ma_type="SMA", timeperiod=5)
+
+    # bars_raw 头部K线移除后，指标列依然与 bars_raw 对齐
+    assert c.bars_raw[0].dt > bars[0].dt
+    macd = c.ind(key, "macd")
+    assert len(macd) == len(c.bars_raw) and not macd.flags.writeable
+    assert macd.tolist() == [x.cache[key]["macd"] for x in c.bars_raw]
+    assert c.ind(ma_key).tolist() == [x.cache[ma_key] for x in c.bars_raw]
+    close = np.array([x.close for x in bars])
+    assert list(macd[-100:]) == list(MACD(close)[2][-100:])
+    with pytest.raises(KeyError):
+        c.ind(key, "close")
+
+    # 整体替换 bar.cache 时保留指标，其他缓存数据正常读写
+    bar = c.bars_raw[-1]
+    bar.cache = {**bar.cache, "user": 1}
+    assert bar.cache["user"] == 1 and bar.cache[key] == c.bars_raw[-1].cache[key]
+    assert bar.__dict__["cache"] == {key: bar.cache[key], ma_key: bar.cache[ma_key], "user": 1}
+
+    # 对列存储中的指标赋值时写入列存储，多值指标需要给出全部字段
+    bar.cache[ma_key] = 1.0
+    assert bar.cache[ma_key] == 1.0 and c.ind(ma_key)[-1] == 1.0
+    bar.cache[key] = {"dif": 1.0, "dea": 2.0, "macd": -2.0}
+    assert c.ind(key, "macd")[-1] == -2.0 and bar.cache[key]["dif"] == 1.0
+    with pytest.raises(ValueError):
+        bar.cache[key] = 1.0
+
+    # 序列化后 bar.cache 仍然与列存储关联，指标值不会按K线重复保存
+    c2 = pickle.loads(pickle.dumps(c))
+    assert np.array_equal(c2.ind(key, "dif"), c.ind(key, "dif"))
+    assert c2.bars_raw[-1].cache["user"] == 1
+    cache = c2.bars_raw[-1].cache
+    assert isinstance(cache, IndicatorCache) and cache.store is c2.indicators and cache.data == {"user": 1}
+    assert all(x.cache.store is c2.indicators for x in c2.bars_raw)
+    assert dict(cache) == dict(bar.cache)
@@ -299,6 +299,27 @@ def test_resample_bars():
     assert len(_f60_bars) == 3996
 
 
+def test_resample_bars_vectorized():
+    """向量化的 resample_bars 与逐根K线调用 freq_end_time 后分组聚合的结果一致"""
+    times = freq_market_times["1分钟_期货"]
+    dts = [pd.to_datetime(f"{d.date()} {t}") for d in pd.bdate_range("2023-12-25", periods=10) for t in times]
+    n = len(dts)
+    df = pd.DataFrame({"symbol": "MOCK", "dt": dts, "open": [i * 0.1 for i in range(n)], "close": [i * 0.3 for i in range(n)],
+                       "high": [i * 0.5 for i in range(n)], "low": [i * 0.01 for i in range(n)],
+                       "vol": list(range(n)), "amount": [i / 7 for i in range(n)]})
+    # 打乱前面K线的顺序并加上秒数，最后 2000 根K线用于推断市场，保持不变
+    df = pd.concat([df.iloc[:-2000].sample(frac=1, random_state=0), df.iloc[-2000:]], ignore_index=True)
+    df.loc[:n - 2001, 'dt'] -= pd.to_timedelta(df.index[:n - 2000] % 60, unit="s")
+
+    for freq in [Freq.F1, Freq.F5, Freq.F30, Freq.F60, Freq.F120, Freq.D, Freq.W, Freq.M, Freq.S, Freq.Y]:
+        res = resample_bars(df.copy(), freq, raw_bars=False, base_freq="1分钟")
+        edt = df['dt'].apply(lambda x: freq_end_time(x, freq, "期货" if freq.value.endswith("分钟") else "默认"))
+        expected = df.assign(freq_edt=edt).groupby('freq_edt').agg(
+            {'symbol': 'first', 'open': 'first', 'close': 'last', 'high': 'max', 'low': 'min', 'vol': 'sum',
+             'amount': 'sum'}).reset_index().rename(columns={'freq_edt': 'dt'})
+        assert res.equals(expected[res.columns])
+
+
 def test_bg_on_f1():
     """验证从1分钟开始生成各周期K线"""
     bg = BarGenerator(base_freq='1分钟', freqs=['周线', '日线', '30分钟', '5分钟'], max_count=2000)
@@ -339,6 +360,31 @@ def test_bg_on_d():
     assert bg.bars['月线'][-2].id > bg.bars['月线'][-3].id
 
 
+def test_bg_in_place():
+    """最后一根K线原地更新，结果与按 freq_end_time 分组聚合一致；K线序列支持切片，序列化后可以继续更新"""
+    import pickle
+
+    bars = read_daily()
+    bg = BarGenerator(base_freq='日线', freqs=['周线', '月线'], max_count=100)
+    for bar in bars[:-1]:
+        bg.update(bar)
+    bg.bars['周线'][-1].cache['x'] = 1
+
+    bg = pickle.loads(pickle.dumps(bg))
+    bg.update(bars[-1])
+    assert isinstance(bg.bars['周线'][-10:], list) and len(bg.bars['周线']) == 100
+    weekly = list(bg.bars['周线'])
+    for item in [slice(-10, None), slice(3, 20), slice(-30, -5), slice(90, 200), slice(50, 10), slice(None, None, 3)]:
+        assert bg.bars['周线'][item] == weekly[item]
+
+    df = pd.DataFrame([x.__dict__ for x in bars[-10:]])
+    df = df[df['dt'].apply(lambda x: freq_end_time(x, '周线')) == bg.bars['周线'][-1].dt]
+    w = bg.bars['周线'][-1]
+    assert len(df) == 4 and 'x' not in w.cache
+    assert w.open == df['open'].iloc[0] and w.close == df['close'].iloc[-1] and w.vol == df['vol'].sum()
+    assert w.high == df['high'].max() and w.low == df['low'].min()
+
+
 def test_is_trading_time():
     from datetime import datetime
     from czsc.utils.bar_generator import is_trading_time
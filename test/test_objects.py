@@ -2,7 +2,7 @@
 import numpy as np
 from collections import OrderedDict
 from czsc.utils import x_round
-from czsc.objects import Signal, Factor, Event, Freq, Operate
+from czsc.objects import Signal, Factor, Event, Freq, Operate, EventMatcher
 from czsc.objects import cal_break_even_point
 
 
@@ -28,6 +28,21 @@ def test_raw_bar():
     assert np.array([x.cache[key] for x in bars]).sum() == ma.sum() + 200
 
 
+def test_slots_bar():
+    """RawBar 使用 __slots__ 保存字段，cache 按需创建，并且支持 __dict__ / pickle / deepcopy"""
+    import pickle
+    from copy import deepcopy
+    from test.test_analyze import read_daily
+    bar = read_daily()[0]
+    assert not hasattr(bar, "__weakref__") and bar._cache is None
+    assert bar.__dict__["cache"] == {} and bar._cache is None
+
+    bar.cache["SMA5"] = 1
+    assert bar.__dict__["close"] == bar.close and bar.__dict__["cache"] == {"SMA5": 1}
+    for b in [pickle.loads(pickle.dumps(bar)), deepcopy(bar)]:
+        assert b == bar and b.cache == {"SMA5": 1}
+
+
 def test_zs():
     """测试中枢对象"""
     from test.test_analyze import read_daily
@@ -56,6 +71,19 @@ def test_cal_break_even_point():
     assert x_round(cal_break_even_point([-6, -1, 0, 1, 2, 3, 7, 8])) == 0.875
     assert x_round(cal_break_even_point([2, 3, 4, 2, 1, 4, 0, 1, -1, 2, 3, -6, 7, 8])) == 0.5714
 
+    # 加权计算与按权重展开后计算严格一致，不受浮点累加误差影响
+    seq, weights = [-0.65, 4.21, 3.75, 0.91], [21, 11, 39, 15]
+    expanded = [x for x, w in zip(seq, weights) for _ in range(w)]
+    assert cal_break_even_point(seq, weights) == cal_break_even_point(expanded) == 36 / 86
+
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        n = rng.integers(1, 8)
+        seq = np.round(rng.normal(0.5, 3, n), 2).tolist()
+        weights = rng.integers(1, 40, n).tolist()
+        expanded = [x for x, w in zip(seq, weights) for _ in range(w)]
+        assert cal_break_even_point(seq, weights) == cal_break_even_point(expanded)
+
 
 def test_signal():
     s = Signal(k1="1分钟", k3="倒1形态", v1="类一买", v2="七笔", v3="基础型", score=3)
@@ -278,3 +306,79 @@ def test_event():
         }
     )
     assert len(event.get_signals_config()) == 3
+
+
+def _random_events(n=30, seed=1):
+    """随机生成事件，以及用于匹配的信号名称和信号值"""
+    import random
+    random.seed(seed)
+    keys = [f"日线_D{i}K_测试V230101" for i in range(6)]
+    values = ["多头", "空头", "任意", "其他"]
+
+    def __signal():
+        v1, v2, v3 = random.choices(values, k=3)
+        return Signal(f"{random.choice(keys)}_{v1}_{v2}_{v3}_{random.choice([0, 10, 50])}")
+
+    def __signals(k):
+        return [__signal() for _ in range(random.randint(0, k))]
+
+    events = []
+    for i in range(n):
+        factors = [Factor(name=f"F{j}", signals_all=[__signal()] + __signals(2), signals_any=__signals(2),
+                          signals_not=__signals(1)) for j in range(random.randint(1, 3))]
+        events.append(Event(operate=random.choice([Operate.LO, Operate.SO]), factors=factors,
+                            signals_all=__signals(1), signals_any=__signals(2), signals_not=__signals(1)))
+
+    def random_signals():
+        return {k: "_".join(random.choices(values + ["新值"], k=3) + [str(random.choice([0, 10, 50, 100]))]) for k in keys}
+    return events, keys, random_signals
+
+
+def test_event_matcher():
+    events, keys, random_signals = _random_events()
+    matcher = EventMatcher(events)
+    for _ in range(2000):
+        s = random_signals()
+        expected = [event.is_match(s) for event in events]
+        assert matcher.is_match(s) == expected
+        assert matcher.match(s) == next(((i, f) for i, (m, f) in enumerate(expected) if m), (-1, None))
+
+    # 缺少信号时与 Event.is_match 一样抛出 ValueError
+    s = {k: "多头_多头_多头_0" for k in keys[1:]}
+    for event in events:
+        try:
+            event.is_match(s)
+            expected = None
+        except ValueError as e:
+            expected = str(e)
+        try:
+            EventMatcher([event]).is_match(s)
+            res = None
+        except ValueError as e:
+            res = str(e)
+        assert res == expected
+
+
+def test_match_frame():
+    import pandas as pd
+    from czsc.objects import Position, SignalsFrame
+
+    events, keys, random_signals = _random_events(seed=2)
+    rows = [random_signals() for _ in range(2000)]
+    df = pd.DataFrame(rows)
+    frame = SignalsFrame(df)
+    for event in events:
+        m, f = event.match_frame(frame)
+        expected = [event.is_match(s) for s in rows]
+        assert m.tolist() == [x[0] for x in expected] and f.tolist() == [x[1] for x in expected]
+        assert event.factors[0].match_frame(df).tolist() == [event.factors[0].is_match(s) for s in rows]
+
+    pos = Position(symbol="000001.SH", opens=events[:20], exits=events[20:], name="测试")
+    index, names = pos.match_frame(df)
+    assert list(zip(index.tolist(), names.tolist())) == [pos.matcher.match(s) for s in rows]
+
+    try:
+        events[0].match_frame(df.drop(columns=keys))
+        assert False
+    except ValueError as e:
+        assert "不在信号列表中" in str(e)
@@ -6,6 +6,7 @@ create_dt: 2021/11/7 21:07
 """
 import os
 import pandas as pd
+import pytest
 from copy import deepcopy
 from czsc.utils.cache import home_path
 from czsc.traders.base import CzscSignals, BarGenerator, CzscTrader
@@ -14,6 +15,216 @@ from czsc.objects import Signal, Factor, Event, Operate, Position
 from test.test_analyze import read_daily
 
 
+def test_czsc_signals_warm_up():
+    bars = read_daily()
+    signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '日线', 'di': 1}]
+    bg = BarGenerator(base_freq='日线', freqs=['周线', '月线'])
+    for bar in bars[:1000]:
+        bg.update(bar)
+
+    cs1 = CzscSignals(deepcopy(bg), signals_config=signals_config)
+    for bar in bars[1000:]:
+        cs1.update_signals(bar)
+
+    # 均线缓存由全量计算得到，与增量更新存在浮点误差，只比较信号
+    signals = {k: v for k, v in cs1.s.items() if len(k.split("_")) == 3}
+    cs2 = CzscSignals(deepcopy(bg), signals_config=signals_config)
+    cs2.warm_up(bars[1000:])
+    assert {k: cs2.s[k] for k in signals} == signals and cs2.end_dt == cs1.end_dt
+
+    cs3 = CzscSignals(deepcopy(bg), signals_config=signals_config)
+    cs3.warm_up(bars[1000:], sdt=bars[-20].dt)
+    assert {k: cs3.s[k] for k in signals} == signals and len(signals) == 2
+
+
+def test_czsc_signals_update_tick():
+    """逐笔行情合成的K线和信号，与逐根输入已完成K线的结果一致"""
+    from datetime import timedelta
+    from czsc.objects import Tick
+    from test.test_analyze import read_1min
+
+    bars = read_1min()[:3000]
+    signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '5分钟', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '30分钟', 'di': 1}]
+    bg = BarGenerator(base_freq='1分钟', freqs=['5分钟', '30分钟', '日线'], market='A股')
+    for bar in bars[:1000]:
+        bg.update(bar)
+    cs1 = CzscSignals(deepcopy(bg), signals_config=signals_config)
+    cs2 = CzscSignals(deepcopy(bg), signals_config=signals_config)
+
+    s1, s2 = [], []
+    for bar in bars[1000:]:
+        cs1.update_signals(bar)
+        s1.append(cs1.s)
+
+        # 每根K线拆成 4 笔行情：开盘、最高、最低、收盘，成交量平均分配
+        vol = bar.vol // 4
+        for i, price in enumerate([bar.open, bar.high, bar.low, bar.close]):
+            tick = Tick(symbol=bar.symbol, dt=bar.dt - timedelta(seconds=50 - i * 10), price=price,
+                        vol=vol if i < 3 else bar.vol - 3 * vol, amount=bar.amount if i == 3 else 0)
+            if cs2.update_tick(tick) is not None:
+                s2.append(cs2.s)
+            if i == 0:
+                last = cs2.kas['5分钟'].bars_raw[-1]
+                snapshot = dict(last.__dict__)
+
+        # 合成中的K线不写入 bg.bars，CZSC 持有的K线在基础周期K线完成之前保持不变
+        tick_bar = cs2.bg.tick_bar
+        assert (tick_bar.dt, tick_bar.high, tick_bar.low, tick_bar.close, tick_bar.vol) == \
+               (bar.dt, bar.high, bar.low, bar.close, bar.vol)
+        assert cs2.kas['5分钟'].bars_raw[-1] is last and last.__dict__ == snapshot
+        assert cs2.bg.bars['1分钟'][-1].dt < bar.dt
+
+    # 过期的行情被忽略，收盘后结束最后一根K线
+    assert cs2.update_tick(Tick(symbol=bars[0].symbol, dt=bars[1000].dt, price=1)) is None
+    assert cs2.flush_tick().dt == bars[-1].dt and cs2.flush_tick() is None
+    s2.append(cs2.s)
+    assert s1 == s2 and cs2.end_dt == cs1.end_dt
+
+
+def test_czsc_signals_plan():
+    """编译执行计划后的信号与逐个执行信号配置的结果一致，重复配置只计算一次"""
+    from collections import OrderedDict
+    from czsc.utils import import_by_name
+    from czsc.traders.sig_parse import compile_signals_config
+
+    bars = read_daily()
+    signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '周线', 'di': 1},
+                      {'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 2, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5}]
+    groups, order = compile_signals_config(signals_config, freqs=['日线', '周线'])
+    assert [freq for freq, _ in groups] == ['日线', '周线'] and order == [0, 1, 2, 0]
+
+    bg = BarGenerator(base_freq='日线', freqs=['周线', '月线'])
+    for bar in bars[:1000]:
+        bg.update(bar)
+    cs = CzscSignals(bg, signals_config=signals_config, signals_timing=True)
+    for bar in bars[1000:1200]:
+        cs.update_signals(bar)
+        s = OrderedDict()
+        for param in signals_config:
+            param = dict(param)
+            sig_func = import_by_name(param.pop('name'))
+            s.update(sig_func(cs.kas[param.pop('freq')], **param))
+        assert list(cs.get_signals_by_conf().items()) == list(s.items())
+
+    dft = cs.get_signals_timing()
+    assert len(dft) == 3 and dft['count'].tolist() == [401] * 3 and dft['total'].is_monotonic_decreasing
+
+    # 替换 signals_config 后重新编译
+    cs.signals_config = signals_config[:1]
+    assert len(cs.get_signals_by_conf()) == 1 and len(cs.get_signals_timing()) == 1
+
+
+def test_czsc_trader_profiler():
+    import tracemalloc
+    from czsc.utils.profiler import Profiler
+
+    bars = read_daily()
+    signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '周线', 'di': 1}]
+    opens = [Event(name='开多', operate=Operate.LO, factors=[
+        Factor(name="站上SMA5", signals_all=[Signal("日线_D1SMA#5_分类V221101_多头_任意_任意_0")])])]
+    pos = Position(name="测试P", symbol=bars[0].symbol, opens=opens, exits=[], interval=0, timeout=20, stop_loss=300)
+
+    bg = BarGenerator(base_freq='日线', freqs=['周线'])
+    for bar in bars[:1000]:
+        bg.update(bar)
+    profiler = Profiler(memory=True)
+    ct = CzscTrader(bg, positions=[pos], signals_config=signals_config, profiler=profiler)
+    for bar in bars[1000:1100]:
+        ct.update(bar)
+
+    df = profiler.to_dataframe()
+    assert set(df['kind']) == {'signal', 'czsc', 'position'}
+    assert df[df['kind'] == 'czsc'].set_index('freq')['count'].to_dict() == {'日线': 100, '周线': 100}
+    assert df[df['kind'] == 'position']['count'].tolist() == [100]
+    assert df[df['kind'] == 'signal']['count'].tolist() == [101, 101]
+    assert (df['p99_ms'] <= df['max_ms'] + 1e-9).all() and abs(df['ratio'].sum() - 1) < 1e-9
+    assert len(ct.get_signals_timing()) == 2
+
+    text = profiler.to_prometheus()
+    assert 'czsc_call_seconds_count{kind="position",name="测试P"} 100' in text
+    assert 'czsc_call_alloc_bytes' in text
+    tracemalloc.stop()
+
+    # 多个对象共享 Profiler，合并统计
+    other = Profiler().merge(profiler).merge(profiler)
+    assert other.to_dataframe()['count'].sum() == df['count'].sum() * 2
+
+    ct.signals_timing = False
+    assert ct.profiler is None and len(ct.get_signals_timing()) == 0
+
+
+def test_position_simulate():
+    from czsc.traders.base import generate_czsc_signals
+
+    bars = read_daily()
+    signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                      {'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '周线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5}]
+    df = generate_czsc_signals(bars, signals_config, sdt="20100101", df=True)
+
+    def __create_pos(name, **kwargs):
+        opens = [
+            Event(name='开多', operate=Operate.LO, factors=[
+                Factor(name="日周多头", signals_all=[Signal("日线_D1SMA#5_分类V221101_多头_向上_任意_0")],
+                       signals_any=[Signal("周线_D1SMA#5_分类V221101_多头_任意_任意_0"),
+                                    Signal("周线_D1SMA#5_分类V221101_任意_向上_任意_0")])
+            ]),
+            Event(name='开空', operate=Operate.SO, factors=[
+                Factor(name="日线空头", signals_all=[Signal("日线_D1SMA#5_分类V221101_空头_向下_任意_0")],
+                       signals_not=[Signal("周线_D1SMA#5_分类V221101_多头_向上_任意_0")])
+            ]),
+        ]
+        exits = [
+            Event(name='平多', operate=Operate.LE, factors=[
+                Factor(name="周线空头", signals_all=[Signal("周线_D1SMA#5_分类V221101_空头_任意_任意_0")])
+            ]),
+            Event(name='平空', operate=Operate.SE, factors=[
+                Factor(name="周线多头", signals_all=[Signal("周线_D1SMA#5_分类V221101_多头_任意_任意_0")])
+            ]),
+        ]
+        return Position(symbol=bars[0].symbol, opens=opens, exits=exits, name=name, **kwargs)
+
+    params = [dict(), dict(interval=3600 * 24 * 7, timeout=5, stop_loss=50), dict(T0=True, timeout=3, stop_loss=30),
+              dict(interval=3600 * 24 * 3, timeout=1000, stop_loss=1000)]
+    for i, kwargs in enumerate(params):
+        pos = __create_pos(f"测试{i}", **kwargs)
+        res = pos.simulate(df)
+        assert len(pos.holds) == 0
+
+        for row in df.to_dict('records'):
+            pos.update(row)
+
+        pd.testing.assert_frame_equal(res['holds'], pd.DataFrame(pos.holds), check_dtype=False)
+        pd.testing.assert_frame_equal(res['operates'], pd.DataFrame(pos.operates), check_dtype=False)
+        pd.testing.assert_frame_equal(res['pairs'], pd.DataFrame(pos.pairs), check_dtype=False)
+        assert len(pos.operates) > 10
+
+    # 限制内存中保留的记录数量，保留的是最近的记录
+    pos_all, pos_cap = __create_pos("全部"), __create_pos("限制", max_records=50)
+    for row in df.to_dict('records'):
+        pos_all.update(row)
+        pos_cap.update(row)
+    assert len(pos_cap.holds) == len(pos_cap.operates) == 50
+    pd.testing.assert_frame_equal(pos_cap.holds, pos_all.holds.tail(50).reset_index(drop=True))
+    assert list(pos_cap.operates) == list(pos_all.operates)[-50:]
+    assert isinstance(pos_cap.operates[-1]['op'], Operate) and pos_cap.operates[-1]['dt'] <= pos_cap.end_dt
+    assert len(deepcopy(pos_cap).pairs) == len(pos_cap.pairs)
+
+    # holds 的数值列是只读视图，修改需要先 copy，copy 后的修改不影响持仓记录
+    dfh = pos_cap.holds
+    assert not dfh["pos"].values.flags.writeable
+    with pytest.raises(ValueError):
+        dfh["price"].values[0] = 0
+    dfh = pos_cap.holds.copy()
+    dfh.fillna(0, inplace=True)
+    dfh.loc[0, "price"] = 0
+    assert pos_cap.holds["price"].iloc[0] != 0
+
+
 def test_object_position():
     bars = read_daily()
     bg = BarGenerator(base_freq='日线', freqs=['周线', '月线'])
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import pytest
+import pandas as pd
+import pyarrow.parquet as pq
+from czsc.objects import RawBar
+from czsc.utils.cache import home_path
+from czsc.traders.base import generate_czsc_signals
+from czsc.traders.sig_store import generate_signals_dataset, read_signals_dataset, SignalsStore
+from test.test_analyze import read_daily
+
+signals_config = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '日线', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                  {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '周线', 'di': 1}]
+
+
+def read_bars(symbol, freq, sdt, edt, **kwargs):
+    if symbol == "EMPTY":
+        return []
+    bars = [x for x in read_daily() if sdt <= x.dt <= edt]
+    return [RawBar(**{**x.__dict__, "symbol": symbol}) for x in bars]
+
+
+def test_generate_signals_dataset():
+    path = os.path.join(home_path, "test_signals_dataset")
+    shutil.rmtree(path, ignore_errors=True)
+    symbols = ["S001", "S002", "EMPTY", "S003"]
+    kw = dict(sdt="20150101", edt="20220101", bar_sdt="20100101", chunk_size=200)
+
+    res = generate_signals_dataset(symbols[:2], read_bars, signals_config, path, **kw)
+    assert res['status'].tolist() == ['done', 'done']
+    assert pq.ParquetFile(os.path.join(path, "S001.parquet")).num_row_groups == -(-res['rows'].iloc[0] // 200)
+
+    # 模拟中断：S002 没有写完
+    os.replace(os.path.join(path, "S002.parquet"), os.path.join(path, ".S002.parquet.tmp"))
+    res = generate_signals_dataset(symbols, read_bars, signals_config, path, n_jobs=2, **kw)
+    assert res.set_index('symbol')['status'].to_dict() == {'S001': 'skipped', 'S002': 'done', 'EMPTY': 'failed', 'S003': 'done'}
+    assert not os.path.exists(os.path.join(path, ".S002.parquet.tmp"))
+
+    bars = read_bars("S002", "日线", pd.to_datetime("20100101"), pd.to_datetime("20220101"))
+    expected = generate_czsc_signals(bars, signals_config, sdt="20150101", df=True)
+    df = read_signals_dataset(path, symbols=["S002"])
+    cols = [x for x in expected.columns if x not in ['freq', 'cache']]
+    assert sorted(df.columns) == sorted(cols)
+    pd.testing.assert_frame_equal(df[cols], expected[cols], check_dtype=False)
+
+    df = read_signals_dataset(path, sdt="20200101", columns=['symbol', 'dt'])
+    assert sorted(df['symbol'].unique()) == ['S001', 'S002', 'S003'] and df['dt'].min() >= pd.to_datetime("20200101")
+
+    with pytest.raises(ValueError):
+        generate_signals_dataset(symbols, read_bars, signals_config[:1], path, **kw)
+    shutil.rmtree(path)
+
+
+def test_generate_signals_dataset_default_edt(monkeypatch):
+    """没有指定 edt 时，隔天续跑沿用数据集中保存的 edt"""
+    path = os.path.join(home_path, "test_signals_dataset_edt")
+    shutil.rmtree(path, ignore_errors=True)
+    kw = dict(sdt="20150101", bar_sdt="20100101", chunk_size=200)
+
+    def _now(day):
+        return classmethod(lambda cls, tz=None: pd.Timestamp(f"{day} 15:30"))
+
+    monkeypatch.setattr(pd.Timestamp, "now", _now("2020-01-03"))
+    res = generate_signals_dataset(["S001"], read_bars, signals_config, path, **kw)
+    assert res['status'].tolist() == ['done']
+
+    # 中断后第二天重新执行
+    monkeypatch.setattr(pd.Timestamp, "now", _now("2020-01-06"))
+    res = generate_signals_dataset(["S001", "S002"], read_bars, signals_config, path, **kw)
+    assert res['status'].tolist() == ['skipped', 'done']
+    df = read_signals_dataset(path)
+    assert df['dt'].max() <= pd.to_datetime("20200103")
+    assert df.groupby('symbol')['dt'].max().nunique() == 1
+
+    # 显式指定不同的 edt 时仍然报错
+    with pytest.raises(ValueError):
+        generate_signals_dataset(["S001"], read_bars, signals_config, path, edt="20200106", **kw)
+    shutil.rmtree(path)
+
+
+def test_signals_store():
+    path = os.path.join(home_path, "test_signals_store")
+    shutil.rmtree(path, ignore_errors=True)
+    bars = read_daily()
+    expected = generate_czsc_signals(bars, signals_config, sdt="20150101", df=True)
+    cols = [x for x in expected.columns if x not in ['freq', 'cache']]
+
+    store = SignalsStore(path, signals_config, sdt="20150101")
+    symbol = bars[0].symbol
+    assert store.get_end_dt(symbol) is None and store.read(symbol).empty
+
+    n = len(bars) - 100
+    df1 = store.update(symbol, bars[:n])
+    assert store.get_end_dt(symbol) == bars[n - 1].dt and store.symbols == [symbol]
+
+    # 每次只输入新K线，从保存的 CzscSignals 状态继续计算
+    for i in range(n, len(bars), 30):
+        store = SignalsStore(path, signals_config, sdt="20150101")
+        df2 = store.update(symbol, bars[i - 5: i + 30])
+        assert len(df2) == len(bars[i: i + 30])
+    assert store.update(symbol, bars[-10:]).empty
+
+    df = store.read(symbol)
+    assert len(df1) + 100 == len(df) == len(expected)
+    pd.testing.assert_frame_equal(df[cols], expected[cols], check_dtype=False)
+
+    # 没有提交的信号文件会被删除；合并信号文件后结果不变
+    open(os.path.join(store.path, symbol, "part-09999.parquet"), "w").close()
+    store.compact(symbol)
+    assert sorted(os.listdir(os.path.join(store.path, symbol))) == ['meta.json', 'part-00005.parquet', 'state.pkl']
+    pd.testing.assert_frame_equal(store.read(symbol, sdt="20200101"), df[df['dt'] >= pd.to_datetime("20200101")].reset_index(drop=True))
+    assert store.get_end_dt(symbol) == bars[-1].dt and store.get_state(symbol).bid == bars[-1].id
+    shutil.rmtree(path)
+
+
+signals_config_1min = [{'name': 'czsc.signals.tas_ma_base_V221101', 'freq': '1分钟', 'di': 1, 'ma_type': 'SMA', 'timeperiod': 5},
+                       {'name': 'czsc.signals.cxt_bi_status_V230101', 'freq': '5分钟', 'di': 1}]
+
+
+def read_bars_tz(symbol, freq, sdt, edt, **kwargs):
+    from test.test_analyze import read_1min
+    bars = [RawBar(**{**x.__dict__, "symbol": symbol, "dt": x.dt.tz_localize("Asia/Shanghai")})
+            for x in read_1min()[:3000]]
+    return [x for x in bars if sdt <= x.dt <= edt]
+
+
+def test_signals_tz():
+    """带时区的K线时间原样保存，读取时不带时区的时间过滤条件按K线时区的当地时间处理"""
+    path = os.path.join(home_path, "test_signals_tz")
+    shutil.rmtree(path, ignore_errors=True)
+    kw = {k: pd.Timestamp(v, tz="Asia/Shanghai") for k, v in [("sdt", "20000101"), ("edt", "20300101")]}
+    bars = read_bars_tz("S001", "1分钟", kw["sdt"], kw["edt"])
+    dts = pd.Series([x.dt for x in bars[1000:]])
+    sdt = dts.iloc[0].tz_localize(None)   # K线时区的当地时间
+
+    generate_signals_dataset(["S001"], read_bars_tz, signals_config_1min, path, init_n=1000, **kw)
+    df = read_signals_dataset(path, sdt=sdt)
+    assert str(df['dt'].dt.tz) == "Asia/Shanghai"
+    pd.testing.assert_series_equal(df['dt'], dts, check_names=False, check_dtype=False)
+    df = read_signals_dataset(path, sdt=dts.iloc[0].tz_convert("UTC"))
+    assert df['dt'].min() == dts.iloc[0]
+
+    store = SignalsStore(path, signals_config_1min, sdt=kw["sdt"], init_n=1000)
+    store.update("S001", bars[:-50])
+    store.update("S001", bars[-60:])
+    df = store.read("S001", sdt=sdt)
+    pd.testing.assert_series_equal(df['dt'], dts, check_names=False, check_dtype=False)
+    assert store.get_end_dt("S001") == bars[-1].dt
+    shutil.rmtree(path)
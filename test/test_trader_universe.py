@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from czsc.analyze import CZSC
+from czsc.objects import RawBar
+from czsc.traders.universe import CzscUniverse
+from czsc.signals.cxt import cxt_bi_status_V230101
+from test.test_analyze import read_daily
+
+
+def get_signals(c: CZSC) -> OrderedDict:
+    s = OrderedDict({"symbol": c.symbol, "dt": c.bars_raw[-1].dt, "bi_num": len(c.bi_list)})
+    s.update(cxt_bi_status_V230101(c, di=1))
+    return s
+
+
+def bi_count(c: CZSC, min_power=0):
+    return len([x for x in c.bi_list if x.power > min_power])
+
+
+def mock_symbols(n=3):
+    bars = read_daily()
+    return {f"S{i:03d}": [RawBar(**{**x.__dict__, "symbol": f"S{i:03d}"}) for x in bars] for i in range(n)}
+
+
+def test_czsc_universe():
+    data = mock_symbols()
+    expected = {symbol: CZSC(bars, get_signals=get_signals).signals for symbol, bars in data.items()}
+    expected_power = {symbol: bi_count(CZSC(bars), min_power=100) for symbol, bars in data.items()}
+
+    for max_workers in [0, 2]:
+        with CzscUniverse(get_signals=get_signals, max_workers=max_workers) as u:
+            res = u.init({symbol: bars[:-100] for symbol, bars in data.items()})
+            assert sorted(res) == sorted(u.symbols) == sorted(data)
+            assert all(res[symbol]["dt"] == bars[-101].dt for symbol, bars in data.items())
+
+            # 分批推送新K线，重复推送的K线会被跳过
+            for i in range(-100, 0, 10):
+                res = u.update({symbol: bars[i - 5: i + 10 or None] for symbol, bars in data.items()})
+            assert res == expected and u.signals() == expected
+            assert u.apply(bi_count, min_power=100) == expected_power
+
+            # 未初始化的标的直接使用推送的K线创建
+            new = RawBar(**{**data["S000"][0].__dict__, "symbol": "NEW"})
+            assert u.update({"NEW": [new]})["NEW"]["symbol"] == "NEW"
+            assert u.drop(["NEW", "MISSING"]) == ["NEW"] and len(u) == 3
@@ -319,3 +319,102 @@ def test_overlap():
 
     # 验证结果
     assert result["col_overlap"].tolist() == [1, 2, 1, 2, 1]
+
+
+def test_ta_stream():
+    """流式指标与批量计算一致，包括最后一根K线被同一时间的新K线替换的情况"""
+    import talib as ta
+    from czsc.utils.ta import MACD
+    from czsc.utils.ta_stream import StreamSMA, StreamEMA, StreamBBANDS, StreamSTOCH, StreamMACD
+    from test.test_analyze import read_daily
+
+    bars = read_daily()
+    high, low, close = [np.array([getattr(x, k) for x in bars]) for k in ['high', 'low', 'close']]
+
+    def run(stream, *cols):
+        res = []
+        for i in range(len(cols[0])):
+            if i % 3 == 0:
+                stream.update(bars[i].dt, *[x[i] * 1.01 for x in cols])
+            res.append(stream.update(bars[i].dt, *[x[i] for x in cols]))
+        return np.array(res, dtype=float)
+
+    def check(a, b):
+        assert np.allclose(a, b, rtol=1e-12, atol=1e-8, equal_nan=True)
+
+    check(run(StreamSMA(5), close), ta.SMA(close, 5))
+    check(run(StreamEMA(20), close), ta.EMA(close, 20))
+    u, m, l = ta.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    check(run(StreamBBANDS(20, 2), close), np.array([u, m, l]).T)
+    k, d = ta.STOCH(high, low, close, fastk_period=9, slowk_period=3, slowd_period=3)
+    check(run(StreamSTOCH(9, 3, 3), high, low, close), np.array([k, d]).T)
+    # MACD 与 czsc.utils.ta.MACD 逐位相同
+    assert np.array_equal(run(StreamMACD(12, 26, 9), close), np.array(MACD(close)).T)
+
+
+def test_update_cache_stream():
+    """update_*_cache 流式更新新K线的缓存，结果与使用全部K线批量计算一致"""
+    import talib as ta
+    from czsc.analyze import CZSC
+    from czsc.utils.ta import MACD
+    from czsc.signals.tas import update_ma_cache, update_macd_cache, update_kdj_cache, update_boll_cache
+    from test.test_analyze import read_daily
+
+    bars = read_daily()
+    c = CZSC(bars[:300], max_bi_num=10000)
+    for i, bar in enumerate(bars[300:]):
+        c.update(bar)
+        # 模拟信号函数间隔计算的情况：跳过的K线在下次计算时补齐
+        if i % 7 != 3:
+            update_ma_cache(c, ma_type='EMA', timeperiod=20)
+            update_macd_cache(c)
+            update_kdj_cache(c)
+            update_boll_cache(c)
+
+    new = c.bars_raw[-len(bars) + 301:]
+    assert all('EMA#20' in x.cache and 'MACD12#26#9' in x.cache for x in new)
+    close = np.array([x.close for x in bars])
+    high, low = np.array([x.high for x in bars]), np.array([x.low for x in bars])
+    assert np.allclose([x.cache['EMA#20'] for x in new], ta.EMA(close, 20)[301:], rtol=1e-12)
+    dif, dea, macd = MACD(close)
+    assert [x.cache['MACD12#26#9']['macd'] for x in new] == list(macd[301:])
+    k, d = ta.STOCH(high, low, close, fastk_period=9, slowk_period=3, slowd_period=3)
+    assert np.allclose([x.cache['KDJ9#3#3']['d'] for x in new], d[301:], rtol=1e-12)
+    u, m, l = ta.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    assert np.allclose([x.cache['BOLL20']['上轨2'] for x in new], u[301:], rtol=1e-12)
+
+    # 初始化写入的K线与流式更新的K线使用相同的口径，与重新初始化的结果完全一致
+    c2 = CZSC(bars, max_bi_num=10000)
+    update_macd_cache(c2)
+    assert [x.cache['MACD12#26#9'] for x in c2.bars_raw] == [x.cache['MACD12#26#9'] for x in c.bars_raw]
+    _, _, macd = MACD(np.array([x.close for x in c2.bars_raw]))
+    assert [x.cache['MACD12#26#9']['macd'] for x in c2.bars_raw] == list(macd)
+
+
+def test_ta_vectorized():
+    """向量化的 SMA / EMA / KDJ 与逐根K线循环计算的结果逐位相同"""
+    from czsc.utils import ta
+    from test.test_analyze import read_daily
+
+    bars = read_daily()
+    high, low, close = [np.array([getattr(x, k) for x in bars]) for k in ['high', 'low', 'close']]
+
+    for p in [1, 5, 20]:
+        sma = [close[max(0, i - p + 1): i + 1].mean() for i in range(len(close))]
+        assert np.array_equal(ta.SMA(close, p), np.array(sma).round(4))
+
+        ema = [close[0]]
+        for x in close[1:]:
+            ema.append((2 * x + ema[-1] * (p - 1)) / (p + 1))
+        assert np.array_equal(ta.EMA(close, p), np.array(ema).round(4))
+
+    hv = np.around([max(high[max(0, i - 8): i + 1]) for i in range(len(close))], 2)
+    lv = np.around([min(low[max(0, i - 8): i + 1]) for i in range(len(close))], 2)
+    rsv = np.where(hv == lv, 0, (close - lv) / (hv - lv) * 100)
+    k, d = list(rsv[:9]), list(rsv[:9])
+    for x in rsv[9:]:
+        k.append((2 / 3) * k[-1] + (1 / 3) * x)
+        d.append((2 / 3) * d[-1] + (1 / 3) * k[-1])
+    k, d = np.array(k), np.array(d)
+    for a, b in zip(ta.KDJ(close, high, low), [k, d, 3 * k - 2 * d]):
+        assert np.array_equal(a, b.round(4))
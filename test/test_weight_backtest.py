@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+from czsc.traders.weight_backtest import WeightBacktest
+from czsc.utils.stats import evaluate_pairs
+
+
+def test_weight_backtest_pairs():
+    dfw = pd.DataFrame({
+        "dt": pd.date_range("2024-01-01", periods=6, freq="D"),
+        "symbol": "TEST",
+        "weight": [0.2, 0.5, 0.3, -0.2, 0, 0.1],
+        "price": [100, 102, 101, 104, 99, 100],
+    })
+
+    # 后开先平：第 3 根K线先平第 2 根K线开的仓，多空转换时平掉全部批次；最后一根K线开的仓没有平仓，不生成交易对
+    wb = WeightBacktest(dfw, digits=1, n_jobs=1)
+    dfp = wb.results["TEST"]["pairs"]
+    assert dfp[["开仓价格", "平仓价格", "持仓数量", "交易方向"]].values.tolist() == [
+        [102, 101, 2, "多头"], [102, 104, 1, "多头"], [100, 104, 2, "多头"], [104, 99, 2, "空头"]]
+    assert dfp["持仓K线数"].tolist() == [2, 3, 4, 2] and dfp["持仓天数"].tolist() == [1, 2, 3, 1]
+
+    # 按持仓数量展开后逐笔统计，结果一致
+    expanded = dfp.loc[dfp.index.repeat(dfp["持仓数量"])].drop(columns=["持仓数量"])
+    s1, s2 = evaluate_pairs(dfp), evaluate_pairs(expanded)
+    for key in ["交易次数", "累计收益", "单笔收益", "交易胜率", "持仓天数", "持仓K线数", "盈亏平衡点"]:
+        assert s1[key] == s2[key]
+    assert s1["交易次数"] == 7 and wb.stats["交易胜率"] == s1["交易胜率"]
+
+    # 先开先平
+    wb = WeightBacktest(dfw, digits=1, n_jobs=1, pairs_match="FIFO")
+    dfp = wb.results["TEST"]["pairs"]
+    assert dfp[["开仓价格", "平仓价格", "持仓数量"]].values.tolist() == [[100, 101, 2], [102, 104, 3], [104, 99, 2]]